@@ -1,10 +1,21 @@
 from .fm_properties import FMProperty, FMPropertyMeasure, FMProperties
+from .fm_registry import FMPropertyRegistry
+from .feature_table import FeatureTable
 from .fm_metadata import FMMetadata
 from .fm_metrics import FMMetrics
+from .bdd_utils import BDDBudget, BDDBudgetExceeded
+from .cache_utils import BDDCache
+from .ddnnf_utils import DDNNFBudgetExceeded
+from .approxmc_utils import ApproxCounting, ApproximateCount, ApproxCountTimeout
+from .sampling_utils import Sampling, SampleEstimates, SamplingTimeout
 from .fm_analysis import FMAnalysis
+from .fm_snapshot import FMSnapshot
 from .characterization import FMCharacterization
 
 
-__all__ = ['FMProperty', 'FMPropertyMeasure', 'FMProperties',
+__all__ = ['FMProperty', 'FMPropertyMeasure', 'FMProperties', 'FMPropertyRegistry', 'FeatureTable',
            'FMMetadata', 'FMMetrics', 'FMAnalysis',
-           'FMCharacterization']
\ No newline at end of file
+           'BDDBudget', 'BDDBudgetExceeded', 'BDDCache', 'DDNNFBudgetExceeded',
+           'ApproxCounting', 'ApproximateCount', 'ApproxCountTimeout',
+           'Sampling', 'SampleEstimates', 'SamplingTimeout',
+           'FMSnapshot', 'FMCharacterization']
\ No newline at end of file
@@ -0,0 +1,310 @@
+"""
+This module contains all utils related to the approximate counting of configurations
+of feature models with (ε, δ) guarantees, used when no exact engine is available.
+
+The counting follows ApproxMC (Chakraborty, Meel and Vardi 2013, 2016): random XOR constraints
+partition the configurations into cells of roughly the same size, the configurations of one
+small cell are enumerated with the SAT solver, and the count is the size of the cell times the
+number of cells. The median of several independent estimates gives the guarantee:
+with probability at least 1 - δ, the estimate is within a factor 1 + ε of the exact count.
+"""
+
+import math
+import time
+import random
+from typing import Callable, Optional
+
+from pysat.solvers import Solver
+
+try:
+    import pycryptosat
+except ImportError:  # pycryptosat is optional, the XOR constraints are encoded in CNF instead
+    pycryptosat = None
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+
+from .ddnnf_utils import components
+from .simplification_utils import SimplifiedModel, cnf_formula
+
+
+DEFAULT_TOLERANCE = 0.8  # ε
+DEFAULT_CONFIDENCE = 0.8  # 1 - δ
+DEFAULT_TIMEOUT = 5.0  # seconds, short since the light fact label must be quick
+HASHING_SOLVER_NAME = 'cadical153'  # Faster than glucose on the CNF encoding of the XOR constraints
+
+
+class ApproxCounting():
+    """Parameters of the approximate counting of configurations.
+
+    With probability at least `confidence`, the approximate count is within a factor
+    1 + `tolerance` of the exact count. A `None` timeout means that the time is not limited.
+    """
+
+    def __init__(self,
+                 tolerance: float = DEFAULT_TOLERANCE,
+                 confidence: float = DEFAULT_CONFIDENCE,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT,  # wall-clock time in seconds
+                 seed: int = 1) -> None:  # seed of the random XOR constraints (reproducible counts)
+        if tolerance <= 0 or not 0 < confidence < 1:
+            raise FlamaException('The tolerance must be positive and the confidence must be in (0, 1).')
+        self.tolerance = tolerance
+        self.confidence = confidence
+        self.timeout = timeout
+        self.seed = seed
+
+
+DEFAULT_APPROX_COUNTING = ApproxCounting()
+
+
+class ApproxCountTimeout(FlamaException):
+    """The approximate counting exceeded its timeout."""
+
+
+class ApproximateCount():
+    """Approximate number of configurations with its guarantee.
+
+    If `exact` is true, the count is exact (there are few configurations).
+    """
+
+    def __init__(self, count: int, tolerance: float, confidence: float, exact: bool) -> None:
+        self.count = count
+        self.tolerance = tolerance
+        self.confidence = confidence
+        self.exact = exact
+
+    @property
+    def lower(self) -> int:
+        """Lower bound of the exact count (with the given confidence)."""
+        return self.count if self.exact else math.ceil(self.count / (1 + self.tolerance))
+
+    @property
+    def upper(self) -> int:
+        """Upper bound of the exact count (with the given confidence)."""
+        return self.count if self.exact else math.floor(self.count * (1 + self.tolerance))
+
+
+def approximate_count(sat_model: PySATModel,
+                      counting: Optional[ApproxCounting] = None,
+                      simplified: Optional[SimplifiedModel] = None) -> ApproximateCount:
+    """Return the approximate number of configurations of the SAT model.
+
+    If the `simplified` formula of the SAT model is given, it is counted instead
+    (it has the same number of models with fewer variables).
+    Raise ApproxCountTimeout if the counting exceeds its timeout.
+    """
+    counting = ApproxCounting() if counting is None else counting
+    if simplified is not None and not simplified.valid:
+        return ApproximateCount(0, counting.tolerance, counting.confidence, True)
+    n_vars, clauses = cnf_formula(sat_model, simplified)
+    return _ApproxMCCounter(counting).count(n_vars, clauses)
+
+
+def iterations_number(confidence: float) -> int:
+    """Return the number of estimates whose median fails with probability at most 1 - confidence.
+
+    Each estimate fails with probability at most 0.36 (Chakraborty, Meel and Vardi 2016), so the
+    median of t estimates fails only if (t + 1) / 2 of them fail: the smallest odd t whose
+    binomial tail is at most δ (instead of the looser Chernoff bound t = 17 log2(3 / δ)).
+    """
+    delta = 1 - confidence
+    iterations = 1
+    while sum(math.comb(iterations, k) * 0.36 ** k * 0.64 ** (iterations - k)
+              for k in range((iterations + 1) // 2, iterations + 1)) > delta:
+        iterations += 2
+    return iterations
+
+
+class _ApproxMCCounter():
+    """ApproxMC with nested hashes: the cell with m XOR constraints is included in the cell with
+    m - 1 of them, so that the number of XOR constraints of the first small cell is found by
+    a galloping and binary search starting from the number of the previous estimate (ApproxMC2).
+
+    The independent components of the formula with few configurations are counted exactly,
+    and only the others are hashed together (the product of the counts keeps the guarantee).
+    """
+
+    def __init__(self, counting: ApproxCounting) -> None:
+        self.counting = counting
+        epsilon = counting.tolerance
+        self.threshold = 1 + math.ceil(9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2)
+        self.iterations = iterations_number(counting.confidence)
+        self.random = random.Random(counting.seed)
+        self.deadline = None if counting.timeout is None else time.monotonic() + counting.timeout
+
+    def count(self, n_vars: int, clauses: list[tuple[int, ...]]) -> ApproximateCount:
+        tolerance, confidence = self.counting.tolerance, self.counting.confidence
+        constrained = {abs(lit) for clause in clauses for lit in clause}
+        exact = 2 ** (n_vars - len(constrained))  # free variables
+        large_components = []
+        for component in components(clauses):
+            variables = sorted({abs(lit) for clause in component for lit in clause})
+            cell = _cell(component, variables)
+            try:
+                size = cell.bounded_count(self.threshold, self.check_timeout)
+            finally:
+                cell.delete()
+            if size == 0:
+                return ApproximateCount(0, tolerance, confidence, True)
+            if size < self.threshold:
+                exact *= size
+            else:
+                large_components.append(component)
+        if not large_components:
+            return ApproximateCount(exact, tolerance, confidence, True)
+        clauses = [clause for component in large_components for clause in component]
+        variables = sorted({abs(lit) for clause in clauses for lit in clause})
+        estimates = []
+        hashes = 1
+        for _ in range(self.iterations):
+            estimate, hashes = self.estimate(variables, clauses, hashes)
+            estimates.append(estimate)
+        estimates.sort()
+        return ApproximateCount(exact * estimates[(len(estimates) - 1) // 2], tolerance, confidence, False)
+
+    def estimate(self, variables: list[int], clauses: list[tuple[int, ...]], start: int) -> tuple[int, int]:
+        """Return an estimate of the count and the number of XOR constraints of its cell,
+        searching the first small cell from `start` XOR constraints."""
+        cell = _cell(clauses, variables)
+        sizes: dict[int, int] = {0: self.threshold}  # size of the cell with m XOR constraints (up to the threshold)
+
+        def size(m: int) -> int:
+            if m not in sizes:
+                while len(cell.xors) < m:
+                    cell.add_xor(self.random)
+                sizes[m] = cell.bounded_count(self.threshold, self.check_timeout, m)
+            return sizes[m]
+
+        try:
+            low, high = 0, min(start, len(variables))
+            while size(high) >= self.threshold and high < len(variables):
+                low, high = high, min(2 * high, len(variables))
+            while high - low > 1:
+                middle = (low + high) // 2
+                if size(middle) >= self.threshold:
+                    low = middle
+                else:
+                    high = middle
+            return size(high) * 2 ** high, high
+        finally:
+            cell.delete()
+
+    def check_timeout(self) -> None:
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ApproxCountTimeout(f'Approximate counting exceeded its timeout ({self.counting.timeout} s).')
+
+
+def _cell(clauses: list[tuple[int, ...]], variables: list[int]) -> '_Cell':
+    """Return an empty cell (no XOR constraints) of the configurations of the formula."""
+    if pycryptosat is not None:
+        return _CryptoMiniSatCell(clauses, variables)
+    return _Cell(clauses, variables)
+
+
+class _Cell():
+    """Cell of the configurations defined by XOR constraints over the given variables.
+
+    Each XOR constraint is encoded in CNF with auxiliary variables (a chain of binary XORs)
+    and enabled by an activation literal, so that the cells with fewer constraints can be
+    counted with the same solver.
+    """
+
+    def __init__(self, clauses: list[tuple[int, ...]], variables: list[int]) -> None:
+        self.solver = Solver(name=HASHING_SOLVER_NAME, bootstrap_with=clauses)
+        self.variables = variables
+        self.top = max(variables[-1], self.solver.nof_vars())  # last variable in use
+        self.xors: list[int] = []  # assumptions that enable each XOR constraint
+
+    def new_var(self) -> int:
+        self.top += 1
+        return self.top
+
+    def add_xor(self, rng: random.Random) -> None:
+        """Add a random XOR constraint: each variable with probability 1/2, and a random parity."""
+        variables, parity = _random_xor(self.variables, rng)
+        activation = self.new_var()
+        if not variables:
+            if parity:
+                self.solver.add_clause([-activation])
+        else:
+            chain = variables[0]
+            for var in variables[1:]:  # chain <-> previous chain xor var
+                xor = self.new_var()
+                self.solver.append_formula([[-xor, chain, var], [-xor, -chain, -var],
+                                            [xor, -chain, var], [xor, chain, -var]])
+                chain = xor
+            self.solver.add_clause([-activation, chain if parity else -chain])
+        self.xors.append(activation)
+
+    def bounded_count(self, threshold: int, check_timeout: Callable[[], None], m: int = 0) -> int:
+        """Return the number of configurations in the cell of the first m XOR constraints,
+        up to the threshold."""
+        return len(self.models(threshold, check_timeout, m))
+
+    def models(self, threshold: int, check_timeout: Callable[[], None], m: int = 0) -> list[list[int]]:
+        """Return the configurations in the cell of the first m XOR constraints, up to the threshold."""
+        blocking = self.new_var()  # Enables the blocking clauses of this enumeration only
+        assumptions = self.xors[:m] + [blocking]
+        models = []
+        while len(models) < threshold:
+            check_timeout()
+            if not self.solve(assumptions):
+                break
+            models.append(self.model())
+            self.solver.add_clause([-blocking] + [-lit for lit in models[-1]])
+        self.solver.add_clause([-blocking])
+        return models
+
+    def solve(self, assumptions: list[int]) -> bool:
+        return self.solver.solve(assumptions=assumptions)
+
+    def model(self) -> list[int]:
+        """Return the literals of the variables of the cell in the last model."""
+        model = self.solver.get_model()
+        # The model of pysat is ordered by variable: model[var - 1] is the literal of var
+        return [model[var - 1] for var in self.variables]
+
+    def delete(self) -> None:
+        self.solver.delete()
+
+
+class _CryptoMiniSatCell(_Cell):
+    """Cell with native XOR constraints (CryptoMiniSat reasons on them by Gauss-Jordan
+    elimination). Each XOR constraint includes its activation variable, so that it is
+    enabled by assuming the activation variable false."""
+
+    def __init__(self, clauses: list[tuple[int, ...]], variables: list[int]) -> None:
+        self.solver = pycryptosat.Solver()
+        for clause in clauses:
+            self.solver.add_clause(clause)
+        self.variables = variables
+        self.top = max(abs(lit) for clause in clauses for lit in clause)
+        self.xors = []
+        self.solution: tuple = ()
+
+    def new_var(self) -> int:
+        var = super().new_var()
+        self.solver.add_clause([var, -var])  # CryptoMiniSat rejects assumptions on unknown variables
+        return var
+
+    def add_xor(self, rng: random.Random) -> None:
+        variables, parity = _random_xor(self.variables, rng)
+        activation = self.new_var()
+        self.solver.add_xor_clause(variables + [activation], bool(parity))
+        self.xors.append(-activation)
+
+    def solve(self, assumptions: list[int]) -> bool:
+        satisfiable, self.solution = self.solver.solve(assumptions)
+        return satisfiable
+
+    def model(self) -> list[int]:
+        return [var if self.solution[var] else -var for var in self.variables]
+
+    def delete(self) -> None:
+        del self.solver
+
+
+def _random_xor(variables: list[int], rng: random.Random) -> tuple[list[int], int]:
+    """Return a random XOR constraint: each variable with probability 1/2, and a random parity."""
+    bits = rng.getrandbits(len(variables) + 1)
+    return [var for i, var in enumerate(variables, 1) if bits >> i & 1], bits & 1
@@ -0,0 +1,514 @@
+"""
+This module contains all utils related to the construction and the analysis of the BDD
+of a feature model.
+"""
+
+import os
+import math
+import time
+import pathlib
+import multiprocessing
+from typing import Any, Callable, Optional
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Relation
+from flamapy.metamodels.fm_metamodel.transformations import FMSecureFeaturesNames
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
+from flamapy.metamodels.bdd_metamodel.models.utils import PLModel
+
+from .polynomial_utils import binomial_coefficients, polynomial_product, polynomial_sum
+from .cache_utils import BDDCache, model_hash
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, /proc is used instead
+    psutil = None
+
+
+POLL_INTERVAL = 0.1  # seconds between checks of the BDD compilation process
+ORDERINGS = ('flamapy', 'dfs', 'force')  # heuristics for the order of the variables in the BDD
+DEFAULT_ORDERING = 'force'
+
+
+class BDDBudget():
+    """Resources budget for the construction of the BDD.
+
+    The BDD is built in a child process that is killed as soon as it exceeds the budget.
+    A `None` limit means that the resource is not limited.
+    The time and nodes limits also bound the d-DNNF compilation used when the BDD fails
+    (which is bounded by default without a budget, see `ddnnf_utils.DEFAULT_DDNNF_TIMEOUT`).
+    """
+
+    def __init__(self,
+                 timeout: Optional[float] = None,  # wall-clock time in seconds
+                 max_nodes: Optional[int] = None,  # live nodes in the BDD manager
+                 max_memory: Optional[int] = None) -> None:  # resident memory (RSS) in MB
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+
+
+class BDDBudgetExceeded(FlamaException):
+    """The construction of the BDD exceeded its budget."""
+
+
+def build_bdd(model: FeatureModel, 
+              budget: Optional[BDDBudget] = None,
+              ordering: str = DEFAULT_ORDERING,
+              reordering: bool = False,
+              cache: Optional[BDDCache] = None) -> BDDModel:
+    """Build the BDD of the feature model.
+
+    The variables are declared in the order given by the `ordering` heuristic 
+    (see `ORDERINGS`), and CUDD's dynamic reordering is enabled during the 
+    construction if `reordering` is true. 
+    Without a budget, the BDD is built in the current process.
+    With a budget, the BDD is built in an isolated child process and transferred back
+    in memory (as a table of nodes through a pipe, without temporary files),
+    raising BDDBudgetExceeded if the child exceeds any of the limits.
+    With a `cache`, the BDD is loaded from the cache if the same feature model was already
+    compiled with the same options (without any budget), and stored in it otherwise.
+    """
+    fm_secure_names_op = FMSecureFeaturesNames(model)
+    secure_model = fm_secure_names_op.transform()
+    key = None if cache is None else model_hash(model, ordering, reordering)
+    cached = None if cache is None else cache.get(key)
+    if cached is not None:
+        bdd_model = _rebuild_bdd(*cached)
+    elif budget is None:
+        bdd_model = BDDModel()
+        _compile_bdd(bdd_model, secure_model, ordering, reordering)
+        if cache is not None:
+            cache.put(key, bdd_model.vars_order, *_node_table(bdd_model))
+    else:
+        vars_order, nodes, root = _run_budgeted(secure_model, budget, ordering, reordering)
+        bdd_model = _rebuild_bdd(vars_order, nodes, root)
+        if cache is not None:
+            cache.put(key, vars_order, nodes, root)
+    bdd_model.features_vars = fm_secure_names_op.mapping_names
+    bdd_model.vars_features = {v: f for f, v in bdd_model.features_vars.items()}
+    bdd_model.original_model = secure_model
+    return bdd_model
+
+
+def bdd_size(bdd_model: BDDModel) -> int:
+    """Return the number of nodes of the BDD (reachable from its root)."""
+    return bdd_model.root.dag_size
+
+
+def save_bdd(bdd_model: BDDModel, directory: str, name: str) -> str:
+    """Save the BDD in DDDMP format into the directory, and return the path of the file.
+
+    The BDD is only written to disk when it is explicitly saved.
+    """
+    pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+    filepath = str(pathlib.Path(directory) / f'{name}.dddmp')
+    bdd_model.bdd.dump(filepath, roots=[bdd_model.root])
+    return filepath
+
+
+class BDDCounter():
+    """Exact analysis of a BDD in a single pass over its nodes.
+
+    A bottom-up pass computes the number of configurations and the product distribution
+    of each node, and a top-down pass counts the paths that reach each node. The number of
+    configurations of each feature (and thus the feature inclusion probabilities, the unique
+    features and the homogeneity) is derived from both, so all the results share the same
+    memo tables instead of traversing the BDD once per operation.
+    The complement edges of CUDD are handled by counting the paths of each parity.
+    """
+
+    def __init__(self, bdd_model: BDDModel) -> None:
+        self.bdd_model = bdd_model
+        self._n = len(bdd_model.vars_order)
+        self._true = bdd_model.bdd.true
+        self._binomials: dict[int, list[int]] = {}
+        nodes = internal_nodes(bdd_model)
+        # Bottom-up: configurations and distribution of each (regular) node over its levels and below
+        self._counts: dict[Any, int] = {}
+        self._distributions: dict[Any, list[int]] = {}
+        for node in reversed(nodes):
+            self._counts[node] = self._edge_count(node.low, node.level + 1) + self._edge_count(node.high, node.level + 1)
+            self._distributions[node] = polynomial_sum(self._edge_distribution(node.low, node.level + 1),
+                                                       [0] + self._edge_distribution(node.high, node.level + 1))
+        self._configurations = self._edge_count(bdd_model.root, 0)
+        self._product_distribution = self._edge_distribution(bdd_model.root, 0)
+        # Top-down: paths (assignments of the levels above) reaching each node with even and odd parity
+        self._variable_counts = self._top_down(nodes)
+
+    def configurations_number(self) -> int:
+        return self._configurations
+
+    def feature_counts(self) -> dict[str, int]:
+        """Return the number of configurations of each feature."""
+        return {self.bdd_model.vars_features[var]: count for var, count in self._variable_counts.items()}
+
+    def feature_probabilities(self) -> dict[str, float]:
+        return {feature: count / self._configurations if self._configurations > 0 else 0.0
+                for feature, count in self.feature_counts().items()}
+
+    def unique_features(self) -> list[str]:
+        return [feature for feature, count in self.feature_counts().items() if count == 1]
+
+    def product_distribution(self) -> list[int]:
+        return self._product_distribution + [0] * (self._n + 1 - len(self._product_distribution))
+
+    def homogeneity(self) -> float:
+        """Return the mean feature inclusion probability."""
+        if self._configurations == 0 or not self._variable_counts:
+            return 0.0
+        return sum(self._variable_counts.values()) / (self._configurations * len(self._variable_counts))
+
+    def _top_down(self, nodes: list[Any]) -> dict[str, int]:
+        """Return the number of configurations of each variable.
+
+        The configurations that go through a node of the variable select it if they take the high
+        edge; the others do not test the variable, so exactly half of them select it.
+        """
+        even: dict[Any, int] = dict.fromkeys(nodes, 0)
+        odd: dict[Any, int] = dict.fromkeys(nodes, 0)
+        through = dict.fromkeys(self.bdd_model.vars_order, 0)  # configurations through a node of each variable
+        high = dict.fromkeys(self.bdd_model.vars_order, 0)  # configurations through its high edge
+        self._add_paths(self.bdd_model.root, 0, 1, 0, even, odd)
+        for node in nodes:
+            paths_even, paths_odd = even[node], odd[node]
+            below = 2 ** (self._n - node.level)
+            through[node.var] += paths_even * self._counts[node] + paths_odd * (below - self._counts[node])
+            high_count = self._edge_count(node.high, node.level + 1)
+            high[node.var] += paths_even * high_count + paths_odd * (below // 2 - high_count)
+            self._add_paths(node.low, node.level + 1, paths_even, paths_odd, even, odd)
+            self._add_paths(node.high, node.level + 1, paths_even, paths_odd, even, odd)
+        return {var: high[var] + (self._configurations - through[var]) // 2 for var in self.bdd_model.vars_order}
+
+    def _add_paths(self, edge: Any, level: int, paths_even: int, paths_odd: int,
+                   even: dict[Any, int], odd: dict[Any, int]) -> None:
+        node, negated, node_level = self._target(edge)
+        if node_level == self._n:  # terminal
+            return
+        skipped = 2 ** (node_level - level)
+        if negated:
+            paths_even, paths_odd = paths_odd, paths_even
+        even[node] += paths_even * skipped
+        odd[node] += paths_odd * skipped
+
+    def _target(self, edge: Any) -> tuple[Any, bool, int]:
+        """Return the regular node of the edge, whether the edge is complemented, and its level."""
+        node = ~edge if edge.negated else edge
+        return node, edge.negated, self._n if node == self._true else node.level
+
+    def _edge_count(self, edge: Any, level: int) -> int:
+        """Return the configurations of the edge over the variables from the level."""
+        node, negated, node_level = self._target(edge)
+        count = 1 if node_level == self._n else self._counts[node]
+        if negated:
+            count = 2 ** (self._n - node_level) - count
+        return count * 2 ** (node_level - level)
+
+    def _edge_distribution(self, edge: Any, level: int) -> list[int]:
+        """Return the product distribution of the edge over the variables from the level."""
+        node, negated, node_level = self._target(edge)
+        distribution = [1] if node_level == self._n else self._distributions[node]
+        if negated:
+            distribution = [c - d for c, d in zip(self._binomial(self._n - node_level), distribution + [0] * self._n)]
+        return polynomial_product(distribution, self._binomial(node_level - level))
+
+    def _binomial(self, n: int) -> list[int]:
+        if n not in self._binomials:
+            self._binomials[n] = binomial_coefficients(n)
+        return self._binomials[n]
+
+
+def internal_nodes(bdd_model: BDDModel) -> list[Any]:
+    """Return the regular (non-complemented) internal nodes reachable from the root of the BDD,
+    sorted by level."""
+    true = bdd_model.bdd.true
+    nodes = []
+    visited = set()
+    stack = [bdd_model.root]
+    while stack:
+        edge = stack.pop()
+        node = ~edge if edge.negated else edge
+        if node == true or node in visited:
+            continue
+        visited.add(node)
+        nodes.append(node)
+        stack.append(node.low)
+        stack.append(node.high)
+    nodes.sort(key=lambda node: node.level)
+    return nodes
+
+
+def variable_ordering(fm: FeatureModel, ordering: str = DEFAULT_ORDERING) -> list[str]:
+    """Return the names of the features in the order given by the ordering heuristic.
+
+    - 'flamapy': the order chosen by flamapy (arbitrary).
+    - 'dfs': pre-order depth-first traversal of the feature tree, which keeps parents 
+      close to their children.
+    - 'force': FORCE heuristic (Aloul et al. 2003) over the hypergraph of the tree 
+      relations and the cross-tree constraints, which minimizes the total span of
+      the hyperedges starting from the 'dfs' order.
+    """
+    if ordering == 'flamapy':
+        return list({feature.name for feature in fm.get_features()})  # as `PLModel.variables`
+    if ordering == 'dfs':
+        return dfs_ordering(fm)
+    if ordering == 'force':
+        return force_ordering(fm, dfs_ordering(fm))
+    raise FlamaException(f'Unknown variable ordering: {ordering}. Available orderings: {ORDERINGS}.')
+
+
+def dfs_ordering(fm: FeatureModel) -> list[str]:
+    """Return the features in pre-order depth-first traversal of the feature tree."""
+    order = []
+    stack = [fm.root]
+    while stack:
+        feature = stack.pop()
+        order.append(feature.name)
+        children = [child for relation in feature.get_relations() for child in relation.children]
+        stack.extend(reversed(children))
+    return order
+
+
+def force_ordering(fm: FeatureModel, initial_order: list[str]) -> list[str]:
+    """Return the order of the FORCE heuristic starting from the given order.
+
+    Each variable is moved to the mean of the centers of gravity of its hyperedges 
+    (tree relations and constraints) until the total span stops decreasing.
+    """
+    position = {var: i for i, var in enumerate(initial_order)}
+    hyperedges = [hyperedge for hyperedge in ordering_hyperedges(fm) 
+                  if all(var in position for var in hyperedge)]
+    var_hyperedges: dict[str, list[int]] = {var: [] for var in initial_order}
+    for i, hyperedge in enumerate(hyperedges):
+        for var in hyperedge:
+            var_hyperedges[var].append(i)
+
+    best_order = initial_order
+    best_span = total_span(hyperedges, position)
+    for _ in range(max(1, math.ceil(math.log2(len(initial_order) + 1))) * 2):
+        centers = [sum(position[var] for var in hyperedge) / len(hyperedge) for hyperedge in hyperedges]
+        new_position = {var: (sum(centers[i] for i in edges) / len(edges) if edges else position[var], position[var])
+                        for var, edges in var_hyperedges.items()}
+        order = sorted(initial_order, key=new_position.__getitem__)
+        position = {var: i for i, var in enumerate(order)}
+        span = total_span(hyperedges, position)
+        if span >= best_span:
+            break
+        best_order, best_span = order, span
+    return best_order
+
+
+def ordering_hyperedges(fm: FeatureModel) -> list[list[str]]:
+    """Return the hyperedges (sets of related features) of the tree relations and constraints."""
+    hyperedges = [[relation.parent.name] + [child.name for child in relation.children]
+                  for relation in fm.get_relations()]
+    for constraint in fm.get_logical_constraints():
+        features = constraint.get_features()
+        if len(features) > 1:
+            hyperedges.append(list(features))
+    return hyperedges
+
+
+def total_span(hyperedges: list[list[str]], position: dict[str, int]) -> int:
+    """Return the sum of the spans (distance between the first and last variable) of the hyperedges."""
+    span = 0
+    for hyperedge in hyperedges:
+        positions = [position[var] for var in hyperedge]
+        span += max(positions) - min(positions)
+    return span
+
+
+def _compile_bdd(bdd_model: BDDModel, 
+                 secure_model: FeatureModel, 
+                 ordering: str, 
+                 reordering: bool, 
+                 max_nodes: Optional[int] = None) -> bool:
+    """Build the BDD of the (secure-named) feature model into the given BDD model.
+
+    Return false if the BDD exceeded the maximum number of nodes.
+    """
+    pl_model = PLModel()  # only its formulas of the parts (see `_formula_parts`)
+    variables = variable_ordering(secure_model, ordering)
+    bdd = bdd_model.bdd
+    bdd.configure(reordering=reordering)
+    for var in variables:
+        bdd.declare(var)
+    # Conjoin the formula part by part to control the size of the BDD
+    def over_budget() -> bool:
+        return max_nodes is not None and len(bdd) > max_nodes
+
+    root = bdd.true
+    for formula in _formula_parts(pl_model, secure_model):
+        root = root & bdd.add_expr(formula)
+        if over_budget():
+            return False
+    for relation in secure_model.get_relations():
+        if _is_group_cardinality(relation):
+            cardinality = _cardinality_bdd(bdd, relation, over_budget)
+            if cardinality is None:
+                return False
+            root = root & cardinality
+            if over_budget():
+                return False
+    # The order is crucial for the operations: freeze it after the construction
+    bdd.configure(reordering=False)
+    bdd_model.vars_order = sorted(variables, key=bdd.level_of_var) if reordering else variables
+    bdd_model.root = root
+    return True
+
+
+def _node_table(bdd_model: BDDModel) -> tuple[list[tuple[str, int, int]], int]:
+    """Return the table of the nodes of the BDD (children first) and the reference of its root.
+
+    Each node is (var, low, high), and each reference to a node is 2 * index + 1 if the edge
+    is complemented (2 * index otherwise), where the index 0 is the true terminal and the
+    node i of the table has the index i + 1.
+    """
+    true = bdd_model.bdd.true
+    indices = {}
+    table = []
+
+    def reference(edge: Any) -> int:
+        node = ~edge if edge.negated else edge
+        return (0 if node == true else indices[node]) << 1 | edge.negated
+
+    for node in reversed(internal_nodes(bdd_model)):
+        table.append((node.var, reference(node.low), reference(node.high)))
+        indices[node] = len(table)
+    return table, reference(bdd_model.root)
+
+
+def _rebuild_bdd(vars_order: list[str], table: list[tuple[str, int, int]], root: int) -> BDDModel:
+    """Rebuild the BDD from its table of nodes (see `_node_table`), keeping its order of variables."""
+    bdd_model = BDDModel()
+    bdd = bdd_model.bdd
+    bdd.configure(reordering=False)
+    for var in vars_order:
+        bdd.declare(var)
+    nodes = [bdd.true]
+
+    def edge(reference: int) -> Any:
+        node = nodes[reference >> 1]
+        return ~node if reference & 1 else node
+
+    for var, low, high in table:
+        nodes.append(bdd.find_or_add(var, edge(low), edge(high)))
+    bdd_model.root = edge(root)
+    bdd_model.vars_order = vars_order
+    return bdd_model
+
+
+def _run_budgeted(secure_model: FeatureModel, 
+                  budget: BDDBudget, 
+                  ordering: str, 
+                  reordering: bool) -> tuple[list[str], list[tuple[str, int, int]], int]:
+    """Build the BDD in a child process under the given budget.
+    
+    Return the order of the variables, the table of nodes and the root of the BDD (see `_node_table`).
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_build_bdd_process,
+                                      args=(secure_model, ordering, reordering, budget.max_nodes, sender),
+                                      daemon=True)
+    start = time.monotonic()
+    process.start()
+    sender.close()
+    try:
+        while not receiver.poll(POLL_INTERVAL):
+            if not process.is_alive():
+                raise FlamaException(f'The BDD compilation process died (exit code: {process.exitcode}).')
+            elapsed = time.monotonic() - start
+            if budget.timeout is not None and elapsed > budget.timeout:
+                raise BDDBudgetExceeded(f'BDD compilation exceeded the time budget ({budget.timeout} s).')
+            memory = _process_memory(process.pid)
+            if budget.max_memory is not None and memory is not None and memory > budget.max_memory:
+                raise BDDBudgetExceeded(f'BDD compilation exceeded the memory budget ({budget.max_memory} MB).')
+        status, result = receiver.recv()
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
+    if status == 'error':
+        raise FlamaException(result)
+    if status == 'budget':
+        raise BDDBudgetExceeded(result)
+    return result
+
+
+def _build_bdd_process(secure_model: FeatureModel, 
+                       ordering: str,
+                       reordering: bool,
+                       max_nodes: Optional[int], 
+                       sender: Any) -> None:
+    """Entry point of the BDD compilation process."""
+    try:
+        bdd_model = BDDModel()
+        if not _compile_bdd(bdd_model, secure_model, ordering, reordering, max_nodes):
+            sender.send(('budget', f'BDD compilation exceeded the node budget ({max_nodes} nodes).'))
+            return
+        table, root = _node_table(bdd_model)
+        sender.send(('ok', (bdd_model.vars_order, table, root)))
+    except Exception as e:
+        sender.send(('error', f'BDD compilation failed: {e}'))
+    finally:
+        sender.close()
+
+
+def _formula_parts(pl_model: PLModel, fm: FeatureModel) -> list[str]:
+    """Return the conjuncts of the propositional formula of the feature model,
+    except the group cardinalities (see `_cardinality_bdd`)."""
+    parts = [fm.root.name]
+    for feature in fm.get_features():
+        for relation in feature.get_relations():
+            if not _is_group_cardinality(relation):
+                parts.append(pl_model._get_relation_formula(relation))
+    for constraint in fm.get_logical_constraints():
+        formula = pl_model._get_constraint_formula(constraint)
+        if not formula:
+            raise FlamaException(f'The constraint {constraint.name} cannot be encoded in the BDD.')
+        parts.append(formula)
+    return parts
+
+
+def _is_group_cardinality(relation: Relation) -> bool:
+    """Return true if the relation is not mandatory, optional, or, nor alternative."""
+    return not (relation.is_mandatory() or relation.is_optional() or relation.is_or() or relation.is_alternative())
+
+
+def _cardinality_bdd(bdd: Any, relation: Relation, over_budget: Callable[[], bool]) -> Any:
+    """Return the BDD of the group cardinality of the relation, with its bounds taken literally
+    as in `FmToPysat`: the number of selected children is within the bounds when the parent
+    is selected, and the children require the parent.
+
+    The children are counted with a threshold BDD built bottom-up in the order of the variables
+    (a node per child and number of children selected above it): O(n^2) nodes for n children,
+    instead of the exponential combinations of children of `PLModel` and `FmToPysat`.
+    Return None as soon as the BDD exceeds the node budget (`over_budget`).
+    """
+    parent = bdd.var(relation.parent.name)
+    children = sorted((child.name for child in relation.children), key=bdd.level_of_var)
+    # in_bounds[s]: the s children selected above the current one and those below are within the bounds
+    in_bounds = [bdd.true if relation.card_min <= s <= relation.card_max else bdd.false
+                 for s in range(len(children) + 1)]
+    for i in range(len(children) - 1, -1, -1):
+        child = bdd.var(children[i])
+        in_bounds = [bdd.ite(child, in_bounds[s + 1], in_bounds[s]) for s in range(i + 1)]
+        if over_budget():
+            return None
+    cardinality = ~parent | in_bounds[0]
+    for child in children:
+        cardinality = cardinality & (~bdd.var(child) | parent)
+    return cardinality
+
+
+def _process_memory(pid: int) -> Optional[float]:
+    """Return the resident memory (RSS) of the process in MB, or None if it is not available."""
+    try:
+        if psutil is not None:
+            return psutil.Process(pid).memory_info().rss / 2**20
+        with open(f'/proc/{pid}/statm', encoding='utf-8') as statm:
+            rss_pages = int(statm.read().split()[1])
+        return rss_pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except Exception:
+        return None
@@ -0,0 +1,144 @@
+"""
+This module contains all utils related to the persistent cache of compiled BDDs.
+
+The BDDs are stored on disk as tables of nodes (see `bdd_utils._node_table`), keyed by a
+canonical hash of the feature model and of the options of the compilation, so that the same
+feature model is only compiled once across runs (e.g., after editing its metadata).
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+import pathlib
+import tempfile
+from typing import Optional
+
+from flamapy.metamodels.fm_metamodel.models import FeatureModel
+
+
+CACHE_VERSION = 1  # Changes of the format or of the compilation invalidate the previous entries
+DEFAULT_MAX_SIZE = 512  # MB
+MAGIC = b'FMFLBDD'
+ENTRY_SUFFIX = '.bdd'
+
+
+class BDDCache():
+    """Persistent cache of compiled BDDs in a directory.
+
+    Each entry is a compressed table of nodes with a checksum, which is verified on load:
+    corrupt or truncated entries are removed and compiled again. The cache is bounded by
+    `max_size` (MB); when it is exceeded, the least recently used entries are evicted.
+    The entries are written atomically, so that several processes can share the cache.
+    """
+
+    def __init__(self, directory: str, max_size: Optional[float] = DEFAULT_MAX_SIZE) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+
+    def get(self, key: str) -> Optional[tuple[list[str], list[tuple[str, int, int]], int]]:
+        """Return the order of the variables, the table of nodes and the root of the cached BDD,
+        or None if it is not cached (or its entry is corrupt)."""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            vars_order, table, root = _decode(data)
+        except Exception as e:
+            logging.warning(f'Warning: the cached BDD {path.name} is corrupt, compiling it again. ({e})')
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # Most recently used
+        except OSError:
+            pass
+        return vars_order, table, root
+
+    def __contains__(self, key: str) -> bool:
+        """Return true if the BDD is cached (without loading or checking its entry)."""
+        return self._path(key).exists()
+
+    def put(self, key: str, vars_order: list[str], table: list[tuple[str, int, int]], root: int) -> None:
+        """Store the table of nodes of the BDD and evict the least recently used entries if needed."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as tmp:
+                tmp.write(_encode(vars_order, table, root))
+            os.replace(tmp.name, self._path(key))
+            self.evict()
+        except OSError as e:
+            logging.warning(f'Warning: the BDD cannot be stored in the cache. ({e})')
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in its maximum size."""
+        if self.max_size is None:
+            return
+        entries = []
+        for path in self.directory.glob(f'*{ENTRY_SUFFIX}'):
+            try:
+                stat = path.stat()
+            except OSError:  # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size * 2**20:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all the entries of the cache."""
+        for path in self.directory.glob(f'*{ENTRY_SUFFIX}'):
+            path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f'{key}{ENTRY_SUFFIX}'
+
+
+def model_hash(fm: FeatureModel, *options: object) -> str:
+    """Return a canonical hash of the feature model and the options of its compilation.
+
+    The hash covers everything the BDD depends on, in the order it is compiled: the feature
+    tree (names and relations in pre-order) and the cross-tree constraints. Metadata, abstract
+    features, attributes and the file format of the model do not change the hash.
+    """
+    digest = hashlib.sha256(f'{CACHE_VERSION}|{options!r}'.encode())
+    stack = [fm.root]
+    while stack:
+        feature = stack.pop()
+        digest.update(f'F|{feature.name}|{len(feature.get_relations())}'.encode())
+        for relation in feature.get_relations():
+            digest.update(f'R|{relation.card_min}|{relation.card_max}|{len(relation.children)}'.encode())
+            digest.update('|'.join(child.name for child in relation.children).encode())
+        children = [child for relation in feature.get_relations() for child in relation.children]
+        stack.extend(reversed(children))
+    for constraint in fm.get_constraints():
+        digest.update(f'C|{constraint.ast.pretty_str()}'.encode())
+    return digest.hexdigest()
+
+
+def _encode(vars_order: list[str], table: list[tuple[str, int, int]], root: int) -> bytes:
+    payload = zlib.compress(json.dumps([vars_order, table, root], separators=(',', ':')).encode())
+    return MAGIC + hashlib.sha256(payload).digest() + payload
+
+
+def _decode(data: bytes) -> tuple[list[str], list[tuple[str, int, int]], int]:
+    """Return the table of nodes of the entry, checking its integrity."""
+    if not data.startswith(MAGIC):
+        raise ValueError('unknown format')
+    checksum, payload = data[len(MAGIC):len(MAGIC) + 32], data[len(MAGIC) + 32:]
+    if hashlib.sha256(payload).digest() != checksum:
+        raise ValueError('checksum mismatch')
+    vars_order, table, root = json.loads(zlib.decompress(payload))
+    variables = set(vars_order)
+    for i, (var, low, high) in enumerate(table, 1):  # The children of each node come before it
+        if var not in variables or not 0 <= low >> 1 < i or not 0 <= high >> 1 < i:
+            raise ValueError('malformed table of nodes')
+    if not 0 <= root >> 1 <= len(table):
+        raise ValueError('malformed root')
+    return vars_order, [tuple(node) for node in table], root
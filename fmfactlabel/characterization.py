@@ -2,79 +2,148 @@ import json
 import tempfile
 from urllib.parse import urlparse
 import pathlib
-from typing import Any
+from typing import Any, Collection, Optional
 import urllib.request
 
 from flamapy.core.exceptions import FlamaException
 from flamapy.metamodels.fm_metamodel.models import FeatureModel
 from flamapy.metamodels.fm_metamodel.transformations import (
-    UVLReader,
     FeatureIDEReader,
     AFMReader,
     GlencoeReader,
     JSONReader
 )
 
-from fmfactlabel import FMProperty, FMAnalysis, FMMetadata, FMMetrics
+from fmfactlabel import FMProperties, FMPropertyMeasure, FMAnalysis, FMMetadata, FMMetrics, FeatureTable
+from fmfactlabel.bdd_utils import BDDBudget, DEFAULT_ORDERING
+from fmfactlabel.approxmc_utils import ApproxCounting, DEFAULT_APPROX_COUNTING
+from fmfactlabel.sampling_utils import Sampling, DEFAULT_SAMPLING
+from fmfactlabel.cache_utils import BDDCache
+from fmfactlabel.fm_snapshot import FMSnapshot, SPACE, get_parents_numbers
+from fmfactlabel.json_utils import decode_json
+from fmfactlabel.fm_binary_utils import read_fm_snapshot, write_fm_snapshot
+from fmfactlabel.uvl_utils import read_uvl_file
 
 
-SPACE = ' '
 INDENT_MULTIPLIER = 1  # change to 2 if you need more indentation
 
 
 class FMCharacterization():
     
-    def __init__(self, model: FeatureModel, light_fact_label: bool = False) -> None:
-        self.metadata = FMMetadata(model)
-        self.metrics = FMMetrics(model)
-        self.analysis = FMAnalysis(model, light_fact_label)
+    def __init__(self, 
+                 model: FeatureModel, 
+                 light_fact_label: bool = False, 
+                 lazy: bool = False,
+                 bdd_budget: Optional[BDDBudget] = None,
+                 bdd_ordering: str = DEFAULT_ORDERING,
+                 bdd_reordering: bool = False,
+                 simplify: bool = True,
+                 approx_counting: Optional[ApproxCounting] = DEFAULT_APPROX_COUNTING,
+                 sampling: Optional[Sampling] = DEFAULT_SAMPLING,
+                 bdd_cache: Optional[BDDCache] = None,
+                 summary: bool = False,
+                 select: Optional[Collection[FMProperties]] = None) -> None:
+        self.select = select
+        # The columnar representation of the feature model is built once and shared
+        self.table = FeatureTable(model)
+        self.metadata = FMMetadata(model, table=self.table)
+        self.metrics = FMMetrics(model, summary, self.table)
+        # With a selection, the analysis is lazy so that only the selected properties are computed
+        self.analysis = FMAnalysis(model, light_fact_label, lazy or select is not None, bdd_budget, bdd_ordering, bdd_reordering,
+                                   simplify, approx_counting, sampling, bdd_cache, summary, self.table)
+        self._measures: Optional[tuple[tuple[FMPropertyMeasure, ...], tuple[FMPropertyMeasure, ...]]] = None
     
     @staticmethod
-    def from_path(fm_filepath: str, light_fact_label: bool = False) -> 'FMCharacterization':
-        """Load characterization from a feature model file."""
-        fm_model = read_fm_file(fm_filepath)
-        characterization = FMCharacterization(fm_model, light_fact_label)
+    def from_path(fm_filepath: str, 
+                  light_fact_label: bool = False, 
+                  lazy: bool = False,
+                  bdd_budget: Optional[BDDBudget] = None,
+                  bdd_ordering: str = DEFAULT_ORDERING,
+                  bdd_reordering: bool = False,
+                  simplify: bool = True,
+                  approx_counting: Optional[ApproxCounting] = DEFAULT_APPROX_COUNTING,
+                  sampling: Optional[Sampling] = DEFAULT_SAMPLING,
+                  bdd_cache: Optional[BDDCache] = None,
+                  summary: bool = False,
+                  select: Optional[Collection[FMProperties]] = None,
+                  fm_snapshot: bool = False) -> 'FMCharacterization':
+        """Load characterization from a feature model file.
+
+        The feature model is loaded from its binary snapshot if there is a fresh one next to the
+        file, and if `fm_snapshot`, the snapshot is stored after parsing the file (see `fm_binary_utils`).
+        """
+        fm_model = read_fm_file(fm_filepath, fm_snapshot)
+        characterization = FMCharacterization(fm_model, light_fact_label, lazy, bdd_budget, bdd_ordering, bdd_reordering, simplify,
+                                              approx_counting, sampling, bdd_cache, summary, select)
         characterization.metadata.name = fm_filepath.split('.')[0]
         return characterization
 
     @staticmethod
-    def from_url(fm_url_filepath: str, light_fact_label: bool = False) -> 'FMCharacterization':
+    def from_url(fm_url_filepath: str, 
+                 light_fact_label: bool = False, 
+                 lazy: bool = False,
+                 bdd_budget: Optional[BDDBudget] = None,
+                 bdd_ordering: str = DEFAULT_ORDERING,
+                 bdd_reordering: bool = False,
+                 simplify: bool = True,
+                 approx_counting: Optional[ApproxCounting] = DEFAULT_APPROX_COUNTING,
+                 sampling: Optional[Sampling] = DEFAULT_SAMPLING,
+                 bdd_cache: Optional[BDDCache] = None,
+                 summary: bool = False,
+                 select: Optional[Collection[FMProperties]] = None) -> 'FMCharacterization':
         """Load characterization from a feature model URL."""
         with tempfile.NamedTemporaryFile(suffix=".uvl", mode='w+', delete=True) as tmp:
             urllib.request.urlretrieve(fm_url_filepath, tmp.name)
-            characterization = FMCharacterization.from_path(tmp.name, light_fact_label)
+            characterization = FMCharacterization.from_path(tmp.name, light_fact_label, lazy, bdd_budget, bdd_ordering, bdd_reordering, simplify,
+                                                            approx_counting, sampling, bdd_cache, summary, select)
             characterization.metadata.name = get_filename_from_url(fm_url_filepath)
             return characterization
     
     def clean(self) -> None:
         self.analysis.clean()
 
-    def __str__(self) -> str:
-        lines = ['METADATA']
-        for property in self.metadata.get_metadata():
-            name = property.property.name
-            value = str(property.value)
-            lines.append(f'{name}: {value}')    
+    def get_members(self, fm_property: FMProperties) -> Optional[list[str]]:
+        """Return the members of the list of a metric or analysis property (e.g., the names of
+        the leaf features), also in summary mode, or None if the property has no list."""
+        members = self.metrics.get_members(fm_property)
+        if members is None:
+            members = self.analysis.get_members(fm_property)
+        return members
+
+    def save_bdd(self, directory: str) -> Optional[str]:
+        """Save the BDD of the feature model into the directory, named after the feature model.
+
+        Return the path of the file, or None if there is no BDD.
+        """
+        name = pathlib.Path(self.metadata.name).name if self.metadata.name else 'fm'
+        return self.analysis.save_bdd(directory, name)
+
+    def __enter__(self) -> 'FMCharacterization':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Release the compiled models when leaving the `with` block, even if it fails."""
+        self.clean()
+
+    def snapshot(self) -> FMSnapshot:
+        """Return the snapshot of the measures of the characterization, from which all the formats
+        are rendered.
+
+        The metrics and the analysis are computed only once (the first snapshot), while the 
+        metadata is taken from its current values (e.g., after setting its name or author).
+        """
+        if self._measures is None:
+            self._measures = (tuple(self.metrics.get_metrics(self.select)), 
+                              tuple(self.analysis.get_analysis(self.select)))
+        metrics, analysis = self._measures
+        return FMSnapshot(tuple(self.metadata.get_metadata()), metrics, analysis)
 
-        lines.append('METRICS')
-        for property in self.metrics.get_metrics():
-            indentation = SPACE * get_parents_numbers(property.property)
-            name = property.property.name
-            value = str(property.value) if property.size is None else str(property.size)
-            ratio = f' ({str(property.ratio*100)}%)' if property.ratio is not None else ''
-            lines.append(f'{indentation}{name}: {value}{ratio}')    
-        
-        lines.append('ANALYSIS')
-        for property in self.analysis.get_analysis():
-            indentation = SPACE * get_parents_numbers(property.property)
-            name = property.property.name
-            value = str(property.value) if property.size is None else str(property.size)
-            ratio = f' ({str(property.ratio*100)}%)' if property.ratio is not None else ''
-            lines.append(f'{indentation}{name}: {value}{ratio}')    
-        return '\n'.join(lines)
+    def __str__(self) -> str:
+        return self.snapshot().to_text()
 
     @staticmethod
     def json_to_text(data: dict) -> str:
+        data = decode_json(data)
         lines = ['METADATA']
         for prop in data.get("metadata", []):
             name = prop.get("name")
@@ -101,57 +170,41 @@ class FMCharacterization():
 
         return "\n".join(lines)
 
-    def to_json(self) -> dict[Any]:
-        metadata = []
-        metrics = []
-        analysis = []
-
-        for property in self.metadata.get_metadata():
-            metadata.append(property.to_dict())
-
-        for property in self.metrics.get_metrics():
-            metrics.append(property.to_dict())
-
-        for property in self.analysis.get_analysis():
-            analysis.append(property.to_dict())
-
-        result = {}
-        result['metadata'] = metadata
-        result['metrics'] = metrics
-        result['analysis'] = analysis
-        return result
-
-    def to_json_str(self) -> str:
-        result = self.to_json()
-        return json.dumps(result, indent=4)
-
-    def to_json_file(self, filepath: str = None) -> None:
-        result = self.to_json()
-        with open(filepath, 'w', encoding='utf-8') as output_file:
-            json.dump(result, output_file, indent=4)
+    def to_json(self, version: int = 1) -> dict[Any]:
+        return self.snapshot().to_json(version)
 
+    def to_json_str(self, compact: bool = False, version: int = 1) -> str:
+        return self.snapshot().to_json_str(compact, version)
 
-def get_parents_numbers(property: FMProperty) -> int:
-    if property.parent is None:
-        return 1
-    return 1 + get_parents_numbers(property.parent)
+    def to_json_file(self, filepath: str = None, compact: bool = False, compress: Optional[bool] = None, version: int = 1) -> None:
+        """Write the JSON into the file (streamed, see `FMSnapshot.write_json`), without whitespace
+        if `compact`, and compressed with gzip if `compress` (by default, if the path ends with `.gz`).
+        The `version` 2 of the schema stores the feature names and constraints once (see `json_utils`)."""
+        self.snapshot().to_json_file(filepath, compact, compress, version)
 
 
-def read_fm_file(filename: str) -> FeatureModel | None:
+def read_fm_file(filename: str, snapshot: bool = False) -> FeatureModel | None:
+    """Read the feature model of the file, or of its binary snapshot if there is a fresh one
+    (see `fm_binary_utils`). If `snapshot`, the snapshot is stored after parsing the file."""
+    model = read_fm_snapshot(filename)
+    if model is not None:
+        return model
     try:
         if filename.endswith(".uvl"):
-            return UVLReader(filename).transform()
+            model = read_uvl_file(filename)
         elif filename.endswith(".xml") or filename.endswith(".fide"):
-            return FeatureIDEReader(filename).transform()
+            model = FeatureIDEReader(filename).transform()
         elif filename.endswith(".afm"):
-            return AFMReader(filename).transform()
+            model = AFMReader(filename).transform()
         elif filename.endswith(".gfm.json"):
-            return GlencoeReader(filename).transform()
+            model = GlencoeReader(filename).transform()
         elif filename.endswith(".json"):
-            return JSONReader(filename).transform()
+            model = JSONReader(filename).transform()
     except Exception as e:
         raise FlamaException(f"Error reading feature model from {filename}: {e}")
-    return None
+    if snapshot and model is not None:
+        write_fm_snapshot(model, filename)
+    return model
 
 
 def get_filename_from_url(url: str) -> str:
@@ -0,0 +1,227 @@
+"""
+This module contains all utils related to the decomposition of feature models into
+independent components: subtrees whose cross-tree constraints do not leave the subtree.
+
+Each component is analyzed separately (as a feature model rooted at the root of the subtree),
+in parallel if they are large enough, and its results are recombined exactly by the feature tree counter.
+"""
+
+import os
+import copy
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from flamapy.core.models.ast import ASTOperation
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, Constraint
+
+from .bdd_utils import BDDBudget, BDDCounter, DEFAULT_ORDERING, build_bdd, _node_table
+from .cache_utils import BDDCache, model_hash
+from .ddnnf_utils import DEFAULT_DDNNF_MAX_NODES, DEFAULT_DDNNF_TIMEOUT, compile_ddnnf
+from .sat_utils import build_sat_model
+from .simplification_utils import SimplifiedModel
+from .tree_utils import SubtreeCounts
+
+
+# Components with fewer features are analyzed in the current process (faster than starting a worker)
+PARALLEL_MIN_FEATURES = 200
+
+# Table of nodes of a BDD (see `bdd_utils._node_table`): order of the variables, nodes and root
+BDDTable = tuple[list[str], list[tuple[str, int, int]], int]
+
+
+def independent_subtrees(fm: FeatureModel) -> dict[str, list[Constraint]]:
+    """Return the roots of the independent components with their constraints.
+
+    A constraint belongs to the subtree of the lowest common ancestor of its features,
+    unless it is violated when none of its features is selected (it would force the
+    selection of the ancestors): then it belongs to the whole tree.
+    The components are the maximal subtrees of those ancestors. Return an empty dict
+    if the feature model has no components other than the whole tree.
+    """
+    if fm.get_constraints() != fm.get_logical_constraints():
+        return {}
+    parents: dict[str, Optional[str]] = {fm.root.name: None}
+    depths = {fm.root.name: 0}
+    stack = [fm.root]
+    while stack:
+        feature = stack.pop()
+        for child in feature.get_children():
+            parents[child.name] = feature.name
+            depths[child.name] = depths[feature.name] + 1
+            stack.append(child)
+
+    constraints_roots: list[tuple[Constraint, str]] = []
+    for constraint in fm.get_logical_constraints():
+        features = constraint.get_features()
+        if not features or any(name not in parents for name in features) or not _satisfied_by_unselection(constraint):
+            return {}
+        lca = features[0]
+        for name in features[1:]:
+            lca = _lowest_common_ancestor(lca, name, parents, depths)
+        if lca == fm.root.name:
+            return {}
+        constraints_roots.append((constraint, lca))
+
+    lcas = {lca for _, lca in constraints_roots}
+    subtrees: dict[str, list[Constraint]] = {}
+    for constraint, lca in constraints_roots:
+        root = lca
+        ancestor = parents[lca]
+        while ancestor is not None:  # the highest ancestor with constraints
+            if ancestor in lcas:
+                root = ancestor
+            ancestor = parents[ancestor]
+        subtrees.setdefault(root, []).append(constraint)
+    return subtrees
+
+
+def subtree_model(root: Feature, constraints: list[Constraint]) -> FeatureModel:
+    """Return a copy of the subtree as a feature model, with the given constraints."""
+    # Cut the reference to the parent so that only the subtree is copied
+    memo = {id(root.parent): None} if root.parent is not None else {}
+    return FeatureModel(copy.deepcopy(root, memo), copy.deepcopy(constraints))
+
+
+def analyze_subtrees(fm: FeatureModel,
+                     budget: Optional[BDDBudget] = None,
+                     ordering: str = DEFAULT_ORDERING,
+                     reordering: bool = False,
+                     simplify: bool = True,
+                     cache: Optional[BDDCache] = None) -> Optional[dict[str, SubtreeCounts]]:
+    """Analyze the independent components of the feature model.
+
+    The components with at least PARALLEL_MIN_FEATURES features whose BDDs are not cached
+    are analyzed in parallel (if there are two at least), and the others in the current process.
+    The cache is only read and written by the current process: the workers send back the
+    tables of their BDDs.
+    Return None if the feature model has no components other than the whole tree,
+    or if any of them cannot be analyzed exactly.
+    """
+    subtrees = independent_subtrees(fm)
+    if not subtrees:
+        return None
+    features = {feature.name: feature for feature in fm.get_features()}
+    models = {name: subtree_model(features[name], constraints) for name, constraints in subtrees.items()}
+    keys = {} if cache is None else {name: model_hash(model, ordering, reordering) for name, model in models.items()}
+    parallel = [name for name, model in models.items()
+                if len(model.get_features()) >= PARALLEL_MIN_FEATURES and (cache is None or keys[name] not in cache)]
+    results: dict[str, Optional[SubtreeCounts]] = {}
+    if len(parallel) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(len(parallel), os.cpu_count() or 1)) as executor:
+                futures = {name: executor.submit(_analyze_subtree, models[name], budget, ordering, reordering, simplify)
+                           for name in parallel}
+                analyzed = {name: future.result() for name, future in futures.items()}
+        except Exception as e:  # e.g., no multiprocessing, a killed worker or a model that cannot be pickled
+            logging.warning(f'Warning: the components cannot be analyzed in parallel, analyzing them one after another. ({e})')
+        else:
+            for name, (result, table) in analyzed.items():
+                results[name] = result
+                if cache is not None and table is not None:
+                    cache.put(keys[name], *table)
+    for name, model in models.items():
+        if name not in results:
+            results[name] = analyze_subtree(model, budget, ordering, reordering, simplify, cache)
+    if any(result is None for result in results.values()):
+        return None
+    return results
+
+
+def analyze_subtree(fm: FeatureModel,
+                    budget: Optional[BDDBudget] = None,
+                    ordering: str = DEFAULT_ORDERING,
+                    reordering: bool = False,
+                    simplify: bool = True,
+                    cache: Optional[BDDCache] = None) -> Optional[SubtreeCounts]:
+    """Analyze a component exactly with its BDD, or with its d-DNNF if the BDD fails."""
+    return _analyze_subtree(fm, budget, ordering, reordering, simplify, cache)[0]
+
+
+def _analyze_subtree(fm: FeatureModel,
+                     budget: Optional[BDDBudget],
+                     ordering: str,
+                     reordering: bool,
+                     simplify: bool,
+                     cache: Optional[BDDCache] = None) -> tuple[Optional[SubtreeCounts], Optional[BDDTable]]:
+    """Analyze a component (see `analyze_subtree`). Without a cache (e.g., in a worker process),
+    also return the table of nodes of its BDD so that it can be cached by the caller."""
+    try:
+        bdd_model = build_bdd(fm, budget, ordering, reordering, cache)
+        bdd_counter = BDDCounter(bdd_model)
+        table = None if cache is not None else (bdd_model.vars_order, *_node_table(bdd_model))
+        return SubtreeCounts(bdd_counter.configurations_number(),
+                             bdd_counter.feature_probabilities(),
+                             bdd_counter.product_distribution(),
+                             bdd_counter.unique_features(),
+                             'BDD'), table
+    except Exception as e:
+        logging.warning(f'Warning: the BDD of the component {fm.root.name} cannot be built. ({e})')
+    try:
+        sat_model = build_sat_model(fm)
+        timeout = DEFAULT_DDNNF_TIMEOUT if budget is None else budget.timeout
+        max_nodes = DEFAULT_DDNNF_MAX_NODES if budget is None else budget.max_nodes
+        simplified = SimplifiedModel(sat_model) if simplify else None
+        ddnnf_model = compile_ddnnf(sat_model, timeout, max_nodes, simplified)
+        configurations = ddnnf_model.configurations_number()
+        counts = ddnnf_model.variable_counts()
+        return SubtreeCounts(configurations,
+                             {name: counts[var] / configurations if configurations > 0 else 0.0
+                              for name, var in sat_model.variables.items()},
+                             ddnnf_model.product_distribution(),
+                             [name for name, var in sat_model.variables.items() if counts[var] == 1],
+                             'd-DNNF'), None
+    except Exception as e:
+        logging.warning(f'Warning: the d-DNNF of the component {fm.root.name} cannot be compiled. ({e})')
+    return None, None
+
+
+def _satisfied_by_unselection(constraint: Constraint) -> bool:
+    """Return true if the constraint holds when none of its features is selected.
+
+    The AST is evaluated directly (its CNF may be exponential).
+    """
+    values: dict[int, bool] = {}  # id of the node -> value
+    stack = [(constraint.ast.root, False)]
+    while stack:
+        node, operands_evaluated = stack.pop()
+        if node.is_term():
+            values[id(node)] = False
+            continue
+        if not operands_evaluated:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in (node.left, node.right) if operand is not None)
+            continue
+        left = values[id(node.left)]
+        right = values[id(node.right)] if node.right is not None else None
+        operation = node.data
+        if operation == ASTOperation.NOT:
+            values[id(node)] = not left
+        elif operation == ASTOperation.AND:
+            values[id(node)] = left and right
+        elif operation == ASTOperation.OR:
+            values[id(node)] = left or right
+        elif operation in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+            values[id(node)] = not left or right
+        elif operation == ASTOperation.EXCLUDES:
+            values[id(node)] = not (left and right)
+        elif operation == ASTOperation.EQUIVALENCE:
+            values[id(node)] = left == right
+        elif operation == ASTOperation.XOR:
+            values[id(node)] = left != right
+        else:
+            return False
+    return values[id(constraint.ast.root)]
+
+
+def _lowest_common_ancestor(feature1: str,
+                            feature2: str,
+                            parents: dict[str, Optional[str]],
+                            depths: dict[str, int]) -> str:
+    while depths[feature1] > depths[feature2]:
+        feature1 = parents[feature1]
+    while depths[feature2] > depths[feature1]:
+        feature2 = parents[feature2]
+    while feature1 != feature2:
+        feature1, feature2 = parents[feature1], parents[feature2]
+    return feature1
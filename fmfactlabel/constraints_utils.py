@@ -2,11 +2,177 @@
 This module contains all utils related to the management of cross-tree constraints.
 """
 
+from typing import Any, Optional
+
 from flamapy.core.models import AST, ASTOperation
 from flamapy.core.models import ast as ast_utils
+from flamapy.core.models.ast import Node, LOGICAL_OPERATORS, AGGREGATION_OPERATORS, ARITHMETIC_OPERATORS
 from flamapy.metamodels.fm_metamodel.models import Constraint
 
 
+# Kinds of cross-tree constraints (see `ConstraintClassifier`)
+SINGLE_FEATURE = 'single-feature'
+REQUIRES = 'requires'
+EXCLUDES = 'excludes'
+PSEUDO_COMPLEX = 'pseudo-complex'
+STRICT_COMPLEX = 'strict-complex'
+AGGREGATION = 'aggregation'
+ARITHMETIC = 'arithmetic'
+OTHER = 'other'
+
+# Flags of the operators and operands of the constraints (e.g., for the language level)
+ARITHMETIC_OPERATOR = 1
+AGGREGATION_OPERATOR = 2
+LEN_OPERATOR = 4
+STRING_LITERAL = 8
+_OPERATOR_SYMBOLS = {**{op: ARITHMETIC_OPERATOR for op in ARITHMETIC_OPERATORS}, 
+                     **{op: AGGREGATION_OPERATOR for op in AGGREGATION_OPERATORS}}
+_OPERATOR_SYMBOLS[ASTOperation.LEN] |= LEN_OPERATOR
+
+# Kinds of the literals of the clauses
+_POSITIVE = 1
+_NEGATIVE = 2
+_NOT_TERM = 4  # e.g., an operation left unsimplified (it is never part of a simple clause)
+
+
+class ConstraintClassifier():
+    """Classifier of the cross-tree constraints of a feature model by kind, in linear time.
+
+    Besides its kind, each constraint is described by its pretty string, its features and
+    the flags of its symbols (see `node_symbols`).
+    The ASTs of the constraints are interned into a hash-consed DAG: identical subformulas (in the
+    same or in different constraints) are a single canonical node. The summaries of the clauses of
+    the complex constraints (see `clauses_summary`) are computed once per canonical node, and the
+    pretty string, the kind and the features once per distinct constraint. The constraints
+    identical to a previous one are reported as duplicates.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: dict[tuple[Any, ...], Node] = {}  # (type, data, left, right) -> canonical node
+        self._summaries: dict[tuple[Node, bool, bool], tuple[int, int, int, int, bool]] = {}
+        self._constraints: dict[Node, tuple[str, str, list[str], int]] = {}
+
+    def classify(self, constraint: Constraint) -> tuple[str, str, list[str], int, bool]:
+        """Return the pretty string, the kind, the features and the symbols of the constraint, 
+        and whether it is a duplicate of a constraint already classified."""
+        root = self.intern(constraint.ast.root)
+        classification = self._constraints.get(root)
+        if classification is not None:
+            return *classification, True
+        canonical = Constraint(constraint.name, AST(root))
+        features, symbols = node_symbols(root)
+        classification = (pretty_str(root), constraint_kind(canonical, self._summaries), features, symbols)
+        self._constraints[root] = classification
+        return *classification, False
+
+    def intern(self, root: Node) -> Node:
+        """Return the canonical node of the formula."""
+        canonical: dict[int, Node] = {}  # Nodes of the formula by id
+        stack = [(root, False)]
+        while stack:
+            node, children_interned = stack.pop()
+            if id(node) in canonical:
+                continue
+            children = [child for child in (node.right, node.left) if child is not None]
+            if not children_interned and children:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            left = None if node.left is None else canonical[id(node.left)]
+            right = None if node.right is None else canonical[id(node.right)]
+            key = (type(node.data), node.data, left, right)  # The canonical nodes are hashed by identity
+            interned = self._nodes.get(key)
+            if interned is None:
+                interned = self._nodes[key] = Node(node.data, left, right)
+            canonical[id(node)] = interned
+        return canonical[id(root)]
+
+
+def constraint_kind(constraint: Constraint, 
+                    summaries: Optional[dict[tuple[Node, bool, bool], tuple[int, int, int, int, bool]]] = None) -> str:
+    """Return the kind of the constraint (see `clauses_summary` for the summaries)."""
+    operators = set(constraint.ast.get_operators())
+    if operators <= set(LOGICAL_OPERATORS):
+        if is_single_feature_constraint(constraint):
+            return SINGLE_FEATURE
+        if is_requires_constraint(constraint):
+            return REQUIRES
+        if is_excludes_constraint(constraint):
+            return EXCLUDES
+        _, _, clauses, _, simple = clauses_summary(constraint.ast.root, summaries)
+        return PSEUDO_COMPLEX if clauses > 1 and simple else STRICT_COMPLEX
+    if operators & set(AGGREGATION_OPERATORS):
+        return AGGREGATION
+    if operators & set(ARITHMETIC_OPERATORS):
+        return ARITHMETIC
+    return OTHER
+
+
+def pretty_str(root: Node) -> str:
+    """Return the pretty string of the formula, as `Node.pretty_str` (without recursion)."""
+    parts = []
+    stack: list[Node | str] = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        data = node.data.value if node.is_op() else str(node.data)
+        if node.is_unique_term():
+            items = [data]
+        elif node.is_unary_op():
+            items = [f'{data} ', *_pretty_operand(node.left)]
+        elif node.is_aggregate_op():
+            right = [', ', *_pretty_operand(node.right)] if node.right is not None else []
+            items = [f'{data}(', *_pretty_operand(node.left), *right, ')']
+        else:  # binary operation
+            items = [*_pretty_operand(node.left), f' {data} ', *_pretty_operand(node.right)]
+        stack.extend(reversed(items))
+    return ''.join(parts)
+
+
+def _pretty_operand(node: Optional[Node]) -> list[Node | str]:
+    if node is None:
+        return ['']
+    if not node.is_op():
+        return [str(node)]
+    return ['(', node, ')'] if node.is_binary_op() else [node]
+
+
+def node_symbols(root: Node) -> tuple[list[str], int]:
+    """Return the names of the features of the formula, as `Constraint.get_features`, and the 
+    flags of its operators and operands (see `ARITHMETIC_OPERATOR`), as `AST.get_operators`
+    and `AST.get_operands` (visiting each node of a DAG once)."""
+    features = set()
+    symbols = 0
+    visited = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is None or id(node) in visited:
+            continue
+        visited.add(id(node))
+        if node.is_op():
+            symbols |= _OPERATOR_SYMBOLS.get(node.data, 0)
+        elif isinstance(node.data, str) and node.data.startswith("'"):
+            symbols |= STRING_LITERAL
+        if node.is_unique_term():
+            if not isinstance(node.data, (int, float)) and not node.data.startswith("'"):
+                features.add(node.data)
+        elif node.is_unary_op():
+            stack.append(node.left)
+        elif node.is_binary_op():
+            stack.append(node.right)
+            stack.append(node.left)
+    return list(features), symbols
+
+
+def is_single_feature_constraint(constraint: Constraint) -> bool:
+    """Return true if the constraint is a single feature or its negation."""
+    root_op = constraint.ast.root
+    return root_op.is_term() or (root_op.data == ASTOperation.NOT and root_op.left.is_term())
+
+
 def is_simple_constraint(constraint: Constraint) -> bool:
     """Return true if the constraint is a simple constraint (requires or excludes)."""
     return is_requires_constraint(constraint) or is_excludes_constraint(constraint)
@@ -50,15 +216,113 @@ def is_excludes_constraint(constraint: Constraint) -> bool:
 def is_pseudo_complex_constraint(constraint: Constraint) -> bool:
     """Return true if the constraint is a pseudo-complex constraint 
     (i.e., it can be transformed to a set of simple constraints)."""
-    split_ctcs = split_constraint(constraint)
-    return len(split_ctcs) > 1 and all(is_simple_constraint(ctc) for ctc in split_ctcs)
+    _, _, clauses, _, simple = clauses_summary(constraint.ast.root)
+    return clauses > 1 and simple
 
 
 def is_strict_complex_constraint(constraint: Constraint) -> bool:
     """Return true if the constraint is a strict-complex constraint 
     (i.e., it cannot be transformed to a set of simple constraints)."""
-    split_ctcs = split_constraint(constraint)
-    return any(is_complex_constraint(ctc) for ctc in split_ctcs)
+    _, _, _, _, simple = clauses_summary(constraint.ast.root)
+    return not simple
+
+
+def clauses_summary(root: Node, 
+                    summaries: Optional[dict[tuple[Node, bool, bool], tuple[int, int, int, int, bool]]] = None) -> tuple[int, int, int, int, bool]:
+    """Return a summary of the clauses of the CNF of the formula, as `split_constraint` computes it
+    (simplification, negation propagation and distribution of the disjunctions), without expanding it.
+
+    The summary is the minimum and maximum number of literals of the clauses (up to 3), the
+    number of clauses (up to 2), the kinds of the literals (only for clauses of one literal),
+    and whether all the clauses are simple (requires or excludes). The clauses of a conjunction
+    are those of its operands, and the clauses of a disjunction are the disjunctions of each
+    clause of an operand with each clause of the other, so that the summary of each node (and
+    polarity) is computed from those of its operands in a single pass over the formula.
+    The summaries of the nodes are memoized in `summaries` (e.g., for the nodes shared by the 
+    constraints of a `ConstraintClassifier`).
+    """
+    memo = {} if summaries is None else summaries  # The nodes are hashed by identity
+    # Each formula (node, negated, raw) is expanded into an expression over the formulas of its
+    # operands, and summarized after them (an explicit stack: the formulas may be deep)
+    stack = [((root, False, False), False)]
+    while stack:
+        formula, operands_summarized = stack.pop()
+        if formula in memo:
+            continue
+        expression = _expand(*formula)
+        if operands_summarized:
+            memo[formula] = _summary(expression, memo)
+        else:
+            stack.append((formula, True))
+            stack.extend((operand, False) for operand in _formulas(expression) if operand not in memo)
+    return memo[(root, False, False)]
+
+
+def _expand(node: Node, negated: bool, raw: bool) -> Any:
+    """Return the expression of the formula in negation normal form over the formulas of its operands.
+
+    The expression is a kind of literal, a formula (node, negated, raw), or an operation 
+    ('and' or 'or', expression, expression). The formula is simplified as `ast_utils.simplify_formula`
+    does, unless it is raw (the right operand of a XOR is left unsimplified by flamapy).
+    """
+    while node.data == ASTOperation.NOT:
+        node, negated = node.left, not negated
+    conjunction, disjunction = ('or', 'and') if negated else ('and', 'or')
+    operation = node.data
+    if operation == ASTOperation.AND:
+        return (conjunction, (node.left, negated, raw), (node.right, negated, raw))
+    if operation == ASTOperation.OR:
+        return (disjunction, (node.left, negated, raw), (node.right, negated, raw))
+    if not raw:
+        left, right = node.left, node.right
+        if operation in (ASTOperation.REQUIRES, ASTOperation.IMPLIES):  # !P v Q
+            return (disjunction, (left, not negated, False), (right, negated, False))
+        if operation == ASTOperation.EXCLUDES:  # !P v !Q
+            return (disjunction, (left, not negated, False), (right, not negated, False))
+        if operation == ASTOperation.EQUIVALENCE:  # As flamapy simplifies it: (!P v Q) ∧ (!Q v (!P v Q))
+            implies = (disjunction, (left, not negated, False), (right, negated, False))
+            return (conjunction, implies, (disjunction, (right, not negated, False), implies))
+        if operation == ASTOperation.XOR:  # As flamapy simplifies it: (!(P ∧ !Q) ∧ Q) v Q
+            return (disjunction,
+                    (conjunction, (disjunction, (left, not negated, False), (right, negated, False)), (right, negated, False)),
+                    (right, negated, True))
+    if not node.is_term():
+        return _NOT_TERM
+    return _NEGATIVE if negated else _POSITIVE
+
+
+def _formulas(expression: Any) -> list[tuple[Node, bool, bool]]:
+    """Return the formulas of the operands of the expression (without repetitions)."""
+    formulas = []
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        if isinstance(expression, int):
+            continue
+        if isinstance(expression[0], str):
+            stack.extend(expression[1:])
+        elif expression not in formulas:
+            formulas.append(expression)
+    return formulas
+
+
+def _summary(expression: Any, memo: dict[tuple[Node, bool, bool], tuple[int, int, int, int, bool]]) -> tuple[int, int, int, int, bool]:
+    """Return the summary of the clauses of the expression from the summaries of its formulas."""
+    if isinstance(expression, int):  # A clause with a literal
+        return 1, 1, 1, expression, False
+    if not isinstance(expression[0], str):
+        return memo[expression]
+    operation, left, right = expression
+    min_left, max_left, clauses_left, kinds_left, simple_left = _summary(left, memo)
+    min_right, max_right, clauses_right, kinds_right, simple_right = _summary(right, memo)
+    if operation == 'and':  # The clauses of both operands
+        return (min(min_left, min_right), max(max_left, max_right), min(2, clauses_left + clauses_right), 
+                kinds_left | kinds_right, simple_left and simple_right)
+    # Each clause of an operand with each clause of the other: they are simple if they are
+    # two terms (literals of one clause each) that are not both positive.
+    simple = (max_left == 1 and max_right == 1 and not (kinds_left | kinds_right) & _NOT_TERM and 
+              not (kinds_left & _POSITIVE and kinds_right & _POSITIVE))
+    return min(3, min_left + min_right), min(3, max_left + max_right), min(2, clauses_left * clauses_right), 0, simple
 
 
 def get_new_ctc_name(ctcs_names: list[str], prefix_name: str) -> str:
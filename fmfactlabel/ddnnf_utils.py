@@ -0,0 +1,354 @@
+"""
+This module contains all utils related to the d-DNNF compilation of feature models.
+
+The CNF formula of the feature model (optionally simplified) is compiled top-down into a
+smooth d-DNNF (deterministic, decomposable negation normal form) by exhaustive DPLL with unit propagation,
+decomposition into independent components, and caching of components.
+The d-DNNF supports exact counting of configurations, of configurations per feature
+(feature inclusion probabilities), and of configurations per number of selected features
+(product distribution), in time linear in its size.
+"""
+
+import time
+from typing import Generator, Optional
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+
+from .polynomial_utils import binomial_coefficients, polynomial_sum, polynomials_product
+from .simplification_utils import SimplifiedModel, propagate
+
+
+# Kinds of d-DNNF nodes
+FALSE = 'false'
+LITERAL = 'literal'
+FREE = 'free'  # conjunction of tautologies (v or not v) for a set of free variables
+AND = 'and'  # decomposable conjunction
+OR = 'or'  # deterministic disjunction (decision on a variable)
+
+# Default budget of the compilation
+DEFAULT_DDNNF_TIMEOUT = 30.0  # seconds
+DEFAULT_DDNNF_MAX_NODES = 1_000_000
+
+# Constant nodes
+FALSE_NODE = 0
+TRUE_NODE = 1  # empty conjunction
+
+
+class DDNNFBudgetExceeded(FlamaException):
+    """The compilation of the d-DNNF exceeded its budget."""
+
+
+class DDNNF():
+    """Smooth d-DNNF over the variables 1..n of a CNF formula.
+
+    Nodes are stored in topological order (children before parents) as pairs (kind, data):
+    a literal for LITERAL, a tuple of variables for FREE, and a tuple of children for AND and OR.
+    Every node mentions exactly the same variables as each of its disjuncts (smoothness).
+    """
+
+    def __init__(self, n_vars: int) -> None:
+        self.n_vars = n_vars
+        self.nodes: list[tuple[str, object]] = [(FALSE, None), (AND, ())]  # false and true
+        self.root: int = FALSE_NODE
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add_node(self, kind: str, data: object) -> int:
+        self.nodes.append((kind, data))
+        return len(self.nodes) - 1
+
+    def node_counts(self) -> list[int]:
+        """Return the number of models of each node (over the variables it mentions)."""
+        counts = []
+        for kind, data in self.nodes:
+            if kind == LITERAL:
+                counts.append(1)
+            elif kind == FREE:
+                counts.append(2 ** len(data))
+            elif kind == AND:
+                count = 1
+                for child in data:
+                    count *= counts[child]
+                counts.append(count)
+            elif kind == OR:
+                counts.append(sum(counts[child] for child in data))
+            else:
+                counts.append(0)
+        return counts
+
+    def configurations_number(self) -> int:
+        """Return the number of models of the formula."""
+        return self.node_counts()[self.root]
+
+    def variable_counts(self) -> list[int]:
+        """Return the number of models in which each variable is true (index 0 is unused).
+
+        Computed by a single backward pass of the derivatives of the count with respect to
+        each node (Darwiche 2003), in time linear in the size of the d-DNNF.
+        """
+        counts = self.node_counts()
+        result = [0] * (self.n_vars + 1)
+        if counts[self.root] == 0:
+            return result
+        derivatives = [0] * len(self.nodes)
+        derivatives[self.root] = 1
+        for node in range(self.root, -1, -1):
+            derivative = derivatives[node]
+            if derivative == 0:
+                continue
+            kind, data = self.nodes[node]
+            if kind == LITERAL:
+                if data > 0:
+                    result[data] += derivative
+            elif kind == FREE:
+                half = derivative * 2 ** (len(data) - 1)
+                for var in data:
+                    result[var] += half
+            elif kind == AND:
+                for child in data:  # the rest of the conjunction: exact division (counts are positive)
+                    derivatives[child] += derivative * (counts[node] // counts[child])
+            elif kind == OR:
+                for child in data:
+                    derivatives[child] += derivative
+        return result
+
+    def product_distribution(self) -> list[int]:
+        """Return the number of models with 0, 1, ..., n true variables."""
+        distributions: list[list[int]] = []
+        for kind, data in self.nodes:
+            if kind == LITERAL:
+                distributions.append([0, 1] if data > 0 else [1])
+            elif kind == FREE:
+                distributions.append(binomial_coefficients(len(data)))
+            elif kind == AND:
+                distributions.append(polynomials_product([distributions[child] for child in data]))
+            elif kind == OR:
+                distribution = []
+                for child in data:
+                    distribution = polynomial_sum(distribution, distributions[child])
+                distributions.append(distribution)
+            else:
+                distributions.append([])
+        distribution = distributions[self.root]
+        return distribution + [0] * (self.n_vars + 1 - len(distribution))
+
+
+def compile_ddnnf(sat_model: PySATModel,
+                  timeout: Optional[float] = DEFAULT_DDNNF_TIMEOUT,
+                  max_nodes: Optional[int] = DEFAULT_DDNNF_MAX_NODES,
+                  simplified: Optional[SimplifiedModel] = None) -> DDNNF:
+    """Compile the CNF formula of the SAT model into a smooth d-DNNF.
+
+    If the `simplified` formula of the SAT model is given, it is compiled instead
+    and the result is expanded back to the original variables.
+    Raise DDNNFBudgetExceeded if the compilation exceeds the timeout (in seconds)
+    or the maximum number of nodes (None for no limit).
+    """
+    if simplified is None:
+        n_vars = len(sat_model.variables)
+        clauses = [tuple(sorted(set(clause), key=abs)) for clause in sat_model.get_all_clauses().clauses]
+    elif not simplified.valid:
+        return DDNNF(simplified.n_original)
+    else:
+        n_vars = simplified.n_vars
+        clauses = simplified.clauses
+    compiler = _DDNNFCompiler(n_vars, timeout, max_nodes)
+    compiler.ddnnf.root = compiler.run(compiler.compile(clauses, set(range(1, n_vars + 1))))
+    if simplified is None:
+        return compiler.ddnnf
+    return expand_ddnnf(compiler.ddnnf, simplified)
+
+
+def expand_ddnnf(ddnnf: DDNNF, simplified: SimplifiedModel) -> DDNNF:
+    """Return the d-DNNF over the original variables of the d-DNNF of a simplified formula.
+
+    Each literal of a reduced variable becomes the conjunction of the literals of its atomic set,
+    each free reduced variable becomes the decision between all and none of its atomic set,
+    and the fixed variables are conjoined to the root. The expansion is linear.
+    """
+    expanded = DDNNF(simplified.n_original)
+    if ddnnf.root == FALSE_NODE:
+        return expanded
+    literals: dict[int, int] = {}
+
+    def literal(lit: int) -> int:
+        node = literals.get(lit)
+        if node is None:
+            node = expanded.add_node(LITERAL, lit)
+            literals[lit] = node
+        return node
+
+    def atomic_set(lit: int) -> int:
+        members = simplified.atomic_sets[abs(lit)]
+        if len(members) == 1:
+            return literal(members[0] if lit > 0 else -members[0])
+        return expanded.add_node(AND, tuple(literal(var if lit > 0 else -var) for var in members))
+
+    mapping = [FALSE_NODE, TRUE_NODE]
+    for kind, data in ddnnf.nodes[2:]:
+        if kind == LITERAL:
+            mapping.append(atomic_set(data))
+        elif kind == FREE:
+            children = [expanded.add_node(OR, (atomic_set(var), atomic_set(-var)))
+                        for var in data if len(simplified.atomic_sets[var]) > 1]
+            singles = tuple(sorted(simplified.atomic_sets[var][0]
+                                   for var in data if len(simplified.atomic_sets[var]) == 1))
+            if singles:
+                children.append(expanded.add_node(FREE, singles))
+            mapping.append(children[0] if len(children) == 1 else expanded.add_node(AND, tuple(children)))
+        elif kind in (AND, OR):
+            mapping.append(expanded.add_node(kind, tuple(mapping[child] for child in data)))
+        else:
+            mapping.append(FALSE_NODE)
+    children = [literal(var if value else -var) for var, value in sorted(simplified.fixed.items())]
+    if mapping[ddnnf.root] != TRUE_NODE:
+        children.append(mapping[ddnnf.root])
+    if not children:
+        expanded.root = TRUE_NODE
+    elif len(children) == 1:
+        expanded.root = children[0]
+    else:
+        expanded.root = expanded.add_node(AND, tuple(children))
+    return expanded
+
+
+class _DDNNFCompiler():
+    """Top-down compiler (exhaustive DPLL with component caching) into a smooth d-DNNF.
+
+    The compilation of each formula is a generator that yields the compilation of its
+    subformulas and receives their nodes, so that `run` drives the whole search with an
+    explicit stack instead of recursion (the depth of the search grows with the variables).
+    """
+
+    def __init__(self, n_vars: int, timeout: Optional[float], max_nodes: Optional[int]) -> None:
+        self.ddnnf = DDNNF(n_vars)
+        self.timeout = timeout
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.max_nodes = max_nodes
+        self.cache: dict[frozenset[tuple[int, ...]], int] = {}
+        self.literals: dict[int, int] = {}
+
+    @staticmethod
+    def run(compilation: Generator) -> int:
+        """Return the node of a compilation, driving its subcompilations with a stack."""
+        stack = [compilation]
+        node = None
+        while stack:
+            try:
+                subcompilation = stack[-1].send(node)
+            except StopIteration as result:
+                stack.pop()
+                node = result.value
+                continue
+            stack.append(subcompilation)
+            node = None
+        return node
+
+    def compile(self, clauses: list[tuple[int, ...]], variables: set[int]) -> Generator:
+        """Compile the formula into a node mentioning exactly the given variables."""
+        simplified = propagate(clauses, ())
+        if simplified is None:
+            return FALSE_NODE
+        units, clauses = simplified
+        children = [self.literal(lit) for lit in units]
+        free_vars = set(variables).difference(abs(lit) for lit in units)
+        for component in components(clauses):
+            component_vars = {abs(lit) for clause in component for lit in clause}
+            free_vars -= component_vars
+            child = yield self.compile_component(component, component_vars)
+            if child == FALSE_NODE:
+                return FALSE_NODE
+            children.append(child)
+        if free_vars:
+            children.append(self.add(FREE, tuple(sorted(free_vars))))
+        if not children:
+            return TRUE_NODE
+        if len(children) == 1:
+            return children[0]
+        return self.add(AND, tuple(children))
+
+    def compile_component(self, clauses: list[tuple[int, ...]], variables: set[int]) -> Generator:
+        """Compile a connected component (without unit clauses) into a node."""
+        key = frozenset(clauses)
+        node = self.cache.get(key)
+        if node is not None:
+            return node
+        self.check_budget()
+        var = branching_variable(clauses)
+        branches = []
+        for lit in (var, -var):
+            simplified = propagate(clauses, (lit,))
+            if simplified is None:
+                continue
+            units, reduced = simplified
+            child = yield self.compile(reduced, variables.difference(abs(unit) for unit in units))
+            if child == TRUE_NODE and len(units) == 1:
+                branches.append(self.literal(units[0]))
+            elif child != FALSE_NODE:
+                literals = tuple(self.literal(unit) for unit in units)
+                branches.append(self.add(AND, literals if child == TRUE_NODE else literals + (child,)))
+        if not branches:
+            node = FALSE_NODE
+        elif len(branches) == 1:
+            node = branches[0]
+        else:
+            node = self.add(OR, tuple(branches))
+        self.cache[key] = node
+        return node
+
+    def literal(self, lit: int) -> int:
+        node = self.literals.get(lit)
+        if node is None:
+            node = self.add(LITERAL, lit)
+            self.literals[lit] = node
+        return node
+
+    def add(self, kind: str, data: object) -> int:
+        if self.max_nodes is not None and len(self.ddnnf) >= self.max_nodes:
+            raise DDNNFBudgetExceeded(f'd-DNNF compilation exceeded the node budget ({self.max_nodes} nodes).')
+        return self.ddnnf.add_node(kind, data)
+
+    def check_budget(self) -> None:
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DDNNFBudgetExceeded(f'd-DNNF compilation exceeded the time budget ({self.timeout} s).')
+
+
+def components(clauses: list[tuple[int, ...]]) -> list[list[tuple[int, ...]]]:
+    """Split the clauses into connected components (clauses sharing variables)."""
+    parent: dict[int, int] = {}
+
+    def find(var: int) -> int:
+        root = var
+        while parent[root] != root:
+            root = parent[root]
+        while parent[var] != root:
+            parent[var], var = root, parent[var]
+        return root
+
+    for clause in clauses:
+        first = abs(clause[0])
+        parent.setdefault(first, first)
+        first_root = find(first)
+        for lit in clause[1:]:
+            var = abs(lit)
+            parent.setdefault(var, var)
+            var_root = find(var)
+            if var_root != first_root:
+                parent[var_root] = first_root
+    groups: dict[int, list[tuple[int, ...]]] = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), []).append(clause)
+    return list(groups.values())
+
+
+def branching_variable(clauses: list[tuple[int, ...]]) -> int:
+    """Return the variable with more occurrences in the clauses (the smallest on ties)."""
+    occurrences: dict[int, int] = {}
+    for clause in clauses:
+        for lit in clause:
+            var = abs(lit)
+            occurrences[var] = occurrences.get(var, 0) + 1
+    return max(occurrences, key=lambda var: (occurrences[var], -var))
+
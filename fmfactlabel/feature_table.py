@@ -0,0 +1,261 @@
+"""
+This module contains the columnar representation of a feature model (`FeatureTable`),
+built once in a single traversal and shared by the metadata, the metrics and the analysis,
+instead of walking the object graph of flamapy in each of them.
+"""
+
+import array
+from functools import cached_property
+from typing import Optional
+
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, FeatureType, Relation, Constraint
+from flamapy.metamodels.fm_metamodel.operations.fm_language_level import LanguageLevel, MajorLevel, MinorLevel
+
+from . import constraints_utils
+from .constraints_utils import ConstraintClassifier
+
+
+# Flags of each feature
+ROOT = 1 << 0
+TOP = 1 << 1
+SOLITARY = 1 << 2
+GROUPED = 1 << 3
+LEAF = 1 << 4
+ABSTRACT = 1 << 5
+MULTI = 1 << 6
+TYPED = 1 << 7
+NUMERICAL = 1 << 8
+INTEGER = 1 << 9
+REAL = 1 << 10
+STRING = 1 << 11
+ATTRIBUTES = 1 << 12
+DETACHED = 1 << 13  # Below a relation that is neither mandatory, optional nor a group
+
+# Kinds of each relation
+OTHER = 0
+MANDATORY = 1
+OPTIONAL = 2
+OR = 3
+ALTERNATIVE = 4
+MUTEX = 5
+CARDINALITY = 6
+GROUPS = (OR, ALTERNATIVE, MUTEX, CARDINALITY)
+
+
+class FeatureTable():
+    """Columnar representation of a feature model.
+
+    The features are identified by their position in the pre-order traversal of the feature
+    tree (the root is 0), and each column holds a value per feature: its name, its parent
+    (-1 for the root), its depth, its flags (see `ROOT`), its number of children and of
+    attributes. The relations are identified by their position in the same traversal, with
+    their kind (see `MANDATORY`) and their parent. The constraints are tabulated the first
+    time they are needed (see `ConstraintTable`).
+    The features below a relation that is neither mandatory, optional nor a group are flagged
+    as `DETACHED` (the metrics of the feature tree do not traverse them).
+    """
+
+    def __init__(self, model: FeatureModel) -> None:
+        self.fm = model
+        self.features: list[Feature] = []
+        self.names: list[str] = []
+        self.index: dict[str, int] = {}
+        self.parents = array.array('l')
+        self.depths = array.array('l')
+        self.flags = array.array('H')
+        self.children = array.array('l')  # Children in mandatory, optional and group relations
+        self.attributes = array.array('l')
+        self.attribute_names: set[str] = set()  # Of the features that are not detached
+        self.relations: list[Relation] = []
+        self.relation_kinds = array.array('B')
+        self.relation_parents = array.array('l')
+        if model is not None and model.root is not None:
+            self._traverse(model.root)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_feature(self, name: str) -> Optional[Feature]:
+        """Return the (first) feature with the name, as `FeatureModel.get_feature_by_name`."""
+        index = self.index.get(name)
+        return None if index is None else self.features[index]
+
+    @cached_property
+    def constraints(self) -> 'ConstraintTable':
+        return ConstraintTable([] if self.fm is None else self.fm.get_constraints(), self)
+
+    @cached_property
+    def language_level(self) -> LanguageLevel:
+        """Language level of the feature model, as the `FMLanguageLevel` operation."""
+        flags = set(self.flags)
+        constraints = self.constraints
+        major = MajorLevel.BOOLEAN
+        if any(feature_flags & TYPED for feature_flags in flags):
+            major = MajorLevel.TYPE
+        elif constraints.any_symbol(constraints_utils.ARITHMETIC_OPERATOR):
+            major = MajorLevel.ARITHMETIC
+        minors = set()
+        if any(constraints.is_string_constraint(row) for row in range(len(constraints))):
+            minors.add(MinorLevel.STRING_CONSTRAINTS)
+        if any(feature_flags & MULTI for feature_flags in flags):
+            minors.add(MinorLevel.FEATURE_CARDINALITY)
+        if constraints.any_symbol(constraints_utils.AGGREGATION_OPERATOR):
+            minors.add(MinorLevel.AGGREGATE_FUNCTION)
+        if CARDINALITY in self.relation_kinds:
+            minors.add(MinorLevel.GROUP_CARDINALITY)
+        return LanguageLevel(major, minors)
+
+    def _traverse(self, root: Feature) -> None:
+        """Fill the columns in a single pre-order traversal with an explicit stack
+        (the depth of the tree is not bounded by the recursion limit)."""
+        # Items are (feature, parent, depth, flags given by the parent) or (relation, parent, depth, kind).
+        # A relation is popped right before its children, in the order of the recursive traversal.
+        stack: list[tuple[Feature | Relation, int, int, int]] = [(root, -1, 0, ROOT | SOLITARY)]
+        while stack:
+            item, parent, depth, feature_flags = stack.pop()
+            if isinstance(item, Relation):
+                self.relations.append(item)
+                self.relation_kinds.append(feature_flags)
+                self.relation_parents.append(parent)
+                continue
+            feature = item
+            index = len(self.names)
+            self.features.append(feature)
+            self.names.append(feature.name)
+            self.index.setdefault(feature.name, index)
+            self.parents.append(parent)
+            self.depths.append(depth)
+            if feature.feature_cardinality.min != 1 or feature.feature_cardinality.max != 1:
+                feature_flags |= MULTI
+            if feature.feature_type != FeatureType.BOOLEAN:
+                feature_flags |= TYPED
+                if feature.feature_type == FeatureType.INTEGER:
+                    feature_flags |= INTEGER | NUMERICAL
+                elif feature.feature_type == FeatureType.REAL:
+                    feature_flags |= REAL | NUMERICAL
+                elif feature.feature_type == FeatureType.STRING:
+                    feature_flags |= STRING
+            if feature.is_abstract:
+                feature_flags |= ABSTRACT
+
+            attributes = feature.get_attributes()
+            self.attributes.append(len(attributes))
+            if attributes:
+                feature_flags |= ATTRIBUTES
+                if not feature_flags & DETACHED:
+                    self.attribute_names.update(attribute.name for attribute in attributes)
+
+            relations = feature.get_relations()
+            n_children = 0
+            if relations:  # it is a compound feature (non leaf)
+                detached = feature_flags & DETACHED
+                children_flags = detached | (TOP if feature.parent is None else 0) | (0 if feature.is_group() else SOLITARY)
+                items: list[tuple[Feature | Relation, int, int, int]] = []
+                for relation in relations:
+                    kind = relation_kind(relation)
+                    items.append((relation, index, depth, kind))
+                    if kind in (MANDATORY, OPTIONAL):
+                        n_children += 1
+                        items.append((relation.children[0], index, depth + 1, children_flags))
+                    elif kind in GROUPS:
+                        n_children += len(relation.children)
+                        items.extend((child, index, depth + 1, children_flags | GROUPED) for child in relation.children)
+                    else:
+                        items.extend((child, index, depth + 1, children_flags | DETACHED) for child in relation.children)
+                stack.extend(reversed(items))
+            else:  # it is a leaf feature
+                feature_flags |= LEAF
+            self.children.append(n_children)
+            self.flags.append(feature_flags)
+
+
+class ConstraintTable():
+    """Columnar representation of the cross-tree constraints of a feature model.
+
+    Each row is a constraint, with its pretty string, its kind and the flags of its symbols
+    (see `ConstraintClassifier`), and whether it duplicates a previous constraint.
+    The features of the constraints are a sparse incidence matrix in compressed rows: the
+    columns of the row `i` are `indices[indptr[i]:indptr[i + 1]]`. The columns of the features
+    of the tree are their indexes in the `FeatureTable`, and the other names (e.g., features
+    not in the tree) are numbered after them (see `column_name`).
+    """
+
+    def __init__(self, constraints: list[Constraint], table: FeatureTable) -> None:
+        self.table = table
+        self.strings: list[str] = []
+        self.kinds: list[str] = []
+        self.symbols = array.array('B')
+        self.duplicates = array.array('B')
+        self.indptr = array.array('l', [0])
+        self.indices = array.array('l')
+        self.extra_names: list[str] = []
+        extra_index: dict[str, int] = {}
+        classifier = ConstraintClassifier()  # Shares the identical subformulas of the constraints
+        for constraint in constraints:
+            ctc_str, kind, features, symbols, duplicate = classifier.classify(constraint)
+            self.strings.append(ctc_str)
+            self.kinds.append(kind)
+            self.symbols.append(symbols)
+            self.duplicates.append(duplicate)
+            for name in features:
+                column = table.index.get(name)
+                if column is None:
+                    column = extra_index.get(name)
+                    if column is None:
+                        column = extra_index[name] = len(table) + len(self.extra_names)
+                        self.extra_names.append(name)
+                self.indices.append(column)
+            self.indptr.append(len(self.indices))
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def column_name(self, column: int) -> str:
+        n_features = len(self.table)
+        return self.table.names[column] if column < n_features else self.extra_names[column - n_features]
+
+    def columns(self, row: int) -> array.array:
+        """Return the columns of the features of the constraint."""
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def row_sizes(self) -> list[int]:
+        """Return the number of features of each constraint."""
+        return [end - start for start, end in zip(self.indptr, self.indptr[1:])]
+
+    def column_counts(self) -> dict[int, int]:
+        """Return the number of constraints of each column with at least one constraint, in column order."""
+        counts = [0] * (len(self.table) + len(self.extra_names))
+        for column in self.indices:
+            counts[column] += 1
+        return {column: count for column, count in enumerate(counts) if count}
+
+    def any_symbol(self, symbol: int) -> bool:
+        return any(symbols & symbol for symbols in self.symbols)
+
+    def is_string_constraint(self, row: int) -> bool:
+        """Return true if the constraint has a string operator, as `fm_language_level.is_string_constraint`."""
+        symbols = self.symbols[row]
+        if symbols & constraints_utils.LEN_OPERATOR:
+            return True
+        if not symbols & constraints_utils.ARITHMETIC_OPERATOR:
+            return False
+        n_features = len(self.table)
+        if any(column < n_features and self.table.flags[column] & STRING for column in self.columns(row)):
+            return True
+        return bool(symbols & constraints_utils.STRING_LITERAL)
+
+
+def relation_kind(relation: Relation) -> int:
+    if relation.is_mandatory():
+        return MANDATORY
+    if relation.is_optional():
+        return OPTIONAL
+    if not relation.is_group():
+        return OTHER
+    if relation.is_or():
+        return OR
+    if relation.is_alternative():
+        return ALTERNATIVE
+    if relation.is_mutex():
+        return MUTEX
+    return CARDINALITY
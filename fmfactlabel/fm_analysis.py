@@ -1,97 +1,433 @@
 import math
-import pathlib
 import logging
-from typing import Any
+from functools import cached_property
+from typing import Any, Collection, Optional
 
 from fmfactlabel import FMProperties, FMPropertyMeasure
-from .fm_utils import get_ratio, get_nof_configuration_as_str, get_percentage_str
+from .fm_utils import (
+    get_ratio, 
+    get_nof_configuration_as_str, 
+    get_approximate_count_as_str, 
+    get_estimate_as_str, 
+    get_percentage_str,
+    get_ratio_percentage_str
+)
+from .sat_utils import SATBackbone, build_sat_model
+from .bdd_utils import BDDBudget, BDDBudgetExceeded, BDDCounter, DEFAULT_ORDERING, build_bdd, bdd_size, save_bdd
+from .cache_utils import BDDCache
+from .ddnnf_utils import DDNNF, DDNNFBudgetExceeded, DEFAULT_DDNNF_MAX_NODES, DEFAULT_DDNNF_TIMEOUT, compile_ddnnf
+from .simplification_utils import SimplifiedModel
+from .approxmc_utils import (
+    ApproxCounting, 
+    ApproxCountTimeout, 
+    ApproximateCount, 
+    DEFAULT_APPROX_COUNTING, 
+    approximate_count
+)
+from .sampling_utils import DEFAULT_SAMPLING, SampleEstimates, Sampling, SamplingTimeout, estimate_from_samples
+from .tree_utils import FeatureTreeCounter
+from .component_utils import analyze_subtrees
+from .fm_registry import FMPropertyRegistry
+from .feature_table import FeatureTable
 
-from flamapy.metamodels.fm_metamodel.models import FeatureModel
-from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat
-from flamapy.metamodels.bdd_metamodel.transformations import FmToBDD
-from flamapy.metamodels.pysat_metamodel import operations as sat_operations
-from flamapy.metamodels.bdd_metamodel import operations as bdd_operations
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+from flamapy.metamodels.bdd_metamodel.models import BDDModel
 from flamapy.metamodels.fm_metamodel import operations as fm_operations
 
 
 class FMAnalysis():
 
-    def __init__(self, model: FeatureModel, light_fact_label: bool = False) -> None:
+    def __init__(self, 
+                 model: FeatureModel, 
+                 light_fact_label: bool = False, 
+                 lazy: bool = False,
+                 bdd_budget: Optional[BDDBudget] = None,
+                 bdd_ordering: str = DEFAULT_ORDERING,
+                 bdd_reordering: bool = False,
+                 simplify: bool = True,
+                 approx_counting: Optional[ApproxCounting] = DEFAULT_APPROX_COUNTING,
+                 sampling: Optional[Sampling] = DEFAULT_SAMPLING,
+                 bdd_cache: Optional[BDDCache] = None,
+                 summary: bool = False,
+                 table: Optional[FeatureTable] = None) -> None:
+        """Analysis of the feature model.
+
+        By default, the SAT model, the BDD and the analysis results that depend on them
+        are computed eagerly in the constructor.
+        In lazy mode (`lazy=True`), each input is computed (and cached) the first time
+        a property needs it, so that `get_analysis(select=...)` only pays for the
+        requested properties (e.g., SAT-based properties never build the BDD).
+        With a `bdd_budget`, the BDD is built in an isolated process that is killed if it
+        exceeds the budget, falling back to the SAT-based analysis.
+        The order of the BDD variables is given by the `bdd_ordering` heuristic
+        (see `bdd_utils.ORDERINGS`), optionally improved with dynamic reordering.
+        With a `bdd_cache`, the BDDs of feature models already compiled (with the same
+        ordering options) are loaded from the cache instead of compiled again.
+        If the BDD cannot be built, the full fact label compiles the SAT model into a d-DNNF
+        to keep exact counts (bounded by the time and nodes of the `bdd_budget`, or by default
+        by `DEFAULT_DDNNF_TIMEOUT` and `DEFAULT_DDNNF_MAX_NODES`),
+        and only falls back to the estimation of the SAT-based analysis if that also fails.
+        Feature models without cross-tree constraints need neither: their exact analysis
+        is computed directly over the feature tree. Likewise, the subtrees whose constraints
+        do not leave them are analyzed separately (in parallel) and recombined over the tree.
+        With `simplify`, the SAT and d-DNNF analyses run on the CNF formula reduced by unit
+        propagation and atomic sets (see `simplification_utils`).
+        When no exact engine is available (e.g., in the light fact label), the number of
+        configurations is approximated with the guarantees of `approx_counting` (ApproxMC),
+        falling back to the estimation of the feature tree if it times out (None to disable it).
+        Likewise, the feature inclusion probabilities, homogeneity and product distribution
+        are estimated with confidence intervals from near-uniform samples of configurations
+        drawn with the `sampling` budget (None to omit them), and the unique features are
+        computed exactly with the SAT solver (within the same timeout). The pure optional features are omitted then:
+        a probability of exactly 0.5 cannot be told apart from a close one by sampling.
+        If ApproxMC enumerated all the configurations (its count is exact), they are all
+        computed exactly instead.
+        In summary mode, the measures of lists of features only hold their sizes and ratios,
+        without their members (see `get_members`).
+        The features are looked up in the columnar representation of the feature model (`table`),
+        which can be shared with the metadata and the metrics (built on demand otherwise).
+        """
         self.fm = model
+        self._table = table
         self.light_fact_label = light_fact_label
-        self.bdd_model = None
-        self.sat_model = FmToPysat(model).transform()
-        self.sat_model.original_model = self.fm
-        if not self.light_fact_label:
-            try:
-                self.bdd_model = FmToBDD(model).transform()
-            except Exception as e:
-                logging.warning(f'Warning: the feature model is too large to build the BDD model. (Exception: {e})')
-
-        # For performance purposes
-        self._features = self.fm.get_features()
+        self.lazy = lazy
+        self.bdd_budget = bdd_budget
+        self.bdd_ordering = bdd_ordering
+        self.bdd_reordering = bdd_reordering
+        self.simplify = simplify
+        self.approx_counting = approx_counting
+        self.sampling = sampling
+        self.bdd_cache = bdd_cache
+        self.summary = summary
+        if not self.lazy:  # Compute everything up front
+            self.sat_model
+            self.tree_model
+            self.bdd_model
+            self.ddnnf_model
+            self._configurations
+            self._fip
+            self._descriptive_statistics
+            self._core_features
+            self._dead_features
+            self._variant_features
+
+    @cached_property
+    def sat_model(self) -> PySATModel:
+        sat_model = build_sat_model(self.fm)
+        sat_model.original_model = self.fm
+        return sat_model
+
+    @cached_property
+    def simplified_model(self) -> Optional[SimplifiedModel]:
+        return SimplifiedModel(self.sat_model) if self.simplify else None
+
+    @cached_property
+    def tree_model(self) -> Optional[FeatureTreeCounter]:
+        if self.light_fact_label:
+            return None
+        if not self.fm.get_constraints():
+            return FeatureTreeCounter(self.fm)
+        subtrees = analyze_subtrees(self.fm, self.bdd_budget, self.bdd_ordering, self.bdd_reordering, self.simplify,
+                                    self.bdd_cache)
+        return None if subtrees is None else FeatureTreeCounter(self.fm, subtrees)
+
+    @cached_property
+    def bdd_model(self) -> Optional[BDDModel]:
+        if self.light_fact_label or self.tree_model is not None:
+            return None
+        try:
+            return build_bdd(self.fm, self.bdd_budget, self.bdd_ordering, self.bdd_reordering, self.bdd_cache)
+        except BDDBudgetExceeded as e:
+            logging.warning(f'Warning: the BDD model exceeded its budget, using the d-DNNF or SAT model instead. ({e})')
+        except Exception as e:
+            logging.warning(f'Warning: the feature model is too large to build the BDD model. (Exception: {e})')
+        return None
+
+    @cached_property
+    def ddnnf_model(self) -> Optional[DDNNF]:
+        if self.light_fact_label or self.tree_model is not None or self.bdd_model is not None:
+            return None
+        timeout = DEFAULT_DDNNF_TIMEOUT if self.bdd_budget is None else self.bdd_budget.timeout
+        max_nodes = DEFAULT_DDNNF_MAX_NODES if self.bdd_budget is None else self.bdd_budget.max_nodes
+        try:
+            return compile_ddnnf(self.sat_model, timeout, max_nodes, self.simplified_model)
+        except DDNNFBudgetExceeded as e:
+            logging.warning(f'Warning: the d-DNNF exceeded its budget, using the SAT model instead. ({e})')
+        except Exception as e:
+            logging.warning(f'Warning: the feature model is too large to compile the d-DNNF. (Exception: {e})')
+        return None
+
+    @cached_property
+    def approx_count(self) -> Optional[ApproximateCount]:
+        if (self.approx_counting is None or self.tree_model is not None or 
+                self.bdd_model is not None or self.ddnnf_model is not None):
+            return None
+        try:
+            return approximate_count(self.sat_model, self.approx_counting, self.simplified_model)
+        except ApproxCountTimeout as e:
+            logging.warning(f'Warning: the approximate counting exceeded its timeout, using the estimation instead. ({e})')
+        except Exception as e:
+            logging.warning(f'Warning: the configurations cannot be approximately counted. (Exception: {e})')
+        return None
+
+    @cached_property
+    def enumerated_model(self) -> Optional[DDNNF]:
+        """d-DNNF of the SAT model when ApproxMC counted it exactly, so that the feature inclusion
+        probabilities and the product distribution are also exact instead of sampled.
+
+        The count of ApproxMC is exact when every component of the formula has few configurations
+        (all of them were enumerated), so its d-DNNF is small.
+        """
+        if self.approx_count is None or not self.approx_count.exact:
+            return None
+        try:
+            return compile_ddnnf(self.sat_model, DEFAULT_DDNNF_TIMEOUT, DEFAULT_DDNNF_MAX_NODES, self.simplified_model)
+        except Exception as e:
+            logging.warning(f'Warning: the configurations counted by ApproxMC cannot be compiled, sampling them instead. ({e})')
+        return None
+
+    @cached_property
+    def sample_estimates(self) -> Optional[SampleEstimates]:
+        if (self.sampling is None or self.tree_model is not None or 
+                self.bdd_model is not None or self.ddnnf_model is not None or 
+                self.enumerated_model is not None or not self._backbone.valid):
+            return None
+        if self.approx_counting is not None and self.approx_count is None:
+            logging.warning('Warning: the configurations are not sampled because the approximate counting failed (their hashing is too hard).')
+            return None
+        try:
+            count = None if self.approx_count is None else self.approx_count.count
+            return estimate_from_samples(self.sat_model, self.sampling, self.simplified_model, 
+                                         self._variant_features, count)
+        except SamplingTimeout as e:
+            logging.warning(f'Warning: the sampling exceeded its timeout before drawing any configuration. ({e})')
+        except Exception as e:
+            logging.warning(f'Warning: the configurations cannot be sampled. (Exception: {e})')
+        return None
+
+    @cached_property
+    def bdd_counter(self) -> Optional[BDDCounter]:
+        """Results of the BDD, computed together in a single pass over its nodes."""
+        return None if self.bdd_model is None else BDDCounter(self.bdd_model)
+
+    @property
+    def table(self) -> FeatureTable:
+        """Columnar representation of the feature model."""
+        if self._table is None:
+            self._table = FeatureTable(self.fm)
+        return self._table
+
+    # For performance purposes
+    @cached_property
+    def _features(self) -> list[Feature]:
+        return self.table.features
+
+    @cached_property
+    def _backbone(self) -> SATBackbone:
+        return SATBackbone(self.sat_model, self.fm, self.simplified_model)
+
+    @cached_property
+    def _configurations(self) -> int:
+        if self.tree_model is not None:
+            return self.tree_model.configurations_number()
         if self.bdd_model is not None:
-            self._configurations = bdd_operations.BDDConfigurationsNumber().execute(self.bdd_model).get_result()
-            self._approximation = False
-            self._fip = bdd_operations.BDDFeatureInclusionProbability().execute(self.bdd_model).get_result()
-            self._pd = bdd_operations.BDDProductDistribution().execute(self.bdd_model).get_result()
-            self._descriptive_statistics = descriptive_statistics(self._pd)
-            self._core_features = [feat for feat, prob, in self._fip.items() if prob >= 1.0]
-            self._dead_features = [feat for feat, prob, in self._fip.items() if prob <= 0.0]
-            self._variant_features = [feat for feat, prob, in self._fip.items() if 0.0 < prob < 1.0]
-        else:
-            self._configurations = fm_operations.FMEstimatedConfigurationsNumber().execute(self.fm).get_result()
-            self._approximation = True
-            self._core_features = sat_operations.PySATCoreFeatures().execute(self.sat_model).get_result()
-            self._dead_features = sat_operations.PySATDeadFeatures().execute(self.sat_model).get_result()
-            self._variant_features = [f.name for f in self._features 
-                                      if f.name not in self._core_features and
-                                      f.name not in self._dead_features]
-            self._fip = None
-            self._descriptive_statistics = None
+            return self.bdd_counter.configurations_number()
+        if self.ddnnf_model is not None:
+            return self.ddnnf_model.configurations_number()
+        if self.approx_count is not None:
+            return self.approx_count.count
+        return fm_operations.FMEstimatedConfigurationsNumber().execute(self.fm).get_result()
 
-    def clean(self) -> None:
+    @cached_property
+    def _approximation(self) -> bool:
+        return (self.tree_model is None and self.bdd_model is None and self.ddnnf_model is None and
+                (self.approx_count is None or not self.approx_count.exact))
+
+    @cached_property
+    def _feature_counts(self) -> Optional[dict[str, int]]:
+        """Number of configurations of each feature (only from the d-DNNF)."""
+        if self.tree_model is not None or self.bdd_model is not None:
+            return None
+        ddnnf_model = self.ddnnf_model if self.ddnnf_model is not None else self.enumerated_model
+        if ddnnf_model is None:
+            return None
+        counts = ddnnf_model.variable_counts()
+        return {feature: counts[var] for feature, var in self.sat_model.variables.items()}
+
+    @cached_property
+    def _fip(self) -> Optional[dict[str, float]]:
+        if self.tree_model is not None:
+            return self.tree_model.feature_probabilities()
         if self.bdd_model is not None:
-            logging.warning(f'BDD temp filepath: {self.bdd_model.bdd_file}')
-            filepath = self.bdd_model.bdd_file
-            filepath = filepath + '.dddmp' if not filepath.endswith('.dddmp') else filepath
-            bdd_filepath = pathlib.Path(filepath)
-            if bdd_filepath.exists():
-                bdd_filepath.unlink()
-
-    def get_analysis(self) -> list[FMPropertyMeasure]:
-        result = []
-        result.append(self.fm_valid())
-        result.append(self.fm_core_features())
-        result.append(self.fm_false_optional_features())
-        result.append(self.fm_dead_features())
-        result.append(self.fm_variant_features())
+            return self.bdd_counter.feature_probabilities()
+        if self._feature_counts is not None:
+            return {feature: count / self._configurations if self._configurations > 0 else 0.0
+                    for feature, count in self._feature_counts.items()}
+        return None
+
+    @cached_property
+    def _pd(self) -> Optional[list[int]]:
+        if self.tree_model is not None:
+            return self.tree_model.product_distribution()
         if self.bdd_model is not None:
-            result.append(self.fm_unique_features())
+            return self.bdd_counter.product_distribution()
+        if self.ddnnf_model is not None:
+            return self.ddnnf_model.product_distribution()
+        if self.enumerated_model is not None:
+            return self.enumerated_model.product_distribution()
+        return None
+
+    @cached_property
+    def _sampled(self) -> bool:
+        """Return true if the FIP and the product distribution are estimated from samples."""
+        return self._fip is None and self.sample_estimates is not None
+
+    @cached_property
+    def _descriptive_statistics(self) -> Optional[dict[str, Any]]:
+        if self._pd is not None:
+            return descriptive_statistics(self._pd)
+        if self._sampled:
+            return descriptive_statistics(self.sample_estimates.product_distribution)
+        return None
+
+    @cached_property
+    def _core_features(self) -> list[str]:
+        if self._compiled_ready():
+            return [feat for feat, prob, in self._fip.items() if prob >= 1.0]
+        return self._backbone.core_features
+
+    @cached_property
+    def _dead_features(self) -> list[str]:
+        if self._compiled_ready():
+            return [feat for feat, prob, in self._fip.items() if prob <= 0.0]
+        return self._backbone.dead_features
+
+    @cached_property
+    def _variant_features(self) -> list[str]:
+        if self._compiled_ready():
+            return [feat for feat, prob, in self._fip.items() if 0.0 < prob < 1.0]
+        decided = set(self._core_features) | set(self._dead_features)
+        return [name for name in self.table.names if name not in decided]
+
+    @property
+    def engine(self) -> str:
+        """Engine that produced the analysis results."""
+        if self._tree_ready():
+            return self.tree_model.engine
+        if self._bdd_ready():
+            return 'BDD'
+        if self._ddnnf_ready():
+            return 'd-DNNF'
+        engines = ['SAT']
+        if self._approx_ready():
+            engines.append('ApproxMC')
+        if self._sampling_ready():
+            engines.append('sampling')
+        return ' + '.join(engines)
+
+    def _tree_ready(self) -> bool:
+        """Return true if the results of the feature tree (and its components) can be used.
+
+        In lazy mode, the components are not compiled on demand just to answer properties
+        that the SAT model can also answer (the feature tree alone needs no compilation).
+        """
+        if self.lazy and 'tree_model' not in self.__dict__ and self.fm.get_constraints():
+            return False
+        return self.tree_model is not None
+
+    def _bdd_ready(self) -> bool:
+        """Return true if the BDD-based results can be used.
+
+        In lazy mode, the BDD is not built on demand just to answer properties 
+        that the SAT model can also answer.
+        """
+        if self.lazy and 'bdd_model' not in self.__dict__:
+            return False
+        return self.bdd_model is not None
+
+    def _ddnnf_ready(self) -> bool:
+        """Return true if the d-DNNF-based results can be used (see `_bdd_ready`)."""
+        if self.lazy and 'ddnnf_model' not in self.__dict__:
+            return False
+        return self.ddnnf_model is not None
+
+    def _approx_ready(self) -> bool:
+        """Return true if the number of configurations is approximately counted (see `_bdd_ready`)."""
+        if self.lazy and 'approx_count' not in self.__dict__:
+            return False
+        return self.approx_count is not None
+
+    def _sampling_ready(self) -> bool:
+        """Return true if some results are estimated from samples (see `_bdd_ready`)."""
+        if self.lazy and 'sample_estimates' not in self.__dict__:
+            return False
+        return self.sample_estimates is not None
+
+    def _probabilities_ready(self) -> bool:
+        """Return true if the feature inclusion probabilities are computed or estimated from samples."""
+        return self._fip is not None or self._sampled
+
+    def _unique_features_ready(self) -> bool:
+        """Return true if the unique features are computed (with the sampling, within its timeout)."""
         if self._fip is not None:
-            result.append(self.fm_pure_optional_features())
-        result.append(self.fm_configurations_number())
-        result.append(self.fm_total_variability())
-        result.append(self.fm_partial_variability())
-        if self.bdd_model is not None:
-            result.append(self.fm_homogeneity())
-        if self._descriptive_statistics is not None:
-            result.append(self.fm_product_distribution())
-            result.append(self.fm_mean_pd())
-            result.append(self.fm_std_pd())
-            result.append(self.fm_median_pd())
-            result.append(self.fm_mad_pd())
-            result.append(self.fm_mode_pd())
-            result.append(self.fm_min_pd())
-            result.append(self.fm_max_pd())
-            result.append(self.fm_range_pd())
+            return True
+        return self._sampled and self.sample_estimates.unique_features is not None
+
+    def _exact_probabilities_ready(self) -> bool:
+        """Return true if the feature inclusion probabilities are computed (not estimated from samples)."""
+        return self._fip is not None
+
+    def _distribution_ready(self) -> bool:
+        """Return true if the product distribution is computed or estimated from samples."""
+        return self._descriptive_statistics is not None
+
+    def _compiled_ready(self) -> bool:
+        """Return true if exact results (feature tree, BDD or d-DNNF) can be used."""
+        return self._tree_ready() or self._bdd_ready() or self._ddnnf_ready()
+
+    def save_bdd(self, directory: str, name: str = 'fm') -> Optional[str]:
+        """Save the BDD in DDDMP format into the directory (`{name}.dddmp`).
+
+        Return the path of the file, or None if there is no BDD.
+        The BDD is kept in memory and never written to disk unless it is explicitly saved.
+        """
+        if self.bdd_model is None:
+            return None
+        return save_bdd(self.bdd_model, directory, name)
+
+    def clean(self) -> None:
+        """Release the compiled models (BDD and d-DNNF) kept in memory.
+
+        The analysis creates no temporary files, so it is safe to call at any time 
+        (and more than once); the models are compiled again if they are needed afterwards.
+        """
+        for compiled_model in ('bdd_counter', 'bdd_model', 'ddnnf_model', 'enumerated_model'):
+            self.__dict__.pop(compiled_model, None)
+
+    def get_analysis(self, select: Optional[Collection[FMProperties]] = None) -> list[FMPropertyMeasure]:
+        """Return the measures of the analysis properties.
+
+        If `select` is given, only the measures of those properties are computed.
+        """
+        result = ANALYSIS.measures(self, select)
+        if self.summary:
+            for measure in result:
+                if measure.size is not None:
+                    measure.value = None
         return result
 
+    def get_members(self, fm_property: FMProperties) -> Optional[list[str]]:
+        """Return the members of the list of the property (e.g., the names of the dead features),
+        also in summary mode, or None if the property is not available."""
+        measure = ANALYSIS.measure(self, fm_property, {})
+        return measure.value if measure is not None and measure.size is not None else None
+
     def fm_valid(self) -> FMPropertyMeasure:
-        if self.bdd_model is not None:
+        if self._compiled_ready():
             _valid = self._configurations > 0
         else:
-            _valid = sat_operations.PySATSatisfiable().execute(self.sat_model).get_result()
+            _valid = self._backbone.valid
         _result = 'Yes' if _valid else 'No'
         return FMPropertyMeasure(FMProperties.VALID.value, _result)
 
@@ -114,7 +450,14 @@ class FMAnalysis():
                         get_ratio(self._variant_features, self._features))
     
     def fm_unique_features(self) -> FMPropertyMeasure:
-        _unique_features = bdd_operations.BDDUniqueFeatures().execute(self.bdd_model).get_result()
+        if self.tree_model is not None:
+            _unique_features = self.tree_model.unique_features()
+        elif self.bdd_model is not None:
+            _unique_features = self.bdd_counter.unique_features()
+        elif self._sampled:
+            _unique_features = self.sample_estimates.unique_features
+        else:
+            _unique_features = [feat for feat, count in self._feature_counts.items() if count == 1]
         return FMPropertyMeasure(FMProperties.UNIQUE_FEATURES.value, 
                                  _unique_features, 
                                  len(_unique_features),
@@ -128,17 +471,17 @@ class FMAnalysis():
                                  get_ratio(_pure_optional_features, self._features))
 
     def fm_false_optional_features(self) -> FMPropertyMeasure:
-        if self.bdd_model is not None:
+        # The full fact label derives them from the core features (no need to wait for the BDD in lazy mode)
+        if self._compiled_ready() or (self.lazy and not self.light_fact_label):
             _false_optional_features = []
             for feat in self._core_features:
-                feature = self.fm.get_feature_by_name(feat)
+                feature = self.table.get_feature(feat)
                 if feature is not None and not feature.is_root() and not feature.is_mandatory():
                     _false_optional_features.append(feat)
         else:
-            try:
-                _false_optional_features = sat_operations.PySATFalseOptionalFeatures().execute(self.sat_model).get_result()
-            except AssertionError as e:
-                logging.warning(f'Warning: Feature model has feature cardinalities, false optional features cannot be computed.\n {e}')
+            _false_optional_features = self._backbone.false_optional_features
+            if _false_optional_features is None:
+                logging.warning('Warning: Feature model has feature cardinalities, false optional features cannot be computed.')
                 _false_optional_features = []
         return FMPropertyMeasure(FMProperties.FALSE_OPTIONAL_FEATURES.value, 
                                  _false_optional_features, 
@@ -146,22 +489,47 @@ class FMAnalysis():
                                  get_ratio(_false_optional_features, self._features))
 
     def fm_configurations_number(self) -> FMPropertyMeasure:
-        _configurations = get_nof_configuration_as_str(self._configurations, self._approximation, len(self.fm.get_constraints()))
+        self._configurations
+        if self._approx_ready() and not self.approx_count.exact:
+            _configurations = get_approximate_count_as_str(self.approx_count.count, 
+                                                           self.approx_count.lower, 
+                                                           self.approx_count.upper, 
+                                                           self.approx_count.confidence)
+        else:
+            _configurations = get_nof_configuration_as_str(self._configurations, self._approximation, len(self.fm.get_constraints()))
         return FMPropertyMeasure(FMProperties.CONFIGURATIONS.value, _configurations)
     
     def fm_total_variability(self) -> FMPropertyMeasure:
-        _total_variability = self._configurations / (2 ** len(self._features) - 1)
-        _total_variability = get_percentage_str(_total_variability, 2) + "%"
+        _total_variability = self._variability_str(2 ** len(self._features) - 1)
         return FMPropertyMeasure(FMProperties.TOTAL_VARIABILITY.value, _total_variability)
     
     def fm_partial_variability(self) -> FMPropertyMeasure:
-        _partial_variability = 0 if not self._variant_features else self._configurations / (2 ** len(self._variant_features) - 1)
-        _partial_variability = get_percentage_str(_partial_variability, 2) + "%"
+        if not self._variant_features:
+            _partial_variability = get_percentage_str(0, 2) + "%"
+        else:
+            _partial_variability = self._variability_str(2 ** len(self._variant_features) - 1)
         return FMPropertyMeasure(FMProperties.PARTIAL_VARIABILITY.value, _partial_variability)
+
+    def _variability_str(self, combinations: int) -> str:
+        """Ratio of the configurations to the combinations of features, 
+        with its bounds if the configurations are approximately counted."""
+        _variability = get_ratio_percentage_str(self._configurations, combinations, 2) + "%"
+        if not self._approx_ready() or self.approx_count.exact:
+            return _variability
+        _lower = get_ratio_percentage_str(self.approx_count.lower, combinations, 2)
+        _upper = get_ratio_percentage_str(min(self.approx_count.upper, combinations), combinations, 2)
+        return f'≈ {_variability} [{_lower}%, {_upper}%]'
     
     def fm_homogeneity(self) -> FMPropertyMeasure:
-        _homogeneity = bdd_operations.BDDHomogeneity().execute(self.bdd_model).get_result()
+        if self.bdd_model is not None:
+            _homogeneity = self.bdd_counter.homogeneity()
+        elif self._sampled:
+            _homogeneity, _lower, _upper = self.sample_estimates.homogeneity()
+        else:
+            _homogeneity = sum(self._fip.values()) / len(self._fip)
         _homogeneity = get_percentage_str(_homogeneity, 2) + "%"
+        if self._sampled:
+            _homogeneity = f'≈ {_homogeneity} [{get_percentage_str(_lower, 2)}%, {get_percentage_str(_upper, 2)}%]'
         return FMPropertyMeasure(FMProperties.HOMOGENEITY.value, _homogeneity)
 
     def fm_product_distribution(self) -> FMPropertyMeasure:
@@ -169,59 +537,119 @@ class FMAnalysis():
 
     def fm_mean_pd(self) -> FMPropertyMeasure:
         _mean_pd = round(self._descriptive_statistics['Mean'], 2)
+        if self._sampled:
+            _mean_pd = get_estimate_as_str(*self.sample_estimates.mean_size())
         return FMPropertyMeasure(FMProperties.PD_MEAN.value, _mean_pd)
     
     def fm_std_pd(self) -> FMPropertyMeasure:
         _std_pd = round(self._descriptive_statistics['Standard deviation'], 2)
+        if self._sampled:
+            _std_pd = get_estimate_as_str(*self.sample_estimates.std_size())
         return FMPropertyMeasure(FMProperties.PD_STD.value, _std_pd)
     
     def fm_median_pd(self) -> FMPropertyMeasure:
         _median_pd = round(self._descriptive_statistics['Median'], 2)
+        if self._sampled:
+            _median_pd = get_estimate_as_str(_median_pd, *self.sample_estimates.median_size())
         return FMPropertyMeasure(FMProperties.PD_MEDIAN.value, _median_pd)
     
     def fm_mad_pd(self) -> FMPropertyMeasure:
         _mad_pd = round(self._descriptive_statistics['Median absolute deviation'], 2)
+        if self._sampled:
+            _mad_pd = f'≈ {_mad_pd}'
         return FMPropertyMeasure(FMProperties.PD_MAD.value, _mad_pd)
     
     def fm_mode_pd(self) -> FMPropertyMeasure:
-        return FMPropertyMeasure(FMProperties.PD_MODE.value, self._descriptive_statistics['Mode'])
+        _mode_pd = self._descriptive_statistics['Mode']
+        return FMPropertyMeasure(FMProperties.PD_MODE.value, f'≈ {_mode_pd}' if self._sampled else _mode_pd)
     
     def fm_min_pd(self) -> FMPropertyMeasure:
-        return FMPropertyMeasure(FMProperties.PD_MIN.value, self._descriptive_statistics['Min'])
+        _min_pd = self._descriptive_statistics['Min']  # The smallest sampled configuration is an upper bound
+        return FMPropertyMeasure(FMProperties.PD_MIN.value, f'≤ {_min_pd}' if self._sampled else _min_pd)
     
     def fm_max_pd(self) -> FMPropertyMeasure:
-        return FMPropertyMeasure(FMProperties.PD_MAX.value, self._descriptive_statistics['Max'])
+        _max_pd = self._descriptive_statistics['Max']  # The largest sampled configuration is a lower bound
+        return FMPropertyMeasure(FMProperties.PD_MAX.value, f'≥ {_max_pd}' if self._sampled else _max_pd)
     
     def fm_range_pd(self) -> FMPropertyMeasure:
-        return FMPropertyMeasure(FMProperties.PD_RANGE.value, self._descriptive_statistics['Range'])
+        _range_pd = self._descriptive_statistics['Range']
+        return FMPropertyMeasure(FMProperties.PD_RANGE.value, f'≥ {_range_pd}' if self._sampled else _range_pd)
 
+    def fm_analysis_engine(self) -> FMPropertyMeasure:
+        return FMPropertyMeasure(FMProperties.ANALYSIS_ENGINE.value, self.engine)
 
-def descriptive_statistics(frequencies: list[int]) -> dict[str, Any]:
+    def fm_bdd_variable_ordering(self) -> FMPropertyMeasure:
+        _ordering = f'{self.bdd_ordering}{" + dynamic reordering" if self.bdd_reordering else ""}'
+        return FMPropertyMeasure(FMProperties.BDD_VARIABLE_ORDERING.value, _ordering)
+
+    def fm_bdd_variable_order(self) -> FMPropertyMeasure:
+        _order = [self.bdd_model.vars_features[var] for var in self.bdd_model.vars_order]
+        return FMPropertyMeasure(FMProperties.BDD_VARIABLE_ORDER.value, _order, len(_order))
+
+    def fm_bdd_nodes(self) -> FMPropertyMeasure:
+        return FMPropertyMeasure(FMProperties.BDD_NODES.value, bdd_size(self.bdd_model))
+
+
+# Analysis properties in the order of the fact label. Their measures are memoized for a single
+# `get_analysis` call: the inputs they share (e.g., the BDD) are cached properties of the analysis,
+# and in lazy mode the engine of a measure may change as more models are compiled.
+ANALYSIS = FMPropertyRegistry()
+ANALYSIS.register(FMProperties.VALID, FMAnalysis.fm_valid)
+ANALYSIS.register(FMProperties.CORE_FEATURES, FMAnalysis.fm_core_features)
+ANALYSIS.register(FMProperties.FALSE_OPTIONAL_FEATURES, FMAnalysis.fm_false_optional_features)
+ANALYSIS.register(FMProperties.DEAD_FEATURES, FMAnalysis.fm_dead_features)
+ANALYSIS.register(FMProperties.VARIANT_FEATURES, FMAnalysis.fm_variant_features)
+ANALYSIS.register(FMProperties.UNIQUE_FEATURES, FMAnalysis.fm_unique_features, available=FMAnalysis._unique_features_ready)
+ANALYSIS.register(FMProperties.PURE_OPTIONAL_FEATURES, FMAnalysis.fm_pure_optional_features, available=FMAnalysis._exact_probabilities_ready)
+ANALYSIS.register(FMProperties.CONFIGURATIONS, FMAnalysis.fm_configurations_number)
+ANALYSIS.register(FMProperties.TOTAL_VARIABILITY, FMAnalysis.fm_total_variability)
+ANALYSIS.register(FMProperties.PARTIAL_VARIABILITY, FMAnalysis.fm_partial_variability)
+ANALYSIS.register(FMProperties.HOMOGENEITY, FMAnalysis.fm_homogeneity, available=FMAnalysis._probabilities_ready)
+ANALYSIS.register(FMProperties.PRODUCT_DISTRIBUTION, FMAnalysis.fm_product_distribution, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_MEAN, FMAnalysis.fm_mean_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_STD, FMAnalysis.fm_std_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_MEDIAN, FMAnalysis.fm_median_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_MAD, FMAnalysis.fm_mad_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_MODE, FMAnalysis.fm_mode_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_MIN, FMAnalysis.fm_min_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_MAX, FMAnalysis.fm_max_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.PD_RANGE, FMAnalysis.fm_range_pd, available=FMAnalysis._distribution_ready)
+ANALYSIS.register(FMProperties.ANALYSIS_ENGINE, FMAnalysis.fm_analysis_engine)
+ANALYSIS.register(FMProperties.BDD_VARIABLE_ORDERING, FMAnalysis.fm_bdd_variable_ordering, available=FMAnalysis._bdd_ready)
+ANALYSIS.register(FMProperties.BDD_VARIABLE_ORDER, FMAnalysis.fm_bdd_variable_order, available=FMAnalysis._bdd_ready)
+ANALYSIS.register(FMProperties.BDD_NODES, FMAnalysis.fm_bdd_nodes, available=FMAnalysis._bdd_ready)
+
+
+def descriptive_statistics(frequencies: list[int]) -> Optional[dict[str, Any]]:
+    """Return the descriptive statistics of the product distribution (None if it has no configurations)."""
     total_count = sum(frequencies)
+    if total_count == 0:  # Void feature model
+        return None
+    # Relative frequencies: the moments are computed over floats instead of huge ints
+    # (the frequencies may not fit in a float, e.g., 10^3000 configurations)
+    weights = [freq / total_count for freq in frequencies]
     
     # Mean calculation
-    mean = sum(i * freq for i, freq in enumerate(frequencies)) / total_count
+    mean = sum(i * weight for i, weight in enumerate(weights))
     
     # Standard deviation calculation
-    variance = sum(freq * (i - mean) ** 2 for i, freq in enumerate(frequencies)) / total_count
+    variance = sum(weight * (i - mean) ** 2 for i, weight in enumerate(weights))
     std_dev = math.sqrt(variance)
     
     # Median calculation
     cumulative_count = 0
-    median_position = total_count / 2
     median = None
     for i, freq in enumerate(frequencies):
         cumulative_count += freq
-        if cumulative_count >= median_position:
+        if 2 * cumulative_count >= total_count:
             median = i
             break
     
     # Median Absolute Deviation (MAD) calculation
     cumulative_count = 0
-    mad_total = 0
-    for i, freq in enumerate(frequencies):
-        mad_total += freq * abs(i - median)
-    mad = mad_total / total_count
+    mad = 0.0
+    for i, weight in enumerate(weights):
+        mad += weight * abs(i - median)
     
     # Mode calculation
     mode_val = max(range(len(frequencies)), key=lambda i: frequencies[i])
@@ -0,0 +1,232 @@
+"""
+This module contains all utils related to the binary snapshots of parsed feature models.
+
+A snapshot is stored next to the source file of the feature model (e.g., `model.uvl.fmb`) and
+holds the parsed `FeatureModel` as flat tables (features and relations in pre-order, constraint
+ASTs in post-order, and attributes), so that loading it is much faster than parsing the source
+again. It is keyed by a hash of the contents of the source file: a snapshot is only loaded while
+the source file is unchanged (see `read_fm_snapshot`).
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+import pathlib
+import tempfile
+from typing import Any, Optional
+from importlib import metadata
+
+from flamapy.core.models.ast import AST, ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import (
+    FeatureModel,
+    Feature,
+    FeatureType,
+    Relation,
+    Constraint,
+    Attribute,
+    Cardinality
+)
+
+from .uvl_utils import READER_VERSION
+
+
+SNAPSHOT_VERSION = 1  # Changes of the format invalidate the previous snapshots
+MAGIC = b'FMFLFM'
+SNAPSHOT_SUFFIX = '.fmb'
+READER_DISTRIBUTIONS = ('flamapy-fw', 'flamapy-fm')  # Their readers also produce the feature models
+
+
+class UnsupportedModel(Exception):
+    """The feature model has elements that the snapshot cannot represent (e.g., imports)."""
+
+
+def snapshot_path(filename: str) -> pathlib.Path:
+    return pathlib.Path(f'{filename}{SNAPSHOT_SUFFIX}')
+
+
+def read_fm_snapshot(filename: str) -> Optional[FeatureModel]:
+    """Return the feature model of the snapshot next to the source file,
+    or None if there is no snapshot or it is stale (the source file has changed) or corrupt."""
+    path = snapshot_path(filename)
+    try:
+        data = path.read_bytes()
+        key = source_key(filename)
+    except OSError:
+        return None
+    if not data.startswith(MAGIC + key):
+        return None  # Stale snapshot (or another format)
+    try:
+        return _decode(data[len(MAGIC) + len(key):])
+    except Exception as e:
+        logging.warning(f'Warning: the snapshot {path.name} is corrupt, parsing the feature model again. ({e})')
+        return None
+
+
+def write_fm_snapshot(model: FeatureModel, filename: str) -> bool:
+    """Store the snapshot of the feature model parsed from the source file next to it.
+
+    Return false if the snapshot cannot be stored (e.g., a read-only directory) or the feature
+    model has elements it cannot represent, which are parsed from the source file every time.
+    """
+    path = snapshot_path(filename)
+    try:
+        payload = _encode(model)
+    except UnsupportedModel as e:
+        logging.warning(f'Warning: the feature model cannot be stored in a snapshot. ({e})')
+        return False
+    try:
+        key = source_key(filename)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as tmp:
+            tmp.write(MAGIC + key + payload)
+        os.replace(tmp.name, path)
+    except OSError as e:
+        logging.warning(f'Warning: the snapshot of the feature model cannot be stored. ({e})')
+        return False
+    return True
+
+
+def source_key(filename: str) -> bytes:
+    """Return the hash of the contents of the source file, the format of the snapshot and the
+    versions of the readers that produce the feature model (`UVLFastReader` and flamapy's)."""
+    versions = [str(SNAPSHOT_VERSION), str(READER_VERSION)]
+    for distribution in READER_DISTRIBUTIONS:
+        try:
+            versions.append(f'{distribution}=={metadata.version(distribution)}')
+        except metadata.PackageNotFoundError:
+            versions.append(f'{distribution} not installed')
+    digest = hashlib.sha256(('|'.join(versions) + '|').encode())
+    with open(filename, 'rb') as source:
+        for chunk in iter(lambda: source.read(2**20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _encode(model: FeatureModel) -> bytes:
+    """Return the checksum and the compressed tables of the feature model.
+
+    Features are `[name, abstract, type, card_min, card_max, attributes, constraints]` in
+    pre-order, relations are `[parent, card_min, card_max, children]` in the order the parents
+    hold them, and constraints are `[name, root]` over a table of AST nodes `[data, left, right]`
+    in post-order (-1 stands for no node, and operations are stored as `[name]`).
+    """
+    if model.imports or model.alias_namespace:
+        raise UnsupportedModel('imports')
+    features: list[list[Any]] = []
+    relations: list[list[Any]] = []
+    constraints = _ConstraintsEncoder()
+    index: dict[int, int] = {}  # id of the feature -> row
+    stack = [] if model.root is None else [model.root]
+    while stack:
+        feature = stack.pop()
+        if id(feature) in index:
+            raise UnsupportedModel(f'feature {feature.name} in several relations')
+        if feature.reference is not None:
+            raise UnsupportedModel(f'feature {feature.name} references an imported feature')
+        index[id(feature)] = len(features)
+        cardinality = feature.feature_cardinality
+        features.append([feature.name, feature.is_abstract, feature.feature_type.value,
+                         cardinality.min, cardinality.max,
+                         [_encode_attribute(attribute) for attribute in feature.get_attributes()],
+                         [constraints.add(constraint) for constraint in feature.constraints_attributes]])
+        stack.extend(reversed([child for relation in feature.get_relations() for child in relation.children]))
+    stack = [] if model.root is None else [model.root]
+    while stack:  # The relations in the same pre-order, once all the features are numbered
+        feature = stack.pop()
+        for relation in feature.get_relations():
+            relations.append([index[id(feature)], relation.card_min, relation.card_max,
+                              [index[id(child)] for child in relation.children]])
+        stack.extend(reversed([child for relation in feature.get_relations() for child in relation.children]))
+    tables = {'features': features,
+              'relations': relations,
+              'nodes': constraints.nodes,
+              'constraints': constraints.constraints,
+              'ctcs': [constraints.add(constraint) for constraint in model.get_constraints()]}
+    payload = zlib.compress(json.dumps(tables, separators=(',', ':')).encode())
+    return hashlib.sha256(payload).digest() + payload
+
+
+def _decode(data: bytes) -> FeatureModel:
+    """Return the feature model of the checksum and compressed tables, checking their integrity."""
+    checksum, payload = data[:32], data[32:]
+    if hashlib.sha256(payload).digest() != checksum:
+        raise ValueError('checksum mismatch')
+    tables = json.loads(zlib.decompress(payload))
+
+    nodes: list[Node] = []
+    for node_data, left, right in tables['nodes']:  # The children of each node come before it
+        if isinstance(node_data, list):
+            node_data = ASTOperation[node_data[0]]
+        nodes.append(Node(node_data,
+                          None if left < 0 else nodes[left],
+                          None if right < 0 else nodes[right]))
+    constraints = [Constraint(name, AST(nodes[root])) for name, root in tables['constraints']]
+
+    features: list[Feature] = []
+    for name, abstract, feature_type, card_min, card_max, attributes, feature_constraints in tables['features']:
+        feature = Feature(name, is_abstract=abstract, feature_type=FeatureType(feature_type))
+        if card_min != 1 or card_max != 1:
+            feature.feature_cardinality = Cardinality(card_min, card_max)
+        for attribute_name, value in attributes:
+            feature.add_attribute(Attribute(attribute_name, default_value=value))
+        feature.constraints_attributes = [constraints[i] for i in feature_constraints]
+        features.append(feature)
+    for parent, card_min, card_max, children in tables['relations']:
+        feature = features[parent]
+        feature.add_relation(Relation(feature, [features[i] for i in children], card_min, card_max))
+    root = features[0] if features else None
+    return FeatureModel(root, [constraints[i] for i in tables['ctcs']])
+
+
+class _ConstraintsEncoder():
+    """Tables of the constraints and their AST nodes (each constraint and node is stored once)."""
+
+    def __init__(self) -> None:
+        self.nodes: list[list[Any]] = []
+        self.constraints: list[list[Any]] = []
+        self._node_index: dict[int, int] = {}  # id of the node -> row
+        self._constraint_index: dict[int, int] = {}  # id of the constraint -> row
+
+    def add(self, constraint: Constraint) -> int:
+        row = self._constraint_index.get(id(constraint))
+        if row is None:
+            row = self._constraint_index[id(constraint)] = len(self.constraints)
+            self.constraints.append([constraint.name, self._add_node(constraint.ast.root)])
+        return row
+
+    def _add_node(self, root: Node) -> int:
+        """Add the nodes of the AST in post-order with an explicit stack and return the row of the root."""
+        stack: list[tuple[Node, bool]] = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in self._node_index:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in (node.right, node.left) if child is not None)
+                continue
+            self._node_index[id(node)] = len(self.nodes)
+            self.nodes.append([_encode_node_data(node.data),
+                               -1 if node.left is None else self._node_index[id(node.left)],
+                               -1 if node.right is None else self._node_index[id(node.right)]])
+        return self._node_index[id(root)]
+
+
+def _encode_node_data(data: Any) -> Any:
+    if isinstance(data, ASTOperation):
+        return [data.name]
+    if isinstance(data, (str, int, float)):  # Names and literals (bool is an int)
+        return data
+    raise UnsupportedModel(f'constraint term {data!r}')
+
+
+def _encode_attribute(attribute: Attribute) -> list[Any]:
+    if attribute.domain is not None or attribute.null_value is not None:
+        raise UnsupportedModel(f'domain of the attribute {attribute.name}')
+    value = attribute.default_value
+    scalars = (str, int, float)  # bool is an int
+    if not (value is None or isinstance(value, scalars)
+            or isinstance(value, list) and all(isinstance(item, scalars) for item in value)):
+        raise UnsupportedModel(f'value of the attribute {attribute.name}')
+    return [attribute.name, value]
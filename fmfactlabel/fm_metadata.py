@@ -1,9 +1,9 @@
 from typing import Optional
 
 from fmfactlabel import FMProperties, FMPropertyMeasure
+from .feature_table import FeatureTable
 
 from flamapy.metamodels.fm_metamodel.models import FeatureModel
-from flamapy.metamodels.fm_metamodel.operations import FMLanguageLevel
 
 
 class FMMetadata():
@@ -16,8 +16,10 @@ class FMMetadata():
                  year: Optional[int] = None,
                  reference: Optional[str] = None,
                  tags: Optional[str] = None,
-                 domains: Optional[list[str]] = None) -> None:
+                 domains: Optional[list[str]] = None,
+                 table: Optional[FeatureTable] = None) -> None:
         self.fm = model
+        self._table = table
         self.name = name 
         self.description = description 
         self.author = author 
@@ -26,6 +28,13 @@ class FMMetadata():
         self.tags = tags 
         self.domains = domains 
 
+    @property
+    def table(self) -> FeatureTable:
+        """Columnar representation of the feature model (built on demand if it is not shared)."""
+        if self._table is None:
+            self._table = FeatureTable(self.fm)
+        return self._table
+
     def get_metadata(self) -> list[FMPropertyMeasure]:
         result = []
         result.append(self.fm_name(self.name))
@@ -73,7 +82,7 @@ class FMMetadata():
         return FMPropertyMeasure(FMProperties.DOMAIN.value, value)
     
     def fm_language_level(self) -> FMPropertyMeasure:
-        value = FMLanguageLevel().execute(self.fm).get_result()
+        value = self.table.language_level
         minor_levels = ', '.join(level.name.capitalize().replace('_', ' ') for level in value.minors)
         minor_levels = f' ({minor_levels})' if minor_levels else ''
         value = f'{value.major.name.capitalize()}{minor_levels}'
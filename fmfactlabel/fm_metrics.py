@@ -1,223 +1,138 @@
-import statistics
-from typing import Any
-from collections import defaultdict
-
-from fmfactlabel import FMProperties, FMPropertyMeasure
-from .fm_utils import get_ratio
-from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, FeatureType
+import array
+import functools
+import itertools
+from typing import Any, Callable, Collection, Optional
+from collections import Counter
+
+from fmfactlabel import FMProperty, FMProperties, FMPropertyMeasure
+from .fm_utils import get_size_ratio
+from .fm_registry import FMPropertyRegistry
+from . import constraints_utils
+from .feature_table import (
+    FeatureTable, 
+    ConstraintTable,
+    ROOT, TOP, SOLITARY, GROUPED, LEAF, ABSTRACT, MULTI, TYPED, NUMERICAL, INTEGER, REAL, STRING, ATTRIBUTES, DETACHED,
+    OTHER, MANDATORY, OPTIONAL, OR, ALTERNATIVE, MUTEX, CARDINALITY, GROUPS
+)
+from flamapy.metamodels.fm_metamodel.models import FeatureModel
 
 
 class FMMetrics():
 
     PRECISION: int = 2
 
-    def __init__(self, model: FeatureModel):
+    def __init__(self, model: FeatureModel, summary: bool = False, table: Optional[FeatureTable] = None):
+        """Metrics of the feature model.
+
+        In summary mode, the measures of lists (e.g., the features or the constraints) only hold
+        their sizes and ratios, without their members (see `get_members`).
+        The metrics are calculated from the columnar representation of the feature model, 
+        which can be shared with the metadata and the analysis (built on demand otherwise).
+        """
         self.fm = model
-        self._metrics: dict[str, Any] = traverse_metrics(self.fm)
+        self.summary = summary
+        self._table = table
+        self._metrics: FMMetricsTable = traverse_metrics(self.fm, lambda: self.table)
+        self._measures: dict[FMProperties, Optional[FMPropertyMeasure]] = {}
+
+
+    @property
+    def table(self) -> FeatureTable:
+        """Columnar representation of the feature model."""
+        if self._table is None:
+            self._table = FeatureTable(self.fm)
+        return self._table
                      
-    def get_metrics(self) -> list[FMPropertyMeasure]:
-        result = []
-        result.append(self.fm_features())
-        result.append(self.fm_abstract_features())
-        result.append(self.fm_abstract_leaf_features())
-        result.append(self.fm_abstract_compound_features())
-        result.append(self.fm_concrete_features())
-        result.append(self.fm_concrete_leaf_features())
-        result.append(self.fm_concrete_compound_features())
-        result.append(self.fm_compound_features())
-        result.append(self.fm_leaf_features())
-        result.append(self.fm_root_feature())
-        result.append(self.fm_top_features())
-        result.append(self.fm_solitary_features())
-        result.append(self.fm_grouped_features())
-        result.append(self.fm_typed_features())
-        result.append(self.fm_numerical_features())
-        result.append(self.fm_integer_features())
-        result.append(self.fm_real_features())
-        result.append(self.fm_string_features())
-        result.append(self.fm_multi_features())
-        result.append(self.fm_tree_relationships())
-        result.append(self.fm_mandatory_features())
-        result.append(self.fm_optional_features())
-        result.append(self.fm_feature_groups())
-        result.append(self.fm_alternative_groups())
-        result.append(self.fm_or_groups())
-        result.append(self.fm_mutex_groups())
-        result.append(self.fm_cardinality_groups())
-        result.append(self.fm_depth_tree())
-        result.append(self.fm_mean_depth_tree())
-        result.append(self.fm_avg_branching_factor())
-        result.append(self.fm_min_children_per_feature())
-        result.append(self.fm_max_children_per_feature())
-        result.append(self.fm_avg_children_per_feature())
-        result.append(self.fm_cross_tree_constraints())
-        result.append(self.fm_logical_constraints())
-        result.append(self.fm_single_feature_constraints())
-        result.append(self.fm_simple_constraints())
-        result.append(self.fm_requires_constraints())
-        result.append(self.fm_excludes_constraints())
-        result.append(self.fm_complex_constraints())
-        result.append(self.fm_pseudocomplex_constraints())
-        result.append(self.fm_strictcomplex_constraints())
-        result.append(self.fm_arithmetic_constraints())
-        result.append(self.fm_aggregation_constraints())
-        result.append(self.fm_extra_constraint_representativeness())
-        result.append(self.fm_min_features_per_constraint())
-        result.append(self.fm_max_features_per_constraint())
-        result.append(self.fm_avg_features_per_constraint())
-        result.append(self.fm_avg_constraints_per_feature())
-        result.append(self.fm_min_constraints_per_feature())
-        result.append(self.fm_max_constraints_per_feature())
-        result.append(self.fm_feature_attributes())
-        result.append(self.fm_features_with_attributes())
-        result.append(self.fm_min_attributes_per_feature())
-        result.append(self.fm_max_attributes_per_feature())
-        result.append(self.fm_avg_attributes_per_feature())
-        result.append(self.fm_avg_attributes_per_feature_with_attributes())
-        return result
+    def get_metrics(self, select: Optional[Collection[FMProperties]] = None) -> list[FMPropertyMeasure]:
+        """Return the measures of the metrics.
+
+        If `select` is given, only the measures of those properties (and of the properties
+        they depend on) are computed.
+        """
+        return METRICS.measures(self, select, self._measures)
+
+    def measure(self, fm_property: FMProperties) -> Optional[FMPropertyMeasure]:
+        """Return the measure of the metric (computed once)."""
+        return METRICS.measure(self, fm_property, self._measures)
+
+    def get_members(self, fm_property: FMProperties) -> Optional[list[str]]:
+        """Return the members of the list of the property (e.g., the names of the leaf features),
+        also in summary mode, or None if the property is not a list of this metrics."""
+        try:
+            members = self._metrics[fm_property.value]
+        except KeyError:
+            return None
+        return members if isinstance(members, list) else None
+
+    def _list_measure(self, fm_property: FMProperties, total: Optional[FMProperties] = None) -> FMPropertyMeasure:
+        """Return the measure of the list of the property, with its ratio over the list of the total."""
+        size = self._metrics.size(fm_property.value)
+        ratio = None if total is None else get_size_ratio(size, self.measure(total).size)
+        value = None if self.summary else self._metrics[fm_property.value]
+        return FMPropertyMeasure(fm_property.value, value, size, ratio)
 
     def fm_features(self) -> FMPropertyMeasure:
-        _features = self._metrics[FMProperties.FEATURES.value]
-        return FMPropertyMeasure(FMProperties.FEATURES.value, _features, len(_features))
+        return self._list_measure(FMProperties.FEATURES)
 
     def fm_abstract_features(self) -> FMPropertyMeasure:
-        _abstract_features = self._metrics[FMProperties.ABSTRACT_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.ABSTRACT_FEATURES.value, 
-                                 _abstract_features, 
-                                 len(_abstract_features),
-                                 get_ratio(_abstract_features, self.fm_features().value))
+        return self._list_measure(FMProperties.ABSTRACT_FEATURES, FMProperties.FEATURES)
 
     def fm_concrete_features(self) -> FMPropertyMeasure:
-        _concrete_features = self._metrics[FMProperties.CONCRETE_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.CONCRETE_FEATURES.value, 
-                                 _concrete_features, 
-                                 len(_concrete_features),
-                                 get_ratio(_concrete_features, self.fm_features().value))
+        return self._list_measure(FMProperties.CONCRETE_FEATURES, FMProperties.FEATURES)
     
     def fm_root_feature(self) -> FMPropertyMeasure:
-        _root_feature = self._metrics[FMProperties.ROOT_FEATURE.value]
-        return FMPropertyMeasure(FMProperties.ROOT_FEATURE.value, 
-                                 _root_feature,
-                                 len(_root_feature), 
-                                 get_ratio(_root_feature, self.fm_features().value))
+        return self._list_measure(FMProperties.ROOT_FEATURE, FMProperties.FEATURES)
 
     def fm_top_features(self) -> FMPropertyMeasure:
-        _top_features = self._metrics[FMProperties.TOP_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.TOP_FEATURES.value, 
-                                 _top_features, 
-                                 len(_top_features),
-                                 get_ratio(_top_features, self.fm_features().value))
+        return self._list_measure(FMProperties.TOP_FEATURES, FMProperties.FEATURES)
 
     def fm_leaf_features(self) -> FMPropertyMeasure:
-        _leaf_features = self._metrics[FMProperties.LEAF_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.LEAF_FEATURES.value, 
-                                 _leaf_features, 
-                                 len(_leaf_features),
-                                 get_ratio(_leaf_features, self.fm_features().value))
+        return self._list_measure(FMProperties.LEAF_FEATURES, FMProperties.FEATURES)
 
     def fm_compound_features(self) -> FMPropertyMeasure:
-        _compound_features = self._metrics[FMProperties.COMPOUND_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.COMPOUND_FEATURES.value, 
-                                 _compound_features, 
-                                 len(_compound_features),
-                                 get_ratio(_compound_features, self.fm_features().value))
+        return self._list_measure(FMProperties.COMPOUND_FEATURES, FMProperties.FEATURES)
 
     def fm_abstract_leaf_features(self) -> FMPropertyMeasure:
-        _abstract_leaf_features = self._metrics[FMProperties.ABSTRACT_LEAF_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.ABSTRACT_LEAF_FEATURES.value, 
-                                 _abstract_leaf_features, 
-                                 len(_abstract_leaf_features),
-                                 get_ratio(_abstract_leaf_features, self.fm_abstract_features().value))
+        return self._list_measure(FMProperties.ABSTRACT_LEAF_FEATURES, FMProperties.ABSTRACT_FEATURES)
     
     def fm_abstract_compound_features(self) -> FMPropertyMeasure:
-        _abstract_compound_features = self._metrics[FMProperties.ABSTRACT_COMPOUND_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.ABSTRACT_COMPOUND_FEATURES.value, 
-                                 _abstract_compound_features, 
-                                 len(_abstract_compound_features),
-                                 get_ratio(_abstract_compound_features, self.fm_abstract_features().value))
+        return self._list_measure(FMProperties.ABSTRACT_COMPOUND_FEATURES, FMProperties.ABSTRACT_FEATURES)
 
     def fm_concrete_leaf_features(self) -> FMPropertyMeasure:
-        _concrete_leaf_features = self._metrics[FMProperties.CONCRETE_LEAF_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.CONCRETE_LEAF_FEATURES.value, 
-                                 _concrete_leaf_features, 
-                                 len(_concrete_leaf_features),
-                                 get_ratio(_concrete_leaf_features, self.fm_concrete_features().value))
+        return self._list_measure(FMProperties.CONCRETE_LEAF_FEATURES, FMProperties.CONCRETE_FEATURES)
     
     def fm_concrete_compound_features(self) -> FMPropertyMeasure:
-        _concrete_compound_features = self._metrics[FMProperties.CONCRETE_COMPOUND_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.CONCRETE_COMPOUND_FEATURES.value, 
-                                 _concrete_compound_features, 
-                                 len(_concrete_compound_features),
-                                 get_ratio(_concrete_compound_features, self.fm_concrete_features().value))
+        return self._list_measure(FMProperties.CONCRETE_COMPOUND_FEATURES, FMProperties.CONCRETE_FEATURES)
 
     def fm_tree_relationships(self) -> FMPropertyMeasure:
-        _tree_relationships = self._metrics[FMProperties.TREE_RELATIONSHIPS.value]
-        return FMPropertyMeasure(FMProperties.TREE_RELATIONSHIPS.value, 
-                                 _tree_relationships, 
-                                 len(_tree_relationships))
+        return self._list_measure(FMProperties.TREE_RELATIONSHIPS)
 
     def fm_solitary_features(self) -> FMPropertyMeasure:
-        _solitary_features = self._metrics[FMProperties.SOLITARY_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.SOLITARY_FEATURES.value, 
-                                 _solitary_features, 
-                                 len(_solitary_features),
-                                 get_ratio(_solitary_features, self.fm_features().value))
+        return self._list_measure(FMProperties.SOLITARY_FEATURES, FMProperties.FEATURES)
 
     def fm_grouped_features(self) -> FMPropertyMeasure:
-        _grouped_features = self._metrics[FMProperties.GROUPED_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.GROUPED_FEATURES.value, 
-                                 _grouped_features, 
-                                 len(_grouped_features),
-                                 get_ratio(_grouped_features, self.fm_features().value))
+        return self._list_measure(FMProperties.GROUPED_FEATURES, FMProperties.FEATURES)
 
     def fm_mandatory_features(self) -> FMPropertyMeasure:
-        _mandatory_features = self._metrics[FMProperties.MANDATORY_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.MANDATORY_FEATURES.value, 
-                                 _mandatory_features, 
-                                 len(_mandatory_features),
-                                 get_ratio(_mandatory_features, self.fm_solitary_features().value))
+        return self._list_measure(FMProperties.MANDATORY_FEATURES, FMProperties.SOLITARY_FEATURES)
 
     def fm_optional_features(self) -> FMPropertyMeasure:
-        _optional_features = self._metrics[FMProperties.OPTIONAL_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.OPTIONAL_FEATURES.value, 
-                                 _optional_features, 
-                                 len(_optional_features),
-                                 get_ratio(_optional_features, self.fm_solitary_features().value))
+        return self._list_measure(FMProperties.OPTIONAL_FEATURES, FMProperties.SOLITARY_FEATURES)
 
     def fm_feature_groups(self) -> FMPropertyMeasure:
-        _feature_groups = self._metrics[FMProperties.FEATURE_GROUPS.value]
-        return FMPropertyMeasure(FMProperties.FEATURE_GROUPS.value, 
-                                 _feature_groups, 
-                                 len(_feature_groups),
-                                 get_ratio(_feature_groups, self.fm_tree_relationships().value))
+        return self._list_measure(FMProperties.FEATURE_GROUPS, FMProperties.TREE_RELATIONSHIPS)
     
     def fm_alternative_groups(self) -> FMPropertyMeasure:
-        _alternative_groups = self._metrics[FMProperties.ALTERNATIVE_GROUPS.value]
-        return FMPropertyMeasure(FMProperties.ALTERNATIVE_GROUPS.value, 
-                                 _alternative_groups, 
-                                 len(_alternative_groups),
-                                 get_ratio(_alternative_groups, self.fm_feature_groups().value))
+        return self._list_measure(FMProperties.ALTERNATIVE_GROUPS, FMProperties.FEATURE_GROUPS)
     
     def fm_or_groups(self) -> FMPropertyMeasure:
-        _or_groups = self._metrics[FMProperties.OR_GROUPS.value]
-        return FMPropertyMeasure(FMProperties.OR_GROUPS.value, 
-                                 _or_groups, 
-                                 len(_or_groups),
-                                 get_ratio(_or_groups, self.fm_feature_groups().value))
+        return self._list_measure(FMProperties.OR_GROUPS, FMProperties.FEATURE_GROUPS)
 
     def fm_mutex_groups(self) -> FMPropertyMeasure:
-        _mutex_groups = self._metrics[FMProperties.MUTEX_GROUPS.value]
-        return FMPropertyMeasure(FMProperties.MUTEX_GROUPS.value, 
-                                 _mutex_groups, 
-                                 len(_mutex_groups),
-                                 get_ratio(_mutex_groups, self.fm_grouped_features().value))
+        return self._list_measure(FMProperties.MUTEX_GROUPS, FMProperties.GROUPED_FEATURES)
 
     def fm_cardinality_groups(self) -> FMPropertyMeasure:
-        _cardinality_groups = self._metrics[FMProperties.CARDINALITY_GROUPS.value]
-        return FMPropertyMeasure(FMProperties.CARDINALITY_GROUPS.value, 
-                                 _cardinality_groups, 
-                                 len(_cardinality_groups),
-                                 get_ratio(_cardinality_groups, self.fm_grouped_features().value))
+        return self._list_measure(FMProperties.CARDINALITY_GROUPS, FMProperties.GROUPED_FEATURES)
     
     def fm_depth_tree(self) -> FMPropertyMeasure:
         _max_depth_tree = self._metrics[FMProperties.DEPTH_TREE.value]
@@ -244,88 +159,43 @@ class FMMetrics():
         return FMPropertyMeasure(FMProperties.AVG_CHILDREN_PER_FEATURE.value, round(_avg_children_per_feature, FMMetrics.PRECISION))
 
     def fm_cross_tree_constraints(self) -> FMPropertyMeasure:
-        _cross_tree_constraints = self._metrics[FMProperties.CROSS_TREE_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.CROSS_TREE_CONSTRAINTS.value, 
-                                 _cross_tree_constraints,
-                                 len(_cross_tree_constraints))
+        return self._list_measure(FMProperties.CROSS_TREE_CONSTRAINTS)
 
     def fm_logical_constraints(self) -> FMPropertyMeasure:
-        _logical_constraints = self._metrics[FMProperties.LOGICAL_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.LOGICAL_CONSTRAINTS.value, 
-                                 _logical_constraints,
-                                 len(_logical_constraints),
-                                 get_ratio(_logical_constraints, self.fm_cross_tree_constraints().value))
+        return self._list_measure(FMProperties.LOGICAL_CONSTRAINTS, FMProperties.CROSS_TREE_CONSTRAINTS)
     
     def fm_arithmetic_constraints(self) -> FMPropertyMeasure:
-        _arithmetic_constraints = self._metrics[FMProperties.ARITHMETIC_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.ARITHMETIC_CONSTRAINTS.value, 
-                                 _arithmetic_constraints,
-                                 len(_arithmetic_constraints),
-                                 get_ratio(_arithmetic_constraints, self.fm_cross_tree_constraints().value))
+        return self._list_measure(FMProperties.ARITHMETIC_CONSTRAINTS, FMProperties.CROSS_TREE_CONSTRAINTS)
     
     def fm_aggregation_constraints(self) -> FMPropertyMeasure:
-        _aggregation_constraints = self._metrics[FMProperties.AGGREGATION_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.AGGREGATION_CONSTRAINTS.value, 
-                                 _aggregation_constraints,
-                                 len(_aggregation_constraints),
-                                 get_ratio(_aggregation_constraints, self.fm_cross_tree_constraints().value))
+        return self._list_measure(FMProperties.AGGREGATION_CONSTRAINTS, FMProperties.CROSS_TREE_CONSTRAINTS)
+    
+    def fm_duplicate_constraints(self) -> FMPropertyMeasure:
+        return self._list_measure(FMProperties.DUPLICATE_CONSTRAINTS, FMProperties.CROSS_TREE_CONSTRAINTS)
     
     def fm_single_feature_constraints(self) -> FMPropertyMeasure:
-        _single_feature_constraints = self._metrics[FMProperties.SINGLE_FEATURE_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.SINGLE_FEATURE_CONSTRAINTS.value, 
-                                 _single_feature_constraints,
-                                 len(_single_feature_constraints),
-                                 get_ratio(_single_feature_constraints, self.fm_logical_constraints().value))
+        return self._list_measure(FMProperties.SINGLE_FEATURE_CONSTRAINTS, FMProperties.LOGICAL_CONSTRAINTS)
 
     def fm_simple_constraints(self) -> FMPropertyMeasure:
-        _simple_constraints = self._metrics[FMProperties.SIMPLE_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.SIMPLE_CONSTRAINTS.value, 
-                                 _simple_constraints,
-                                 len(_simple_constraints),
-                                 get_ratio(_simple_constraints, self.fm_logical_constraints().value))
+        return self._list_measure(FMProperties.SIMPLE_CONSTRAINTS, FMProperties.LOGICAL_CONSTRAINTS)
 
     def fm_requires_constraints(self) -> FMPropertyMeasure:
-        _requires_constraints = self._metrics[FMProperties.REQUIRES_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.REQUIRES_CONSTRAINTS.value, 
-                                 _requires_constraints,
-                                 len(_requires_constraints),
-                                 get_ratio(_requires_constraints, self.fm_simple_constraints().value))
+        return self._list_measure(FMProperties.REQUIRES_CONSTRAINTS, FMProperties.SIMPLE_CONSTRAINTS)
 
     def fm_excludes_constraints(self) -> FMPropertyMeasure:
-        _excludes_constraints = self._metrics[FMProperties.EXCLUDES_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.EXCLUDES_CONSTRAINTS.value, 
-                                 _excludes_constraints,
-                                 len(_excludes_constraints),
-                                 get_ratio(_excludes_constraints, self.fm_simple_constraints().value))
+        return self._list_measure(FMProperties.EXCLUDES_CONSTRAINTS, FMProperties.SIMPLE_CONSTRAINTS)
 
     def fm_complex_constraints(self) -> FMPropertyMeasure:
-        _complex_constraints = self._metrics[FMProperties.COMPLEX_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.COMPLEX_CONSTRAINTS.value, 
-                                 _complex_constraints,
-                                 len(_complex_constraints),
-                                 get_ratio(_complex_constraints, self.fm_logical_constraints().value))
+        return self._list_measure(FMProperties.COMPLEX_CONSTRAINTS, FMProperties.LOGICAL_CONSTRAINTS)
 
     def fm_pseudocomplex_constraints(self) -> FMPropertyMeasure:
-        _pseudocomplex_constraints = self._metrics[FMProperties.PSEUDO_COMPLEX_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.PSEUDO_COMPLEX_CONSTRAINTS.value, 
-                                 _pseudocomplex_constraints,
-                                 len(_pseudocomplex_constraints),
-                                 get_ratio(_pseudocomplex_constraints, self.fm_complex_constraints().value))
+        return self._list_measure(FMProperties.PSEUDO_COMPLEX_CONSTRAINTS, FMProperties.COMPLEX_CONSTRAINTS)
 
     def fm_strictcomplex_constraints(self) -> FMPropertyMeasure:
-        _strictcomplex_constraints = self._metrics[FMProperties.STRICT_COMPLEX_CONSTRAINTS.value]
-        return FMPropertyMeasure(FMProperties.STRICT_COMPLEX_CONSTRAINTS.value, 
-                                 _strictcomplex_constraints,
-                                 len(_strictcomplex_constraints),
-                                 get_ratio(_strictcomplex_constraints, self.fm_complex_constraints().value))
+        return self._list_measure(FMProperties.STRICT_COMPLEX_CONSTRAINTS, FMProperties.COMPLEX_CONSTRAINTS)
 
     def fm_extra_constraint_representativeness(self) -> FMPropertyMeasure:
-        _features_in_constraints = self._metrics[FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value]
-        _ecr = get_ratio(_features_in_constraints, self.fm_features().value, FMMetrics.PRECISION)
-        return FMPropertyMeasure(FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value,
-                                 _features_in_constraints,
-                                 len(_features_in_constraints),
-                                 _ecr)
+        return self._list_measure(FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS, FMProperties.FEATURES)
 
     def fm_min_constraints_per_feature(self) -> FMPropertyMeasure:
         _constraints_per_feature = self._metrics[FMProperties.MIN_CONSTRAINTS_PER_FEATURE.value]
@@ -352,13 +222,10 @@ class FMMetrics():
         return FMPropertyMeasure(FMProperties.AVG_FEATURES_PER_CONSTRAINT.value, round(_features_per_constraint, FMMetrics.PRECISION))
     
     def fm_feature_attributes(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.FEATURE_ATTRIBUTES.value]
-        return FMPropertyMeasure(FMProperties.FEATURE_ATTRIBUTES.value, _result, len(_result))
+        return self._list_measure(FMProperties.FEATURE_ATTRIBUTES)
     
     def fm_features_with_attributes(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.FEATURES_WITH_ATTRIBUTES.value]
-        return FMPropertyMeasure(FMProperties.FEATURES_WITH_ATTRIBUTES.value, _result, len(_result), 
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.FEATURES_WITH_ATTRIBUTES, FMProperties.FEATURES)
     
     def fm_min_attributes_per_feature(self) -> FMPropertyMeasure:
         _result = self._metrics[FMProperties.MIN_ATTRIBUTES_PER_FEATURE.value]
@@ -377,108 +244,257 @@ class FMMetrics():
         return FMPropertyMeasure(FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value, round(_result, FMMetrics.PRECISION))
 
     def fm_multi_features(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.MULTI_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.MULTI_FEATURES.value, 
-                                 _result,
-                                 len(_result),
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.MULTI_FEATURES, FMProperties.FEATURES)
 
     def fm_typed_features(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.TYPED_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.TYPED_FEATURES.value, 
-                                 _result,
-                                 len(_result),
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.TYPED_FEATURES, FMProperties.FEATURES)
 
     def fm_numerical_features(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.NUMERICAL_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.NUMERICAL_FEATURES.value, 
-                                 _result,
-                                 len(_result),
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.NUMERICAL_FEATURES, FMProperties.FEATURES)
 
     def fm_integer_features(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.INTEGER_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.INTEGER_FEATURES.value, 
-                                 _result,
-                                 len(_result),
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.INTEGER_FEATURES, FMProperties.FEATURES)
     
     def fm_real_features(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.REAL_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.REAL_FEATURES.value, 
-                                 _result,
-                                 len(_result),
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.REAL_FEATURES, FMProperties.FEATURES)
     
     def fm_string_features(self) -> FMPropertyMeasure:
-        _result = self._metrics[FMProperties.STRING_FEATURES.value]
-        return FMPropertyMeasure(FMProperties.STRING_FEATURES.value, 
-                                 _result,
-                                 len(_result),
-                                 get_ratio(_result, self.fm_features().value))
+        return self._list_measure(FMProperties.STRING_FEATURES, FMProperties.FEATURES)
     
 
-def traverse_metrics(fm: FeatureModel) -> dict[str, Any]:
-    """Calculate all metrics from the feature model in only one traversing of the tree."""
-    metrics: dict[str, Any] = {}
+# Metrics in the order of the fact label. The metrics whose ratios are relative to another metric
+# depend on it (the dependencies are registered first).
+METRICS = FMPropertyRegistry()
+METRICS.register(FMProperties.FEATURES, FMMetrics.fm_features)
+METRICS.register(FMProperties.ABSTRACT_FEATURES, FMMetrics.fm_abstract_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.ABSTRACT_LEAF_FEATURES, FMMetrics.fm_abstract_leaf_features, [FMProperties.ABSTRACT_FEATURES])
+METRICS.register(FMProperties.ABSTRACT_COMPOUND_FEATURES, FMMetrics.fm_abstract_compound_features, [FMProperties.ABSTRACT_FEATURES])
+METRICS.register(FMProperties.CONCRETE_FEATURES, FMMetrics.fm_concrete_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.CONCRETE_LEAF_FEATURES, FMMetrics.fm_concrete_leaf_features, [FMProperties.CONCRETE_FEATURES])
+METRICS.register(FMProperties.CONCRETE_COMPOUND_FEATURES, FMMetrics.fm_concrete_compound_features, [FMProperties.CONCRETE_FEATURES])
+METRICS.register(FMProperties.COMPOUND_FEATURES, FMMetrics.fm_compound_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.LEAF_FEATURES, FMMetrics.fm_leaf_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.ROOT_FEATURE, FMMetrics.fm_root_feature, [FMProperties.FEATURES])
+METRICS.register(FMProperties.TOP_FEATURES, FMMetrics.fm_top_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.SOLITARY_FEATURES, FMMetrics.fm_solitary_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.GROUPED_FEATURES, FMMetrics.fm_grouped_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.TYPED_FEATURES, FMMetrics.fm_typed_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.NUMERICAL_FEATURES, FMMetrics.fm_numerical_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.INTEGER_FEATURES, FMMetrics.fm_integer_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.REAL_FEATURES, FMMetrics.fm_real_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.STRING_FEATURES, FMMetrics.fm_string_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.MULTI_FEATURES, FMMetrics.fm_multi_features, [FMProperties.FEATURES])
+METRICS.register(FMProperties.TREE_RELATIONSHIPS, FMMetrics.fm_tree_relationships)
+METRICS.register(FMProperties.MANDATORY_FEATURES, FMMetrics.fm_mandatory_features, [FMProperties.SOLITARY_FEATURES])
+METRICS.register(FMProperties.OPTIONAL_FEATURES, FMMetrics.fm_optional_features, [FMProperties.SOLITARY_FEATURES])
+METRICS.register(FMProperties.FEATURE_GROUPS, FMMetrics.fm_feature_groups, [FMProperties.TREE_RELATIONSHIPS])
+METRICS.register(FMProperties.ALTERNATIVE_GROUPS, FMMetrics.fm_alternative_groups, [FMProperties.FEATURE_GROUPS])
+METRICS.register(FMProperties.OR_GROUPS, FMMetrics.fm_or_groups, [FMProperties.FEATURE_GROUPS])
+METRICS.register(FMProperties.MUTEX_GROUPS, FMMetrics.fm_mutex_groups, [FMProperties.GROUPED_FEATURES])
+METRICS.register(FMProperties.CARDINALITY_GROUPS, FMMetrics.fm_cardinality_groups, [FMProperties.GROUPED_FEATURES])
+METRICS.register(FMProperties.DEPTH_TREE, FMMetrics.fm_depth_tree)
+METRICS.register(FMProperties.MEAN_DEPTH_TREE, FMMetrics.fm_mean_depth_tree)
+METRICS.register(FMProperties.BRANCHING_FACTOR, FMMetrics.fm_avg_branching_factor)
+METRICS.register(FMProperties.MIN_CHILDREN_PER_FEATURE, FMMetrics.fm_min_children_per_feature)
+METRICS.register(FMProperties.MAX_CHILDREN_PER_FEATURE, FMMetrics.fm_max_children_per_feature)
+METRICS.register(FMProperties.AVG_CHILDREN_PER_FEATURE, FMMetrics.fm_avg_children_per_feature)
+METRICS.register(FMProperties.CROSS_TREE_CONSTRAINTS, FMMetrics.fm_cross_tree_constraints)
+METRICS.register(FMProperties.LOGICAL_CONSTRAINTS, FMMetrics.fm_logical_constraints, [FMProperties.CROSS_TREE_CONSTRAINTS])
+METRICS.register(FMProperties.SINGLE_FEATURE_CONSTRAINTS, FMMetrics.fm_single_feature_constraints, [FMProperties.LOGICAL_CONSTRAINTS])
+METRICS.register(FMProperties.SIMPLE_CONSTRAINTS, FMMetrics.fm_simple_constraints, [FMProperties.LOGICAL_CONSTRAINTS])
+METRICS.register(FMProperties.REQUIRES_CONSTRAINTS, FMMetrics.fm_requires_constraints, [FMProperties.SIMPLE_CONSTRAINTS])
+METRICS.register(FMProperties.EXCLUDES_CONSTRAINTS, FMMetrics.fm_excludes_constraints, [FMProperties.SIMPLE_CONSTRAINTS])
+METRICS.register(FMProperties.COMPLEX_CONSTRAINTS, FMMetrics.fm_complex_constraints, [FMProperties.LOGICAL_CONSTRAINTS])
+METRICS.register(FMProperties.PSEUDO_COMPLEX_CONSTRAINTS, FMMetrics.fm_pseudocomplex_constraints, [FMProperties.COMPLEX_CONSTRAINTS])
+METRICS.register(FMProperties.STRICT_COMPLEX_CONSTRAINTS, FMMetrics.fm_strictcomplex_constraints, [FMProperties.COMPLEX_CONSTRAINTS])
+METRICS.register(FMProperties.ARITHMETIC_CONSTRAINTS, FMMetrics.fm_arithmetic_constraints, [FMProperties.CROSS_TREE_CONSTRAINTS])
+METRICS.register(FMProperties.AGGREGATION_CONSTRAINTS, FMMetrics.fm_aggregation_constraints, [FMProperties.CROSS_TREE_CONSTRAINTS])
+METRICS.register(FMProperties.DUPLICATE_CONSTRAINTS, FMMetrics.fm_duplicate_constraints, [FMProperties.CROSS_TREE_CONSTRAINTS])
+METRICS.register(FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS, FMMetrics.fm_extra_constraint_representativeness, [FMProperties.FEATURES])
+METRICS.register(FMProperties.MIN_FEATURES_PER_CONSTRAINT, FMMetrics.fm_min_features_per_constraint)
+METRICS.register(FMProperties.MAX_FEATURES_PER_CONSTRAINT, FMMetrics.fm_max_features_per_constraint)
+METRICS.register(FMProperties.AVG_FEATURES_PER_CONSTRAINT, FMMetrics.fm_avg_features_per_constraint)
+METRICS.register(FMProperties.AVG_CONSTRAINTS_PER_FEATURE, FMMetrics.fm_avg_constraints_per_feature)
+METRICS.register(FMProperties.MIN_CONSTRAINTS_PER_FEATURE, FMMetrics.fm_min_constraints_per_feature)
+METRICS.register(FMProperties.MAX_CONSTRAINTS_PER_FEATURE, FMMetrics.fm_max_constraints_per_feature)
+METRICS.register(FMProperties.FEATURE_ATTRIBUTES, FMMetrics.fm_feature_attributes)
+METRICS.register(FMProperties.FEATURES_WITH_ATTRIBUTES, FMMetrics.fm_features_with_attributes, [FMProperties.FEATURES])
+METRICS.register(FMProperties.MIN_ATTRIBUTES_PER_FEATURE, FMMetrics.fm_min_attributes_per_feature)
+METRICS.register(FMProperties.MAX_ATTRIBUTES_PER_FEATURE, FMMetrics.fm_max_attributes_per_feature)
+METRICS.register(FMProperties.AVG_ATTRIBUTES_PER_FEATURE, FMMetrics.fm_avg_attributes_per_feature)
+METRICS.register(FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES, FMMetrics.fm_avg_attributes_per_feature_with_attributes)
+
+
+# Lists of features: the features whose flags, masked, are equal to the value (mask, value)
+FEATURE_FLAGS: dict[FMProperty, tuple[int, int]] = {
+    FMProperties.FEATURES.value: (0, 0),
+    FMProperties.ABSTRACT_FEATURES.value: (ABSTRACT, ABSTRACT),
+    FMProperties.CONCRETE_FEATURES.value: (ABSTRACT, 0),
+    FMProperties.LEAF_FEATURES.value: (LEAF, LEAF),
+    FMProperties.COMPOUND_FEATURES.value: (LEAF, 0),
+    FMProperties.CONCRETE_COMPOUND_FEATURES.value: (ABSTRACT | LEAF, 0),
+    FMProperties.CONCRETE_LEAF_FEATURES.value: (ABSTRACT | LEAF, LEAF),
+    FMProperties.ABSTRACT_COMPOUND_FEATURES.value: (ABSTRACT | LEAF, ABSTRACT),
+    FMProperties.ABSTRACT_LEAF_FEATURES.value: (ABSTRACT | LEAF, ABSTRACT | LEAF),
+    FMProperties.ROOT_FEATURE.value: (ROOT, ROOT),
+    FMProperties.TOP_FEATURES.value: (TOP, TOP),
+    FMProperties.SOLITARY_FEATURES.value: (SOLITARY, SOLITARY),
+    FMProperties.GROUPED_FEATURES.value: (GROUPED, GROUPED),
+    FMProperties.MULTI_FEATURES.value: (MULTI, MULTI),
+    FMProperties.TYPED_FEATURES.value: (TYPED, TYPED),
+    FMProperties.NUMERICAL_FEATURES.value: (NUMERICAL, NUMERICAL),
+    FMProperties.INTEGER_FEATURES.value: (INTEGER, INTEGER),
+    FMProperties.REAL_FEATURES.value: (REAL, REAL),
+    FMProperties.STRING_FEATURES.value: (STRING, STRING),
+    FMProperties.FEATURES_WITH_ATTRIBUTES.value: (ATTRIBUTES, ATTRIBUTES),
+}
+
+# Lists of relations: the relations of the given kinds
+RELATION_KINDS: dict[FMProperty, tuple[int, ...]] = {
+    FMProperties.TREE_RELATIONSHIPS.value: (OTHER, MANDATORY, OPTIONAL) + GROUPS,
+    FMProperties.FEATURE_GROUPS.value: GROUPS,
+    FMProperties.OR_GROUPS.value: (OR,),
+    FMProperties.ALTERNATIVE_GROUPS.value: (ALTERNATIVE,),
+    FMProperties.MUTEX_GROUPS.value: (MUTEX,),
+    FMProperties.CARDINALITY_GROUPS.value: (CARDINALITY,),
+}
+
+# Lists of constraints of each kind of constraint
+CONSTRAINT_KINDS: dict[str, tuple[FMProperty, ...]] = {
+    constraints_utils.SINGLE_FEATURE: (FMProperties.LOGICAL_CONSTRAINTS.value, 
+                                       FMProperties.SINGLE_FEATURE_CONSTRAINTS.value),
+    constraints_utils.REQUIRES: (FMProperties.LOGICAL_CONSTRAINTS.value, 
+                                 FMProperties.SIMPLE_CONSTRAINTS.value, 
+                                 FMProperties.REQUIRES_CONSTRAINTS.value),
+    constraints_utils.EXCLUDES: (FMProperties.LOGICAL_CONSTRAINTS.value, 
+                                 FMProperties.SIMPLE_CONSTRAINTS.value, 
+                                 FMProperties.EXCLUDES_CONSTRAINTS.value),
+    constraints_utils.PSEUDO_COMPLEX: (FMProperties.LOGICAL_CONSTRAINTS.value, 
+                                       FMProperties.COMPLEX_CONSTRAINTS.value, 
+                                       FMProperties.PSEUDO_COMPLEX_CONSTRAINTS.value),
+    constraints_utils.STRICT_COMPLEX: (FMProperties.LOGICAL_CONSTRAINTS.value, 
+                                       FMProperties.COMPLEX_CONSTRAINTS.value, 
+                                       FMProperties.STRICT_COMPLEX_CONSTRAINTS.value),
+    constraints_utils.AGGREGATION: (FMProperties.AGGREGATION_CONSTRAINTS.value,),
+    constraints_utils.ARITHMETIC: (FMProperties.ARITHMETIC_CONSTRAINTS.value,),
+    constraints_utils.OTHER: (),
+}
+
+# Metrics calculated from the columns of the features and from those of the constraints
+FEATURE_METRICS: tuple[FMProperty, ...] = (
+    *FEATURE_FLAGS,
+    *RELATION_KINDS,
+    FMProperties.MANDATORY_FEATURES.value,
+    FMProperties.OPTIONAL_FEATURES.value,
+    FMProperties.MIN_CHILDREN_PER_FEATURE.value,
+    FMProperties.MAX_CHILDREN_PER_FEATURE.value,
+    FMProperties.AVG_CHILDREN_PER_FEATURE.value,
+    FMProperties.DEPTH_TREE.value,
+    FMProperties.MEAN_DEPTH_TREE.value,
+    FMProperties.BRANCHING_FACTOR.value,
+    FMProperties.FEATURE_ATTRIBUTES.value,
+    FMProperties.MIN_ATTRIBUTES_PER_FEATURE.value,
+    FMProperties.MAX_ATTRIBUTES_PER_FEATURE.value,
+    FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value,
+    FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value,
+)
+CONSTRAINT_METRICS: tuple[FMProperty, ...] = (
+    FMProperties.CROSS_TREE_CONSTRAINTS.value,
+    FMProperties.LOGICAL_CONSTRAINTS.value,
+    FMProperties.ARITHMETIC_CONSTRAINTS.value,
+    FMProperties.AGGREGATION_CONSTRAINTS.value,
+    FMProperties.DUPLICATE_CONSTRAINTS.value,
+    FMProperties.SINGLE_FEATURE_CONSTRAINTS.value,
+    FMProperties.SIMPLE_CONSTRAINTS.value,
+    FMProperties.REQUIRES_CONSTRAINTS.value,
+    FMProperties.EXCLUDES_CONSTRAINTS.value,
+    FMProperties.COMPLEX_CONSTRAINTS.value,
+    FMProperties.PSEUDO_COMPLEX_CONSTRAINTS.value,
+    FMProperties.STRICT_COMPLEX_CONSTRAINTS.value,
+    FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value,
+    FMProperties.MIN_FEATURES_PER_CONSTRAINT.value,
+    FMProperties.MAX_FEATURES_PER_CONSTRAINT.value,
+    FMProperties.AVG_FEATURES_PER_CONSTRAINT.value,
+    FMProperties.MIN_CONSTRAINTS_PER_FEATURE.value,
+    FMProperties.MAX_CONSTRAINTS_PER_FEATURE.value,
+    FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value,
+)
+
+
+class FMMetricsTable(dict):
+    """Metrics of a feature model by name.
+
+    The metrics are calculated by traversals that run the first time one of their metrics
+    is requested. The lists of features and relations are materialized (and cached) the
+    first time they are requested; their sizes are available without materializing them.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lazy: dict[FMProperty, Callable[[], list[str]]] = {}
+        self._sizes: dict[FMProperty, Callable[[], int]] = {}
+        self._traversals: dict[FMProperty, Callable[[], None]] = {}
+
+    def add_traversal(self, names: Collection[FMProperty], traverse: Callable[[], None]) -> None:
+        """Register the traversal that calculates the metrics of the names.
+
+        It runs once, the first time that one of its metrics is requested.
+        """
+        for name in names:
+            self._traversals[name] = traverse
+
+    def add_lazy(self, name: FMProperty, materialize: Callable[[], list[str]], size: Callable[[], int]) -> None:
+        self._lazy[name] = materialize
+        self._sizes[name] = size
+
+    def size(self, name: FMProperty) -> int:
+        """Return the size of the metric (e.g., the number of features of a list of features)."""
+        self._traverse(name)
+        if name in self or name not in self._sizes:
+            return len(self[name])
+        return self._sizes[name]()
+
+    def __missing__(self, name: FMProperty) -> Any:
+        if name in self._traversals:
+            self._traverse(name)
+            return self[name]
+        if name not in self._lazy:
+            raise KeyError(name)
+        value = self[name] = self._lazy.pop(name)()
+        return value
+
+    def _traverse(self, name: FMProperty) -> None:
+        traverse = self._traversals.get(name)
+        if traverse is not None:
+            for other in [other for other, pending in self._traversals.items() if pending is traverse]:
+                del self._traversals[other]
+            traverse()
+
+
+def traverse_metrics(fm: FeatureModel, table: Optional[Callable[[], FeatureTable]] = None) -> FMMetricsTable:
+    """Calculate all metrics from the columnar representation of the feature model
+    (see `FeatureTable`), built by a single traversal of the tree and one of the constraints.
+
+    The metrics of the features and those of the constraints are calculated the first time
+    that one of their metrics is requested (e.g., the constraints are not tabulated if only 
+    the features are requested).
+    """
+    metrics = FMMetricsTable()
     if fm is None:
         return metrics
-    ## Features metrics
-    metrics[FMProperties.FEATURES.value] = list()
-    metrics[FMProperties.ABSTRACT_FEATURES.value] = list()
-    metrics[FMProperties.CONCRETE_FEATURES.value] = list()
-    metrics[FMProperties.LEAF_FEATURES.value] = list()
-    metrics[FMProperties.COMPOUND_FEATURES.value] = list()
-    metrics[FMProperties.CONCRETE_COMPOUND_FEATURES.value] = list()
-    metrics[FMProperties.CONCRETE_LEAF_FEATURES.value] = list()
-    metrics[FMProperties.ABSTRACT_COMPOUND_FEATURES.value] = list()
-    metrics[FMProperties.ABSTRACT_LEAF_FEATURES.value] = list()
-    metrics[FMProperties.TREE_RELATIONSHIPS.value] = list()
-    metrics[FMProperties.ROOT_FEATURE.value] = list()
-    metrics[FMProperties.TOP_FEATURES.value] = list()
-    metrics[FMProperties.SOLITARY_FEATURES.value] = list()
-    metrics[FMProperties.GROUPED_FEATURES.value] = list()
-    metrics[FMProperties.MANDATORY_FEATURES.value] = list()
-    metrics[FMProperties.OPTIONAL_FEATURES.value] = list()
-    metrics[FMProperties.FEATURE_GROUPS.value] = list()
-    metrics[FMProperties.ALTERNATIVE_GROUPS.value] = list()
-    metrics[FMProperties.OR_GROUPS.value] = list()
-    metrics[FMProperties.MUTEX_GROUPS.value] = list()
-    metrics[FMProperties.CARDINALITY_GROUPS.value] = list()
-    metrics[FMProperties.MIN_CHILDREN_PER_FEATURE.value] = None
-    metrics[FMProperties.MAX_CHILDREN_PER_FEATURE.value] = 0
-    metrics[FMProperties.AVG_CHILDREN_PER_FEATURE.value] = list()
-    metrics[FMProperties.DEPTH_TREE.value] = 0
-    metrics[FMProperties.MEAN_DEPTH_TREE.value] = list()
-    metrics[FMProperties.FEATURE_ATTRIBUTES.value] = set()
-    metrics[FMProperties.FEATURES_WITH_ATTRIBUTES.value] = list()
-    metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value] = list()
-    metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value] = list()
-    metrics['Branches'] = 0
-    metrics['Children'] = 0
-    metrics[FMProperties.INTEGER_FEATURES.value] = list()
-    metrics[FMProperties.REAL_FEATURES.value] = list()
-    metrics[FMProperties.STRING_FEATURES.value] = list()
-    metrics[FMProperties.NUMERICAL_FEATURES.value] = list()
-    metrics[FMProperties.TYPED_FEATURES.value] = list()
-    metrics[FMProperties.MULTI_FEATURES.value] = list()
-
-    traverse_feature_metrics(fm.root, metrics)
-    metrics[FMProperties.BRANCHING_FACTOR.value] = 0 if metrics['Branches'] == 0 else round(metrics['Children'] / metrics['Branches'], FMMetrics.PRECISION)
-    metrics[FMProperties.MEAN_DEPTH_TREE.value] = 0 if not metrics[FMProperties.MEAN_DEPTH_TREE.value] else statistics.mean(metrics[FMProperties.MEAN_DEPTH_TREE.value])
-    metrics[FMProperties.AVG_CHILDREN_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_CHILDREN_PER_FEATURE.value] else statistics.mean(metrics[FMProperties.AVG_CHILDREN_PER_FEATURE.value])
-    metrics[FMProperties.MIN_ATTRIBUTES_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value] else min(metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value])
-    metrics[FMProperties.MAX_ATTRIBUTES_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value] else max(metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value])
-    metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value] else statistics.mean(metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value])
-    metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value] = 0 if not metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value] else statistics.mean(metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value])
-    metrics[FMProperties.FEATURE_ATTRIBUTES.value] = list(metrics[FMProperties.FEATURE_ATTRIBUTES.value])
-
-    ## Constraints metrics
-    metrics[FMProperties.CROSS_TREE_CONSTRAINTS.value] = list()
+    if table is None:
+        table = functools.cache(lambda: FeatureTable(fm))
+    metrics.add_traversal(FEATURE_METRICS, lambda: calculate_feature_metrics(table(), metrics))
+    metrics.add_traversal(CONSTRAINT_METRICS, lambda: calculate_constraints_metrics(table().constraints, metrics))
+    return metrics
+
+
+def calculate_constraints_metrics(constraints: ConstraintTable, metrics: FMMetricsTable) -> None:
+    metrics[FMProperties.CROSS_TREE_CONSTRAINTS.value] = list(constraints.strings)
     metrics[FMProperties.LOGICAL_CONSTRAINTS.value] = list()
     metrics[FMProperties.ARITHMETIC_CONSTRAINTS.value] = list()
     metrics[FMProperties.AGGREGATION_CONSTRAINTS.value] = list()
+    metrics[FMProperties.DUPLICATE_CONSTRAINTS.value] = list()
     metrics[FMProperties.SINGLE_FEATURE_CONSTRAINTS.value] = list()
     metrics[FMProperties.SIMPLE_CONSTRAINTS.value] = list()
     metrics[FMProperties.REQUIRES_CONSTRAINTS.value] = list()
@@ -486,131 +502,95 @@ def traverse_metrics(fm: FeatureModel) -> dict[str, Any]:
     metrics[FMProperties.COMPLEX_CONSTRAINTS.value] = list()
     metrics[FMProperties.PSEUDO_COMPLEX_CONSTRAINTS.value] = list()
     metrics[FMProperties.STRICT_COMPLEX_CONSTRAINTS.value] = list()
-    metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value] = defaultdict(int)
-    metrics[FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value] = set()
-    metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value] = list()
-
-    traverse_constraints_metrics(fm, metrics)
-    metrics[FMProperties.MIN_FEATURES_PER_CONSTRAINT.value] = 0 if not metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value] else min(metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value])
-    metrics[FMProperties.MAX_FEATURES_PER_CONSTRAINT.value] = 0 if not metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value] else max(metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value])
-    metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value] = 0 if not metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value] else statistics.mean(metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value])
-    metrics[FMProperties.MIN_CONSTRAINTS_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value] else min(metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value].values())
-    metrics[FMProperties.MAX_CONSTRAINTS_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value] else max(metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value].values())
-    metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value] = 0 if not metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value] else statistics.mean(metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value].values())
-    metrics[FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value] = list(metrics[FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value])
-    return metrics
-
-
-def traverse_feature_metrics(feature: Feature, metrics: dict[str, Any], depth: int = 0) -> None:
-    if feature is not None:
-        metrics[FMProperties.FEATURES.value].append(feature.name)
-        if feature.parent is None:
-            metrics[FMProperties.ROOT_FEATURE.value].append(feature.name)
-            metrics[FMProperties.SOLITARY_FEATURES.value].append(feature.name)
-        elif feature.parent.is_root():
-            metrics[FMProperties.TOP_FEATURES.value].append(feature.name)
-        if feature.parent is not None and not feature.parent.is_group():
-            metrics[FMProperties.SOLITARY_FEATURES.value].append(feature.name)
-        if feature.feature_cardinality.min != 1 or feature.feature_cardinality.max != 1:
-            metrics[FMProperties.MULTI_FEATURES.value].append(feature.name)
-        if feature.feature_type != FeatureType.BOOLEAN:
-            metrics[FMProperties.TYPED_FEATURES.value].append(feature.name)
-            if feature.feature_type == FeatureType.INTEGER:
-                metrics[FMProperties.INTEGER_FEATURES.value].append(feature.name)
-                metrics[FMProperties.NUMERICAL_FEATURES.value].append(feature.name)
-            elif feature.feature_type == FeatureType.REAL:
-                metrics[FMProperties.REAL_FEATURES.value].append(feature.name)
-                metrics[FMProperties.NUMERICAL_FEATURES.value].append(feature.name)
-            elif feature.feature_type == FeatureType.STRING:
-                metrics[FMProperties.STRING_FEATURES.value].append(feature.name)
-
-        # Attributes
-        attributes = feature.get_attributes()
-        metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value].append(len(attributes))
-        if attributes:
-            metrics[FMProperties.FEATURES_WITH_ATTRIBUTES.value].append(feature.name)
-            metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value].append(len(attributes))
-            for attribute in attributes:
-                metrics[FMProperties.FEATURE_ATTRIBUTES.value].add(attribute.name)
-
-        relations = feature.get_relations()
-        n_children = 0
-        if relations:  # it is a compound feature (non leaf)
-            metrics[FMProperties.COMPOUND_FEATURES.value].append(feature.name)
-            if feature.is_abstract:
-                metrics[FMProperties.ABSTRACT_FEATURES.value].append(feature.name)
-                metrics[FMProperties.ABSTRACT_COMPOUND_FEATURES.value].append(feature.name)
-            else:
-                metrics[FMProperties.CONCRETE_FEATURES.value].append(feature.name)
-                metrics[FMProperties.CONCRETE_COMPOUND_FEATURES.value].append(feature.name)
-            metrics['Branches'] += 1
-
-            for relation in feature.get_relations():
-                metrics[FMProperties.TREE_RELATIONSHIPS.value].append(str(relation))
-                if relation.is_mandatory():
-                    n_children += 1
-                    metrics[FMProperties.MANDATORY_FEATURES.value].append(feature.name)
-                    traverse_feature_metrics(relation.children[0], metrics, depth + 1)
-                elif relation.is_optional():
-                    n_children += 1
-                    metrics[FMProperties.OPTIONAL_FEATURES.value].append(feature.name)
-                    traverse_feature_metrics(relation.children[0], metrics, depth + 1)
-                elif relation.is_group():
-                    n_children += len(relation.children)
-                    metrics[FMProperties.FEATURE_GROUPS.value].append(str(relation))
-                    if relation.is_or():
-                        metrics[FMProperties.OR_GROUPS.value].append(str(relation))
-                    elif relation.is_alternative():
-                        metrics[FMProperties.ALTERNATIVE_GROUPS.value].append(str(relation))
-                    elif relation.is_mutex():
-                        metrics[FMProperties.MUTEX_GROUPS.value].append(str(relation))
-                    else:
-                        metrics[FMProperties.CARDINALITY_GROUPS.value].append(str(relation))
-                    for child in relation.children:
-                        metrics[FMProperties.GROUPED_FEATURES.value].append(child.name)
-                        traverse_feature_metrics(child, metrics, depth + 1)
-            metrics['Children'] += n_children
-            metrics[FMProperties.MIN_CHILDREN_PER_FEATURE.value] = n_children if metrics[FMProperties.MIN_CHILDREN_PER_FEATURE.value] is None else min(metrics[FMProperties.MIN_CHILDREN_PER_FEATURE.value], n_children)
-            metrics[FMProperties.MAX_CHILDREN_PER_FEATURE.value] = max(metrics[FMProperties.MAX_CHILDREN_PER_FEATURE.value], n_children)
-        else:  # it is a leaf feature
-            metrics[FMProperties.LEAF_FEATURES.value].append(feature.name)
-            if feature.is_abstract:
-                metrics[FMProperties.ABSTRACT_FEATURES.value].append(feature.name)
-                metrics[FMProperties.ABSTRACT_LEAF_FEATURES.value].append(feature.name)
-            else:
-                metrics[FMProperties.CONCRETE_FEATURES.value].append(feature.name)
-                metrics[FMProperties.CONCRETE_LEAF_FEATURES.value].append(feature.name)
-            metrics[FMProperties.DEPTH_TREE.value] = max(metrics[FMProperties.DEPTH_TREE.value], depth)
-            metrics[FMProperties.MEAN_DEPTH_TREE.value].append(depth)
-        metrics[FMProperties.AVG_CHILDREN_PER_FEATURE.value].append(n_children)
-
-
-def traverse_constraints_metrics(fm: FeatureModel, metrics: dict[str, Any]) -> None:
-    for ctc in fm.get_constraints():
-        metrics[FMProperties.CROSS_TREE_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-        if ctc.is_logical_constraint():
-            metrics[FMProperties.LOGICAL_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-            if ctc.is_single_feature_constraint():
-                metrics[FMProperties.SINGLE_FEATURE_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-            elif ctc.is_requires_constraint():
-                metrics[FMProperties.SIMPLE_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-                metrics[FMProperties.REQUIRES_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-            elif ctc.is_excludes_constraint():
-                metrics[FMProperties.SIMPLE_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-                metrics[FMProperties.EXCLUDES_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-            else:
-                metrics[FMProperties.COMPLEX_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-                if ctc.is_pseudocomplex_constraint():
-                    metrics[FMProperties.PSEUDO_COMPLEX_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-                else:
-                    metrics[FMProperties.STRICT_COMPLEX_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-        elif ctc.is_aggregation_constraint():
-            metrics[FMProperties.AGGREGATION_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-        elif ctc.is_arithmetic_constraint():
-            metrics[FMProperties.ARITHMETIC_CONSTRAINTS.value].append(ctc.ast.pretty_str())
-        
-        features = ctc.get_features()
-        metrics[FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value].update(features)
-        metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value].append(len(features))
-        for feature in features:
-            metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value][feature] += 1
+    for ctc_str, kind, duplicate in zip(constraints.strings, constraints.kinds, constraints.duplicates):
+        if duplicate:
+            metrics[FMProperties.DUPLICATE_CONSTRAINTS.value].append(ctc_str)
+        for fm_property in CONSTRAINT_KINDS[kind]:
+            metrics[fm_property].append(ctc_str)
+
+    # Reductions of the rows and columns of the incidence matrix of the constraints and the features
+    features_per_constraint = constraints.row_sizes()
+    constraints_per_feature = constraints.column_counts()
+    metrics[FMProperties.MIN_FEATURES_PER_CONSTRAINT.value] = min(features_per_constraint, default=0)
+    metrics[FMProperties.MAX_FEATURES_PER_CONSTRAINT.value] = max(features_per_constraint, default=0)
+    metrics[FMProperties.AVG_FEATURES_PER_CONSTRAINT.value] = _mean(sum(features_per_constraint), len(features_per_constraint))
+    metrics[FMProperties.MIN_CONSTRAINTS_PER_FEATURE.value] = min(constraints_per_feature.values(), default=0)
+    metrics[FMProperties.MAX_CONSTRAINTS_PER_FEATURE.value] = max(constraints_per_feature.values(), default=0)
+    metrics[FMProperties.AVG_CONSTRAINTS_PER_FEATURE.value] = _mean(sum(constraints_per_feature.values()), len(constraints_per_feature))
+    metrics[FMProperties.EXTRA_CONSTRAINT_REPRESENTATIVENESS.value] = [constraints.column_name(column) for column in constraints_per_feature]
+
+
+def calculate_feature_metrics(table: FeatureTable, metrics: FMMetricsTable) -> None:
+    """Calculate the metrics of the feature tree as reductions of the columns of the features.
+
+    The lists of names are only built on demand (see `FEATURE_FLAGS` and `RELATION_KINDS`), 
+    and the other metrics are aggregated from the columns. The detached features are not
+    part of the metrics.
+    """
+    attached = relations_attached = None
+    if any(feature_flags & DETACHED for feature_flags in table.flags):
+        attached = [not feature_flags & DETACHED for feature_flags in table.flags]
+        relations_attached = [attached[parent] for parent in table.relation_parents]
+    names = _compress(table.names, attached)
+    flags = _compress(table.flags, attached)
+    depths = _compress(table.depths, attached)
+    children = _compress(table.children, attached)
+    attributes = _compress(table.attributes, attached)
+    relations = _compress(table.relations, relations_attached)
+    kinds = _compress(table.relation_kinds, relations_attached)
+    parents = _compress(table.relation_parents, relations_attached)
+
+    flags_counts = Counter(flags)
+    for name, (mask, value) in FEATURE_FLAGS.items():
+        metrics.add_lazy(name, _feature_names(names, flags, mask, value),
+                         lambda mask=mask, value=value: sum(count for feature_flags, count in flags_counts.items() 
+                                                            if feature_flags & mask == value))
+    kinds_counts = Counter(kinds)
+    for name, relation_kinds in RELATION_KINDS.items():
+        metrics.add_lazy(name, lambda relation_kinds=relation_kinds: [str(relation) for relation, kind in zip(relations, kinds) 
+                                                                      if kind in relation_kinds],
+                         lambda relation_kinds=relation_kinds: sum(kinds_counts[kind] for kind in relation_kinds))
+    # The mandatory and optional features are recorded by the name of their parent
+    metrics.add_lazy(FMProperties.MANDATORY_FEATURES.value,
+                     lambda: [table.names[parent] for parent, kind in zip(parents, kinds) if kind == MANDATORY],
+                     lambda: kinds_counts[MANDATORY])
+    metrics.add_lazy(FMProperties.OPTIONAL_FEATURES.value,
+                     lambda: [table.names[parent] for parent, kind in zip(parents, kinds) if kind == OPTIONAL],
+                     lambda: kinds_counts[OPTIONAL])
+
+    compound_children = [n_children for n_children, feature_flags in zip(children, flags) if not feature_flags & LEAF]
+    leaf_depths = [depth for depth, feature_flags in zip(depths, flags) if feature_flags & LEAF]
+    total_children = sum(children)
+    total_attributes = sum(attributes)
+    attributed_features = sum(count for feature_flags, count in flags_counts.items() if feature_flags & ATTRIBUTES)
+    metrics[FMProperties.MIN_CHILDREN_PER_FEATURE.value] = min(compound_children, default=None)
+    metrics[FMProperties.MAX_CHILDREN_PER_FEATURE.value] = max(compound_children, default=0)
+    metrics[FMProperties.AVG_CHILDREN_PER_FEATURE.value] = _mean(total_children, len(names))
+    metrics[FMProperties.DEPTH_TREE.value] = max(leaf_depths, default=0)
+    metrics[FMProperties.MEAN_DEPTH_TREE.value] = _mean(sum(leaf_depths), len(leaf_depths))
+    metrics[FMProperties.BRANCHING_FACTOR.value] = 0 if not compound_children else round(total_children / len(compound_children), FMMetrics.PRECISION)
+    metrics[FMProperties.FEATURE_ATTRIBUTES.value] = list(table.attribute_names)
+    metrics[FMProperties.MIN_ATTRIBUTES_PER_FEATURE.value] = min(attributes, default=0)
+    metrics[FMProperties.MAX_ATTRIBUTES_PER_FEATURE.value] = max(attributes, default=0)
+    metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE.value] = _mean(total_attributes, len(names))
+    metrics[FMProperties.AVG_ATTRIBUTES_PER_FEATURE_WITH_ATTRIBUTES.value] = _mean(total_attributes, attributed_features)
+
+
+def _compress(column: Any, selectors: Optional[list[bool]]) -> Any:
+    """Return the values of the column whose selectors are true (all if there are no selectors)."""
+    return column if selectors is None else list(itertools.compress(column, selectors))
+
+
+def _feature_names(names: list[str], flags: array.array | list[int], mask: int, value: int) -> Callable[[], list[str]]:
+    """Return the function that materializes the names of the features whose flags match."""
+    if mask == 0:
+        return lambda: names
+    return lambda: [name for name, feature_flags in zip(names, flags) if feature_flags & mask == value]
+
+
+def _mean(total: int, n: int) -> int | float:
+    """Return the mean of n ints with the given total, as `statistics.mean` 
+    (an int if it is exact, and 0 if there are no values)."""
+    if n == 0:
+        return 0
+    return total // n if total % n == 0 else total / n
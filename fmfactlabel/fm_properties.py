@@ -111,6 +111,7 @@ class FMProperties(Enum):
     LOGICAL_CONSTRAINTS = FMProperty('Logical constraints', 'Constraints with only logical operators.', CROSS_TREE_CONSTRAINTS)
     ARITHMETIC_CONSTRAINTS = FMProperty('Arithmetic constraints', 'Constraints with at least one arithmetic operator.', CROSS_TREE_CONSTRAINTS)
     AGGREGATION_CONSTRAINTS = FMProperty('Aggregation constraints', 'Constraints with at least one aggregation operator.', CROSS_TREE_CONSTRAINTS)
+    DUPLICATE_CONSTRAINTS = FMProperty('Duplicate constraints', 'Constraints identical to a previous constraint of the feature model.', CROSS_TREE_CONSTRAINTS)
     SINGLE_FEATURE_CONSTRAINTS = FMProperty('Single feature constraints', 'Constraints with a single feature or negated feature.', LOGICAL_CONSTRAINTS)
     SIMPLE_CONSTRAINTS = FMProperty('Simple constraints', 'Requires and Excludes constraints.', LOGICAL_CONSTRAINTS)  # Requires and excludes
     REQUIRES_CONSTRAINTS = FMProperty('Requires constraints', 'Constraints modeling that the activation of a feature f1 implies the activation of a feature f2.', SIMPLE_CONSTRAINTS)
@@ -131,13 +132,13 @@ class FMProperties(Enum):
     DEAD_FEATURES = FMProperty('Dead features', 'Features that cannot appear in any configuration.', None)
     VARIANT_FEATURES = FMProperty('Variant features', 'Features that appear only in some configurations (i.e., features that are neither core nor dead).', None)  # Also 'Real optional features'
     UNIQUE_FEATURES = FMProperty('Unique features', 'Features that appear in exactly one configuration. The ratio is based on the total number of features.', VARIANT_FEATURES)
-    PURE_OPTIONAL_FEATURES = FMProperty('Pure optional features', 'Feature with 0.5 (50%) probability of being selected in a valid configuration (i.e., their selection is unconstrained). The ratio is based on the total number of features.', VARIANT_FEATURES)
+    PURE_OPTIONAL_FEATURES = FMProperty('Pure optional features', 'Feature with 0.5 (50%) probability of being selected in a valid configuration (i.e., their selection is unconstrained). The ratio is based on the total number of features. They are omitted if the analysis engine includes sampling.', VARIANT_FEATURES)
     FALSE_OPTIONAL_FEATURES = FMProperty('False-optional features', "Features included in all possible configurations although not being modelled as mandatory. The ratio is based on the total number of features.", CORE_FEATURES)
-    CONFIGURATIONS = FMProperty('Configurations', 'Number of configurations represented by the feature model. If <= is shown, the number represents an upper estimation bound.', None)
+    CONFIGURATIONS = FMProperty('Configurations', 'Number of configurations represented by the feature model. If <= is shown, the number represents an upper estimation bound. If ≈ is shown, the number is an approximation within the bounds shown with the given confidence.', None)
     TOTAL_VARIABILITY = FMProperty('Total variability', 'The total variability measures the flexibility of the SPL considering all features.', None)
     PARTIAL_VARIABILITY = FMProperty('Partial variability', 'The partial variability measures the flexibility of the SPL considering only variant features.', None)
-    HOMOGENEITY = FMProperty('Homogeneity', 'The homogeneity measures how similar are the configurations of the SPL.', None)
-    PRODUCT_DISTRIBUTION = FMProperty('Configuration distribution', 'Number of configurations having a given number of features.', None)
+    HOMOGENEITY = FMProperty('Homogeneity', 'The homogeneity measures how similar are the configurations of the SPL. If ≈ is shown, the value is estimated from a sample of configurations within the confidence interval shown.', None)
+    PRODUCT_DISTRIBUTION = FMProperty('Configuration distribution', 'Number of configurations having a given number of features. If ≈ is shown, the statistics are estimated from a sample of configurations within the confidence intervals shown (≤ and ≥ are bounds of the min and max).', None)
     PD_MODE = FMProperty('Mode', 'Most frequently occurring number of features for a configuration.', PRODUCT_DISTRIBUTION)
     PD_MIN = FMProperty('Min', 'Number of features in the smallest configuration.', PRODUCT_DISTRIBUTION)
     PD_MAX = FMProperty('Max', 'Number of features in the largest configuration.', PRODUCT_DISTRIBUTION)
@@ -146,6 +147,10 @@ class FMProperties(Enum):
     PD_STD = FMProperty('Standard deviation', 'Standard deviation of number of features in configurations.', PRODUCT_DISTRIBUTION)
     PD_MEDIAN = FMProperty('Median', 'Median number of features in configurations.', PRODUCT_DISTRIBUTION)
     PD_MAD = FMProperty('Median absolute deviation', 'Median absolute deviation number of features in configurations.', PRODUCT_DISTRIBUTION)
+    ANALYSIS_ENGINE = FMProperty('Analysis engine', 'Engine that produced the analysis results (BDD: exact results; SAT: the BDD is not available and some results are estimated or omitted; ApproxMC: the number of configurations is approximated with guarantees; sampling: the probabilities and the distribution of the configurations are estimated from samples).', None)
+    BDD_VARIABLE_ORDERING = FMProperty('BDD variable ordering', 'Heuristic used to order the variables of the BDD.', ANALYSIS_ENGINE)
+    BDD_VARIABLE_ORDER = FMProperty('BDD variable order', 'Features in the order of the variables of the BDD (from the root to the leaves).', BDD_VARIABLE_ORDERING)
+    BDD_NODES = FMProperty('BDD nodes', 'Number of nodes of the BDD.', ANALYSIS_ENGINE)
     
     # ATOMIC_SETS = FMProperty('Atomic sets', '', None)  # Atomic sets need to be fixed in FLAMA.
 
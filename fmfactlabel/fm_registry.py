@@ -0,0 +1,88 @@
+from typing import Any, Callable, Collection, Optional
+
+from flamapy.core.exceptions import FlamaException
+
+from fmfactlabel import FMProperties, FMPropertyMeasure
+
+
+class FMPropertyRegistry():
+    """Registry of the measures of a group of properties (e.g., the metrics).
+
+    Each property declares the function that computes its measure from the object that owns it
+    (e.g., `FMMetrics.fm_features`), the properties it depends on, and optionally a condition
+    of availability (the measure is omitted if it is not available).
+    The measures are computed in topological order (dependencies first) and memoized, so that
+    selecting a subset of the properties only computes them and their dependencies.
+    The measures are returned in the order in which the properties are registered.
+    """
+
+    def __init__(self) -> None:
+        self._computes: dict[FMProperties, Callable[[Any], FMPropertyMeasure]] = {}
+        self._dependencies: dict[FMProperties, tuple[FMProperties, ...]] = {}
+        self._availabilities: dict[FMProperties, Callable[[Any], bool]] = {}
+
+    def register(self,
+                 fm_property: FMProperties,
+                 compute: Callable[[Any], FMPropertyMeasure],
+                 dependencies: Collection[FMProperties] = (),
+                 available: Optional[Callable[[Any], bool]] = None) -> None:
+        for dependency in dependencies:
+            if dependency not in self._computes:  # Registration in topological order: no cycles
+                raise FlamaException(f'The dependency {dependency.name} of {fm_property.name} is not registered.')
+        self._computes[fm_property] = compute
+        self._dependencies[fm_property] = tuple(dependencies)
+        if available is not None:
+            self._availabilities[fm_property] = available
+
+    @property
+    def properties(self) -> list[FMProperties]:
+        """Registered properties, in order of registration."""
+        return list(self._computes)
+
+    def dependencies(self, fm_property: FMProperties) -> tuple[FMProperties, ...]:
+        return self._dependencies[fm_property]
+
+    def closure(self, select: Optional[Collection[FMProperties]] = None) -> list[FMProperties]:
+        """Return the selected properties and all their dependencies in topological order.
+
+        The properties of the selection that are not registered are ignored.
+        """
+        if select is None:
+            return self.properties
+        required = {fm_property for fm_property in select if fm_property in self._computes}
+        stack = list(required)
+        while stack:
+            for dependency in self._dependencies[stack.pop()]:
+                if dependency not in required:
+                    required.add(dependency)
+                    stack.append(dependency)
+        # The dependencies are always registered before the properties that depend on them
+        return [fm_property for fm_property in self._computes if fm_property in required]
+
+    def measure(self, owner: Any, fm_property: FMProperties, memo: dict[FMProperties, Optional[FMPropertyMeasure]]) -> Optional[FMPropertyMeasure]:
+        """Return the measure of the property (and memoize it with its dependencies),
+        or None if it is not available (or not registered)."""
+        for required in self.closure([fm_property]):
+            if required not in memo:
+                memo[required] = self._compute(owner, required)
+        return memo.get(fm_property)
+
+    def measures(self,
+                 owner: Any,
+                 select: Optional[Collection[FMProperties]] = None,
+                 memo: Optional[dict[FMProperties, Optional[FMPropertyMeasure]]] = None) -> list[FMPropertyMeasure]:
+        """Return the available measures of the selected properties (all by default)."""
+        memo = {} if memo is None else memo
+        result = []
+        for fm_property in self.closure(select):
+            if fm_property not in memo:
+                memo[fm_property] = self._compute(owner, fm_property)
+            if memo[fm_property] is not None and (select is None or fm_property in select):
+                result.append(memo[fm_property])
+        return result
+
+    def _compute(self, owner: Any, fm_property: FMProperties) -> Optional[FMPropertyMeasure]:
+        available = self._availabilities.get(fm_property)
+        if available is not None and not available(owner):
+            return None
+        return self._computes[fm_property](owner)
@@ -0,0 +1,149 @@
+import io
+import gzip
+import json
+from typing import Any, Optional, TextIO
+
+from fmfactlabel import FMProperty, FMPropertyMeasure, FMProperties
+from .json_utils import ListEncoding, json_version, FEATURES_TABLE, CONSTRAINTS_TABLE
+
+
+SPACE = ' '
+JSON_INDENT = 4
+
+
+class FMSnapshot():
+    """Immutable snapshot of the measures of a characterization (metadata, metrics and analysis).
+
+    The measures are computed once (see `FMCharacterization.snapshot`) and every format
+    (text, JSON, files) is rendered from them, instead of computing them again for each format.
+    """
+
+    def __init__(self,
+                 metadata: tuple[FMPropertyMeasure, ...],
+                 metrics: tuple[FMPropertyMeasure, ...],
+                 analysis: tuple[FMPropertyMeasure, ...]) -> None:
+        self._metadata = tuple(metadata)
+        self._metrics = tuple(metrics)
+        self._analysis = tuple(analysis)
+
+    @property
+    def metadata(self) -> tuple[FMPropertyMeasure, ...]:
+        return self._metadata
+
+    @property
+    def metrics(self) -> tuple[FMPropertyMeasure, ...]:
+        return self._metrics
+
+    @property
+    def analysis(self) -> tuple[FMPropertyMeasure, ...]:
+        return self._analysis
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+    def to_text(self) -> str:
+        lines = ['METADATA']
+        for property in self._metadata:
+            name = property.property.name
+            value = str(property.value)
+            lines.append(f'{name}: {value}')
+
+        lines.append('METRICS')
+        lines.extend(measure_to_text(property) for property in self._metrics)
+        lines.append('ANALYSIS')
+        lines.extend(measure_to_text(property) for property in self._analysis)
+        return '\n'.join(lines)
+
+    def to_json(self, version: int = 1) -> dict[str, Any]:
+        """Return the JSON in the given version of the schema (see `json_utils`)."""
+        encoding = self._list_encoding(version)
+        result = {}
+        if encoding is not None:
+            result['version'] = version
+            result[FEATURES_TABLE] = encoding.features
+            result[CONSTRAINTS_TABLE] = encoding.constraints
+        result['metadata'] = [property.to_dict() for property in self._metadata]
+        result['metrics'] = [self._measure_to_dict(property, encoding) for property in self._metrics]
+        result['analysis'] = [self._measure_to_dict(property, encoding) for property in self._analysis]
+        return result
+
+    def to_json_str(self, compact: bool = False, version: int = 1) -> str:
+        output = io.StringIO()
+        self.write_json(output, compact, version)
+        return output.getvalue()
+
+    def to_json_file(self, filepath: str, compact: bool = False, compress: Optional[bool] = None, version: int = 1) -> None:
+        """Write the JSON into the file, compressed with gzip if `compress` 
+        (by default, if the path ends with `.gz`)."""
+        if compress is None:
+            compress = str(filepath).endswith('.gz')
+        opener = gzip.open if compress else open
+        with opener(filepath, 'wt', encoding='utf-8') as output_file:
+            self.write_json(output_file, compact, version)
+
+    def write_json(self, output: TextIO, compact: bool = False, version: int = 1) -> None:
+        """Write the JSON into the text stream (e.g., a file or a socket) measure by measure,
+        without building the whole document in memory.
+
+        The output is the same as `json.dump(self.to_json(version), output, indent=4)`, 
+        or without whitespace if `compact`.
+        """
+        encoding = self._list_encoding(version)
+        if compact:
+            encoder = json.JSONEncoder(separators=(',', ':'))
+            indent = newline = ''
+            colon = ':'
+        else:
+            encoder = json.JSONEncoder(indent=JSON_INDENT)
+            indent = SPACE * JSON_INDENT
+            newline = '\n'
+            colon = ': '
+        output.write('{')
+        if encoding is not None:  # The tables go first
+            for key, value in (('version', version), (FEATURES_TABLE, encoding.features), (CONSTRAINTS_TABLE, encoding.constraints)):
+                output.write(f'{newline}{indent}{json.dumps(key)}{colon}')
+                for chunk in encoder.iterencode(value):
+                    output.write(chunk.replace('\n', newline + indent) if newline else chunk)
+                output.write(',')
+        sections = (('metadata', self._metadata, None), ('metrics', self._metrics, encoding), ('analysis', self._analysis, encoding))
+        for section_index, (section, measures, section_encoding) in enumerate(sections):
+            output.write(f'{"," if section_index else ""}{newline}{indent}{json.dumps(section)}{colon}[')
+            for index, measure in enumerate(measures):
+                output.write(f'{"," if index else ""}{newline}{indent * 2}')
+                for chunk in encoder.iterencode(self._measure_to_dict(measure, section_encoding)):
+                    output.write(chunk.replace('\n', newline + indent * 2) if newline else chunk)
+            if measures:
+                output.write(f'{newline}{indent}')
+            output.write(']')
+        output.write(f'{newline}}}')
+
+    def _list_encoding(self, version: int) -> Optional[ListEncoding]:
+        """Return the tables of the feature names and constraints of the schema v2 (None for v1)."""
+        if json_version({'version': version}) == 1:
+            return None
+        tables = (FMProperties.FEATURES.value, FMProperties.CROSS_TREE_CONSTRAINTS.value)
+        return ListEncoding.from_json({'metrics': [measure.to_dict() for measure in self._metrics if measure.property in tables]})
+
+    @staticmethod
+    def _measure_to_dict(measure: FMPropertyMeasure, encoding: Optional[ListEncoding]) -> dict[str, Any]:
+        result = measure.to_dict()
+        return result if encoding is None else encoding.encode_measure(result)
+
+    def to_text_file(self, filepath: str) -> None:
+        with open(filepath, 'w', encoding='utf-8') as output_file:
+            output_file.write(self.to_text())
+
+
+def measure_to_text(property: FMPropertyMeasure) -> str:
+    """Return the line of the measure of a metric or analysis property, indented by its level."""
+    indentation = SPACE * get_parents_numbers(property.property)
+    name = property.property.name
+    value = str(property.value) if property.size is None else str(property.size)
+    ratio = f' ({str(property.ratio*100)}%)' if property.ratio is not None else ''
+    return f'{indentation}{name}: {value}{ratio}'
+
+
+def get_parents_numbers(property: FMProperty) -> int:
+    if property.parent is None:
+        return 1
+    return 1 + get_parents_numbers(property.parent)
@@ -3,32 +3,50 @@ from typing import Collection, Optional
 from flamapy.core.exceptions import FlamaException
 from flamapy.metamodels.fm_metamodel.models import FeatureModel
 from flamapy.metamodels.fm_metamodel.transformations import (
-    UVLReader, 
     FeatureIDEReader, 
     GlencoeReader,
     AFMReader,
     JSONReader
 )
 
+from .fm_binary_utils import read_fm_snapshot, write_fm_snapshot
+from .uvl_utils import read_uvl_file
+from .number_utils import MIN_FLOAT_EXPONENT, leading_digits, log10_ratio, ratio_scientific_notation
+
 
 def int_to_scientific_notation(n: int, precision: int = 2) -> str:
     """Convert a large int into scientific notation.
     
     It is required for large numbers that Python cannot convert to float,
     solving the error `OverflowError: int too large to convert to float`.
+    Only the leading digits are computed (see `number_utils.leading_digits`), 
+    without converting the whole int into a decimal string.
     """
-    str_n = str(n)
-    decimal = str_n[1:precision+1]
-    exponent = str(len(str_n) - 1)
-    return str_n[0] + '.' + decimal + 'e' + exponent
+    lead, exponent = leading_digits(n, precision + 1)
+    str_lead = str(lead)
+    return str_lead[0] + '.' + str_lead[1:] + 'e' + str(exponent)
 
 
 def get_nof_configuration_as_str(nof_configurations: int, aproximation: bool, nof_cross_tree_constraints: int) -> str:
     return f"{'≤ ' if aproximation and nof_cross_tree_constraints > 0 else ''}{int_to_scientific_notation(nof_configurations) if nof_configurations > 1e6 else nof_configurations}"
 
 
+def get_approximate_count_as_str(count: int, lower: int, upper: int, confidence: float) -> str:
+    def number_str(n: int) -> str:
+        return int_to_scientific_notation(n) if n > 1e6 else str(n)
+    return f'≈ {number_str(count)} [{number_str(lower)}, {number_str(upper)}] ({confidence:.0%} confidence)'
+
+
+def get_estimate_as_str(value: int | float, lower: int | float, upper: int | float, precision: int = 2) -> str:
+    return f'≈ {round(value, precision)} [{round(lower, precision)}, {round(upper, precision)}]'
+
+
 def get_ratio(collection1: Collection, collection2: Collection, precision: int = 2) -> float:
-    return 0.0 if not collection2 else round(len(collection1) / len(collection2), precision)
+    return get_size_ratio(len(collection1), len(collection2), precision)
+
+
+def get_size_ratio(size1: int, size2: int, precision: int = 2) -> float:
+    return 0.0 if not size2 else round(size1 / size2, precision)
 
 
 def get_percentage_str(value: int | float, precision: int = 4) -> str:
@@ -41,19 +59,38 @@ def get_percentage_str(value: int | float, precision: int = 4) -> str:
         return str(percentage_value) if percentage_value > 0 else format_percentage.format(percentage)
 
 
-def read_fm_file(filename: str) -> Optional[FeatureModel]:
+def get_ratio_percentage_str(numerator: int, denominator: int, precision: int = 4) -> str:
+    """Percentage of the ratio of two ints of any size (see `get_percentage_str`).
+
+    The ratios too small to be represented as floats are formatted from their logarithm.
+    """
+    if numerator == 0 or log10_ratio(numerator, denominator) > MIN_FLOAT_EXPONENT:
+        return get_percentage_str(numerator / denominator, precision)
+    mantissa, exponent = ratio_scientific_notation(numerator * 100, denominator, precision)
+    return f'{mantissa:.{precision}f}e{exponent}'
+
+
+def read_fm_file(filename: str, snapshot: bool = False) -> Optional[FeatureModel]:
+    """Read the feature model of the file, or of its binary snapshot if there is a fresh one
+    (see `fm_binary_utils`). If `snapshot`, the snapshot is stored after parsing the file."""
+    model = read_fm_snapshot(filename)
+    if model is not None:
+        return model
     try:
         if filename.endswith(".uvl"):
-            return UVLReader(filename).transform()
+            model = read_uvl_file(filename)
         elif filename.endswith(".xml") or filename.endswith(".fide"):
-            return FeatureIDEReader(filename).transform()
+            model = FeatureIDEReader(filename).transform()
         elif filename.endswith("gfm.json"):
-            return GlencoeReader(filename).transform()
+            model = GlencoeReader(filename).transform()
         elif filename.endswith(".afm"):
-            return AFMReader(filename).transform()
+            model = AFMReader(filename).transform()
         elif filename.endswith(".json"):
-            return JSONReader(filename).transform()
+            model = JSONReader(filename).transform()
         else:
             raise FlamaException(f"Unsupported file format: {filename}")
     except Exception as e:
-        raise FlamaException(f"Error reading feature model from {filename}: {e}")
\ No newline at end of file
+        raise FlamaException(f"Error reading feature model from {filename}: {e}")
+    if snapshot:
+        write_fm_snapshot(model, filename)
+    return model
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+This module contains all utils related to the schemas of the JSON of the characterizations.
+
+In the schema v1, the value of each property is stored as is, so that the same feature names
+and constraints are repeated in many lists (e.g., features, leaf features, core features).
+The schema v2 stores the feature names and the constraints once, in the tables `features` and
+`constraints`, and the lists of the properties refer to their entries: by their indexes, or as
+a bitset (base64 of the little-endian bits) if the indexes are strictly increasing, whichever
+is shorter. The lists with other values (e.g., the tree relationships) and the lists that are
+shorter than their references are stored as is.
+"""
+
+import json
+import base64
+from typing import Any, Iterable, Optional
+
+from flamapy.core.exceptions import FlamaException
+
+from fmfactlabel import FMProperties
+
+
+JSON_VERSIONS = (1, 2)
+FEATURES_TABLE = 'features'
+CONSTRAINTS_TABLE = 'constraints'
+
+
+class ListEncoding():
+    """Tables of the feature names and constraints of the schema v2, and encoding of the lists
+    of the properties into references to their entries."""
+
+    def __init__(self, features: Iterable[str] = (), constraints: Iterable[str] = ()) -> None:
+        self.features: list[str] = []
+        self.constraints: list[str] = []
+        self._indexes: dict[str, dict[str, int]] = {FEATURES_TABLE: {}, CONSTRAINTS_TABLE: {}}
+        self._add(FEATURES_TABLE, self.features, features)
+        self._add(CONSTRAINTS_TABLE, self.constraints, constraints)
+
+    @staticmethod
+    def from_json(data: dict[str, Any]) -> 'ListEncoding':
+        """Return the tables of the JSON (v1): the features are those of the feature model
+        and the constraints are its cross-tree constraints."""
+        measures = data.get('metrics', [])
+        features = next((measure['value'] for measure in measures if measure['name'] == FMProperties.FEATURES.value.name), None)
+        constraints = next((measure['value'] for measure in measures if measure['name'] == FMProperties.CROSS_TREE_CONSTRAINTS.value.name), None)
+        return ListEncoding(features or (), constraints or ())
+
+    def encode_value(self, value: Any) -> Any:
+        """Return the shortest reference to the entries of a table of a list of names,
+        or the value itself if it is not a list of names of the tables or it is shorter."""
+        if not isinstance(value, list) or not value:
+            return value
+        for table in (FEATURES_TABLE, CONSTRAINTS_TABLE):
+            index = self._indexes[table]
+            indexes = [index.get(name) if isinstance(name, str) else None for name in value]
+            if None not in indexes:
+                candidates = [value, {'table': table, 'indexes': indexes}]
+                if all(previous < following for previous, following in zip(indexes, indexes[1:])):
+                    candidates.append({'table': table, 'bitset': encode_bitset(indexes)})
+                return min(candidates, key=_json_size)
+        return value
+
+    def encode_measure(self, measure: dict[str, Any]) -> dict[str, Any]:
+        return measure | {'value': self.encode_value(measure.get('value'))}
+
+    def decode_value(self, value: Any) -> Any:
+        if not isinstance(value, dict) or 'table' not in value:
+            return value
+        table = self.features if value['table'] == FEATURES_TABLE else self.constraints
+        indexes = decode_bitset(value['bitset']) if 'bitset' in value else value['indexes']
+        return [table[i] for i in indexes]
+
+    def decode_measure(self, measure: dict[str, Any]) -> dict[str, Any]:
+        return measure | {'value': self.decode_value(measure.get('value'))}
+
+    def _add(self, table: str, entries: list[str], names: Iterable[str]) -> None:
+        index = self._indexes[table]
+        for name in names:
+            if name not in index:
+                index[name] = len(entries)
+                entries.append(name)
+
+
+def json_version(data: dict[str, Any]) -> int:
+    """Return the version of the schema of the JSON of a characterization (1 if it is not given)."""
+    version = data.get('version', 1)
+    if version not in JSON_VERSIONS:
+        raise FlamaException(f'Version {version} of the JSON of the characterization is not supported.')
+    return version
+
+
+def encode_json(data: dict[str, Any], encoding: Optional[ListEncoding] = None) -> dict[str, Any]:
+    """Return the JSON of the characterization in the schema v2."""
+    if json_version(data) == 2:
+        return data
+    encoding = ListEncoding.from_json(data) if encoding is None else encoding
+    result = {}
+    result['version'] = 2
+    result[FEATURES_TABLE] = encoding.features
+    result[CONSTRAINTS_TABLE] = encoding.constraints
+    result['metadata'] = data.get('metadata', [])
+    result['metrics'] = [encoding.encode_measure(measure) for measure in data.get('metrics', [])]
+    result['analysis'] = [encoding.encode_measure(measure) for measure in data.get('analysis', [])]
+    return result
+
+
+def decode_json(data: dict[str, Any]) -> dict[str, Any]:
+    """Return the JSON of the characterization in the schema v1 (from v1 or v2)."""
+    if json_version(data) == 1:
+        return data
+    encoding = ListEncoding(data.get(FEATURES_TABLE, []), data.get(CONSTRAINTS_TABLE, []))
+    result = {}
+    result['metadata'] = data.get('metadata', [])
+    result['metrics'] = [encoding.decode_measure(measure) for measure in data.get('metrics', [])]
+    result['analysis'] = [encoding.decode_measure(measure) for measure in data.get('analysis', [])]
+    return result
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(',', ':')))
+
+
+def encode_bitset(indexes: list[int]) -> str:
+    """Return the base64 of the little-endian bits of the indexes."""
+    bits = bytearray((indexes[-1] >> 3) + 1 if indexes else 0)
+    for i in indexes:
+        bits[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def decode_bitset(bitset: str) -> list[int]:
+    """Return the indexes of the bits of the bitset, in increasing order."""
+    indexes = []
+    for byte_index, byte in enumerate(base64.b64decode(bitset)):
+        while byte:
+            low = byte & -byte
+            indexes.append((byte_index << 3) + low.bit_length() - 1)
+            byte ^= low
+    return indexes
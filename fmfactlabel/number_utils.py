@@ -0,0 +1,48 @@
+"""
+This module contains all utils related to the arithmetic and formatting of the large numbers
+of configurations (e.g., 10^3000), in the log domain or from the binary length of the integers,
+without converting them to float (which overflows) or to decimal strings (which is quadratic
+in the number of digits).
+"""
+
+import math
+
+
+LOG10_2 = math.log10(2)
+MIN_FLOAT_EXPONENT = -300  # smaller ratios are formatted from their logarithm (floats underflow)
+
+
+def decimal_exponent(n: int) -> int:
+    """Return the exponent of the positive integer in scientific notation (floor of log10(n)).
+
+    The exponent is bounded by the binary length of the integer, and checked exactly.
+    """
+    exponent = int((n.bit_length() - 1) * LOG10_2)
+    power = 10 ** exponent
+    if n < power:  # Rounding error of the estimate
+        return exponent - 1
+    return exponent + 1 if n >= power * 10 else exponent
+
+
+def leading_digits(n: int, digits: int) -> tuple[int, int]:
+    """Return the first digits of the positive integer (truncated) and its decimal exponent."""
+    exponent = decimal_exponent(n)
+    shift = exponent - digits + 1
+    lead = n // 10 ** shift if shift >= 0 else n * 10 ** -shift
+    return lead, exponent
+
+
+def log10_ratio(numerator: int, denominator: int) -> float:
+    """Return log10(numerator / denominator) of positive integers of any size."""
+    return math.log10(numerator) - math.log10(denominator)
+
+
+def ratio_scientific_notation(numerator: int, denominator: int, precision: int = 2) -> tuple[float, int]:
+    """Return the mantissa (rounded to the precision) and the decimal exponent of
+    numerator / denominator (positive integers), from the difference of their logarithms."""
+    log_ratio = log10_ratio(numerator, denominator)
+    exponent = math.floor(log_ratio)
+    mantissa = round(10 ** (log_ratio - exponent), precision)
+    if mantissa >= 10:
+        mantissa, exponent = round(mantissa / 10, precision), exponent + 1
+    return mantissa, exponent
@@ -0,0 +1,75 @@
+"""
+This module contains all utils related to the polynomials (generating functions) used to
+compute product distributions: the coefficient k of a polynomial is the number of
+configurations with k selected features.
+
+Coefficients are non-negative Python integers of arbitrary size.
+"""
+
+
+KRONECKER_THRESHOLD = 32  # minimum length of both polynomials to multiply them as packed integers
+
+
+def binomial_coefficients(n: int) -> list[int]:
+    """Return the coefficients of (1 + x)^n."""
+    coefficients = [1]
+    for k in range(n):
+        coefficients.append(coefficients[-1] * (n - k) // (k + 1))
+    return coefficients
+
+
+def polynomial_sum(p: list[int], q: list[int]) -> list[int]:
+    """Return the sum of two polynomials."""
+    if len(p) < len(q):
+        p, q = q, p
+    result = list(p)
+    for i, c in enumerate(q):
+        result[i] += c
+    return result
+
+
+def polynomial_product(p: list[int], q: list[int]) -> list[int]:
+    """Return the product of two polynomials.
+
+    Large products are computed with a single big-integer multiplication
+    (Kronecker substitution), which is vectorized by the integer arithmetic of Python.
+    """
+    if not p or not q:
+        return []
+    if len(p) == 1:
+        return [p[0] * c for c in q]
+    if len(q) == 1:
+        return [q[0] * c for c in p]
+    if min(len(p), len(q)) >= KRONECKER_THRESHOLD:
+        return _kronecker_product(p, q)
+    result = [0] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        if a:
+            for j, b in enumerate(q):
+                result[i + j] += a * b
+    return result
+
+
+def polynomials_product(factors: list[list[int]]) -> list[int]:
+    """Return the product of the polynomials, multiplied pairwise as a balanced tree."""
+    if not factors:
+        return [1]
+    while len(factors) > 1:
+        factors = [polynomial_product(factors[i], factors[i + 1]) if i + 1 < len(factors) else factors[i]
+                   for i in range(0, len(factors), 2)]
+    return factors[0]
+
+
+def _kronecker_product(p: list[int], q: list[int]) -> list[int]:
+    """Multiply the polynomials by packing their coefficients into big integers.
+
+    Each coefficient of the product is at most min(len(p), len(q)) * max(p) * max(q),
+    so every coefficient fits in a fixed-size slot of that many bits.
+    """
+    bits = max(p).bit_length() + max(q).bit_length() + min(len(p), len(q)).bit_length()
+    slot = (bits + 7) // 8  # bytes per coefficient
+    packed_p = int.from_bytes(b''.join(c.to_bytes(slot, 'little') for c in p), 'little')
+    packed_q = int.from_bytes(b''.join(c.to_bytes(slot, 'little') for c in q), 'little')
+    length = len(p) + len(q) - 1
+    data = (packed_p * packed_q).to_bytes(length * slot, 'little')
+    return [int.from_bytes(data[i * slot:(i + 1) * slot], 'little') for i in range(length)]
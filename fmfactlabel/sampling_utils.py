@@ -0,0 +1,373 @@
+"""
+This module contains all utils related to the near-uniform sampling of configurations
+of feature models, used to estimate the analysis results when no exact engine is available.
+
+The sampler follows UniGen2 (Chakraborty, Fremont, Meel, Seshia and Vardi 2015): random XOR
+constraints partition the configurations into small cells, and each cell of the right size is
+enumerated with the SAT solver to draw several configurations from it. The independent
+components of the formula with few configurations are enumerated once and sampled exactly.
+The estimates (feature inclusion probabilities, homogeneity and product distribution) are
+reported with confidence intervals, which narrow as more batches of samples are drawn.
+"""
+
+import math
+import time
+import logging
+import random
+from statistics import NormalDist
+from typing import Callable, Collection, Iterator, Optional
+
+from pysat.solvers import Solver
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+
+from .approxmc_utils import _cell
+from .ddnnf_utils import components
+from .sat_utils import SOLVER_NAME
+from .simplification_utils import SimplifiedModel, cnf_formula
+
+
+DEFAULT_SAMPLES = 500
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_TIMEOUT = 5.0  # seconds (the unique features are computed within it too)
+
+# Size of the cells (UniGen2 with κ = 0.638): pivot = ceil(4.03 (1 + 1 / κ)^2)
+PIVOT = 27
+HIGH_THRESHOLD = 1 + math.ceil(math.sqrt(2) * (1 + 0.638) * PIVOT)
+LOW_THRESHOLD = math.floor(PIVOT / (math.sqrt(2) * (1 + 0.638)))
+
+
+class Sampling():
+    """Parameters of the estimation of the analysis from a sample of configurations.
+
+    The configurations are drawn in batches of `batch_size` until `samples` configurations
+    are drawn or the `timeout` is exceeded (the estimates use the batches drawn so far).
+    The confidence intervals are given with the `confidence` level.
+    """
+
+    def __init__(self,
+                 samples: int = DEFAULT_SAMPLES,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 confidence: float = DEFAULT_CONFIDENCE,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT,  # wall-clock time in seconds
+                 seed: int = 1) -> None:
+        if samples <= 0 or batch_size <= 0 or not 0 < confidence < 1:
+            raise FlamaException('The samples and the batch size must be positive and the confidence must be in (0, 1).')
+        self.samples = samples
+        self.batch_size = batch_size
+        self.confidence = confidence
+        self.timeout = timeout
+        self.seed = seed
+
+
+DEFAULT_SAMPLING = Sampling()
+
+
+class SamplingTimeout(FlamaException):
+    """The sampling exceeded its timeout."""
+
+
+class ConfigurationSampler():
+    """Near-uniform sampler of the configurations of a SAT model.
+
+    The configurations are lists of booleans: the value of each variable of the SAT model
+    (index var - 1). If the `simplified` formula of the SAT model is given, it is sampled
+    instead and its configurations are mapped back to the original variables.
+    The SAT model must be satisfiable. If its (approximate) number of configurations is given,
+    the sampler starts from cells of the right size.
+    """
+
+    def __init__(self,
+                 sat_model: PySATModel,
+                 simplified: Optional[SimplifiedModel] = None,
+                 seed: int = 1,
+                 check_timeout: Callable[[], None] = lambda: None,
+                 count: Optional[int] = None) -> None:
+        self.simplified = simplified
+        self.check_timeout = check_timeout
+        self.random = random.Random(seed)
+        self.n_original = len(sat_model.variables)
+        self.n_vars, self.clauses = cnf_formula(sat_model, simplified)
+        constrained = {abs(lit) for clause in self.clauses for lit in clause}
+        self.free_vars = [var for var in range(1, self.n_vars + 1) if var not in constrained]
+        self.small_components: list[list[list[int]]] = []  # all the configurations of each small component
+        large_components = []
+        for component in components(self.clauses):
+            variables = sorted({abs(lit) for clause in component for lit in clause})
+            cell = _cell(component, variables)
+            try:
+                models = cell.models(HIGH_THRESHOLD + 1, check_timeout)
+            finally:
+                cell.delete()
+            if len(models) <= HIGH_THRESHOLD:
+                self.small_components.append(models)
+            else:
+                large_components.append(component)
+        self.large_clauses = [clause for component in large_components for clause in component]
+        self.large_vars = sorted({abs(lit) for clause in self.large_clauses for lit in clause})
+        self.hashes = 1  # number of XOR constraints of the last cell of the right size
+        if count is not None and count > 0 and self.large_vars:
+            # In the log domain: the counts may not fit in a float (e.g., 10^400 configurations)
+            log2_large_count = (math.log2(count) - len(self.free_vars) -
+                                sum(math.log2(len(models)) for models in self.small_components))
+            self.hashes = min(max(round(max(log2_large_count, 0) - math.log2(PIVOT)), 1), len(self.large_vars))
+        self._too_large: Optional[int] = None  # largest number of XOR constraints of a too large cell
+        self._too_small: Optional[int] = None  # smallest number of XOR constraints of a too small cell
+        self.pending: list[list[bool]] = []  # configurations of the batch in progress
+        self._witnesses: dict[int, bytes] = {}  # variable -> a configuration where it is selected
+        self._non_unique: set[int] = set()  # variables selected in two configurations at least
+
+    def batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[list[bool]]]:
+        """Generate batches of configurations indefinitely."""
+        while True:
+            self.pending = []
+            while len(self.pending) < batch_size:
+                self.pending.extend(self._original_configuration(assignment) for assignment in self._sample_cell())
+            yield self.pending
+
+    def unique_features(self, sat_model: PySATModel, candidates: Collection[str]) -> list[str]:
+        """Return the candidate features that appear in exactly one configuration.
+
+        If the formula has a single configuration, all its selected features are unique
+        (whether candidates or not). Otherwise, the features selected in two sampled
+        configurations are not unique, and each remaining candidate is tested with the solver:
+        a configuration with it, and another one. The candidates selected in the same
+        configuration share its blocking clause, which is disabled after testing them.
+        """
+        if self._single_configuration():
+            configuration = self._original_configuration(self._sample_cell()[0])
+            return [sat_model.features[var] for var, value in enumerate(configuration, 1) if value]
+        literals = {name: self._reduced_literal(sat_model.variables[name]) for name in candidates}
+        undecided = sorted({lit for lit in literals.values() if lit is not None and lit not in self._non_unique},
+                           reverse=True)
+        dead: set[int] = set()  # candidates in no configuration
+        solver = Solver(name=SOLVER_NAME, bootstrap_with=self.clauses)
+        try:
+            top = self.n_vars
+            while undecided:
+                var = undecided.pop()
+                if var in self._non_unique:
+                    continue
+                self.check_timeout()
+                if not solver.solve(assumptions=[var]):
+                    dead.add(var)
+                    continue
+                model = self._solver_assignment(solver.get_model())
+                self._record(model)
+                top += 1  # Activation of the blocking clause of this configuration
+                solver.add_clause([-top] + [-other if model[other] else other for other in range(1, self.n_vars + 1)])
+                for other in [var] + [other for other in undecided if model[other]]:
+                    if other in self._non_unique:
+                        continue
+                    self.check_timeout()
+                    if solver.solve(assumptions=[other, top]):
+                        self._record(self._solver_assignment(solver.get_model()))
+                        self._non_unique.add(other)
+                tested = set(var for var in undecided if model[var])
+                undecided = [var for var in undecided if var not in tested]
+                solver.add_clause([-top])  # The blocking clause is satisfied (and can be removed by the solver)
+        finally:
+            solver.delete()
+        return [name for name, lit in literals.items()
+                if lit is not None and lit not in self._non_unique and lit not in dead]
+
+    def _single_configuration(self) -> bool:
+        """Return true if the formula has exactly one configuration."""
+        return (not self.large_vars and not self.free_vars and
+                all(len(models) == 1 for models in self.small_components))
+
+    def _sample_cell(self) -> list[bytes]:
+        """Return configurations of the formula (as assignments of its variables) drawn
+        from a random cell of the right size."""
+        if self.large_vars:
+            cell_models = self._cell_models()
+        else:
+            cell_models = [[]]
+        assignments = []
+        for cell_model in cell_models:
+            assignment = bytearray(self.n_vars + 1)
+            for lit in cell_model:
+                assignment[abs(lit)] = lit > 0
+            for models in self.small_components:
+                for lit in self.random.choice(models):
+                    assignment[abs(lit)] = lit > 0
+            for var in self.free_vars:
+                assignment[var] = self.random.getrandbits(1)
+            assignments.append(bytes(assignment))
+            self._record(assignments[-1])
+        return assignments
+
+    def _cell_models(self) -> list[list[int]]:
+        """Return LOW_THRESHOLD configurations of the large components from a random cell
+        with between LOW_THRESHOLD and HIGH_THRESHOLD configurations.
+
+        The number of XOR constraints starts from the one of the last cell of the right size,
+        and it is searched by galloping and bisection when the cell is too large (small).
+        """
+        while True:
+            self.check_timeout()
+            cell = _cell(self.large_clauses, self.large_vars)
+            try:
+                for _ in range(self.hashes):
+                    cell.add_xor(self.random)
+                models = cell.models(HIGH_THRESHOLD + 1, self.check_timeout, self.hashes)
+            finally:
+                cell.delete()
+            if len(models) > HIGH_THRESHOLD:
+                self._too_large = self.hashes
+                if self._too_small is None or self._too_small <= self.hashes:
+                    self._too_small = None
+                    self.hashes = min(2 * self.hashes, len(self.large_vars))
+                else:
+                    self.hashes = (self.hashes + self._too_small + 1) // 2
+            elif len(models) < LOW_THRESHOLD:
+                self._too_small = self.hashes
+                if self._too_large is None or self._too_large >= self.hashes:
+                    self._too_large = None
+                    self.hashes //= 2
+                else:
+                    self.hashes = (self._too_large + self.hashes) // 2
+            else:
+                return self.random.sample(models, LOW_THRESHOLD)
+
+    def _original_configuration(self, assignment: bytes) -> list[bool]:
+        if self.simplified is None:
+            return [bool(value) for value in assignment[1:]]
+        return [self.simplified.fixed[var] if var in self.simplified.fixed
+                else bool(assignment[self.simplified.literal(var)])
+                for var in range(1, self.n_original + 1)]
+
+    def _reduced_literal(self, var: int) -> Optional[int]:
+        return var if self.simplified is None else self.simplified.literal(var)
+
+    def _solver_assignment(self, model: list[int]) -> bytes:
+        """The variables beyond the model of the solver (in no clause) are taken as false."""
+        assignment = bytearray(self.n_vars + 1)
+        for lit in model[:self.n_vars]:
+            assignment[abs(lit)] = lit > 0
+        return bytes(assignment)
+
+    def _record(self, assignment: bytes) -> None:
+        """Record the configuration as a witness of its selected variables."""
+        for var in range(1, self.n_vars + 1):
+            if assignment[var] and var not in self._non_unique:
+                witness = self._witnesses.setdefault(var, assignment)
+                if witness != assignment:
+                    self._non_unique.add(var)
+
+
+class SampleEstimates():
+    """Estimates of the analysis results from a sample of configurations.
+
+    The estimates are updated with each batch of configurations (`add`), and their
+    confidence intervals are given with the `confidence` level.
+    """
+
+    def __init__(self, features: list[str], confidence: float = DEFAULT_CONFIDENCE) -> None:
+        self.features = features  # name of each variable (index var - 1)
+        self.confidence = confidence
+        self.samples = 0
+        self.feature_counts = [0] * len(features)  # configurations of the sample with each feature
+        self.product_distribution = [0] * (len(features) + 1)  # configurations of the sample with each size
+        self.unique_features: Optional[list[str]] = None  # exact, if computed (see `ConfigurationSampler.unique_features`)
+        self._z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    def add(self, configurations: list[list[bool]]) -> None:
+        for configuration in configurations:
+            self.samples += 1
+            size = 0
+            for i, value in enumerate(configuration):
+                if value:
+                    self.feature_counts[i] += 1
+                    size += 1
+            self.product_distribution[size] += 1
+
+    def feature_probabilities(self) -> dict[str, float]:
+        return {feature: count / self.samples for feature, count in zip(self.features, self.feature_counts)}
+
+    def probability_interval(self, count: int) -> tuple[float, float]:
+        """Wilson score interval of the probability of `count` configurations of the sample."""
+        n, z = self.samples, self._z
+        p = count / n
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+    def homogeneity(self) -> tuple[float, float, float]:
+        """Mean inclusion probability of the features, and its confidence interval."""
+        mean, lower, upper = self.mean_size()
+        n_features = len(self.features)
+        return mean / n_features, max(lower / n_features, 0.0), min(upper / n_features, 1.0)
+
+    def mean_size(self) -> tuple[float, float, float]:
+        """Mean number of features of the configurations, and its confidence interval."""
+        mean = sum(size * freq for size, freq in enumerate(self.product_distribution)) / self.samples
+        half_width = self._z * self.std_size()[0] / math.sqrt(self.samples)
+        return mean, mean - half_width, mean + half_width
+
+    def std_size(self) -> tuple[float, float, float]:
+        """Standard deviation of the number of features of the configurations, and its
+        confidence interval (normal approximation of the standard error s / sqrt(2 (n - 1)))."""
+        n = self.samples
+        mean = sum(size * freq for size, freq in enumerate(self.product_distribution)) / n
+        variance = sum(freq * (size - mean) ** 2 for size, freq in enumerate(self.product_distribution)) / n
+        std = math.sqrt(variance)
+        half_width = 0.0 if n < 2 else self._z * std / math.sqrt(2 * (n - 1))
+        return std, max(std - half_width, 0.0), std + half_width
+
+    def median_size(self) -> tuple[int, int]:
+        """Confidence interval of the median number of features of the configurations
+        (order statistics of the sample)."""
+        n = self.samples
+        low_rank = max(math.floor(n / 2 - self._z * math.sqrt(n) / 2), 1)
+        high_rank = min(math.ceil(1 + n / 2 + self._z * math.sqrt(n) / 2), n)
+        return self._order_statistic(low_rank), self._order_statistic(high_rank)
+
+    def _order_statistic(self, rank: int) -> int:
+        cumulative = 0
+        for size, freq in enumerate(self.product_distribution):
+            cumulative += freq
+            if cumulative >= rank:
+                return size
+        return len(self.product_distribution) - 1
+
+
+def estimate_from_samples(sat_model: PySATModel,
+                          sampling: Optional[Sampling] = None,
+                          simplified: Optional[SimplifiedModel] = None,
+                          variant_features: Optional[Collection[str]] = None,
+                          count: Optional[int] = None) -> SampleEstimates:
+    """Return the estimates of the analysis from a sample of configurations of the SAT model,
+    which must be satisfiable (`count` is its approximate number of configurations, if known).
+
+    If the `variant_features` are given, their unique features are also computed (exactly)
+    in `estimates.unique_features`, unless the timeout is exceeded (then it is None).
+    Raise SamplingTimeout if the timeout is exceeded before drawing any configuration.
+    """
+    sampling = Sampling() if sampling is None else sampling
+    deadline = None if sampling.timeout is None else time.monotonic() + sampling.timeout
+
+    def check_timeout() -> None:
+        if deadline is not None and time.monotonic() > deadline:
+            raise SamplingTimeout(f'Sampling exceeded its timeout ({sampling.timeout} s).')
+
+    features = [sat_model.features[var] for var in range(1, len(sat_model.variables) + 1)]
+    estimates = SampleEstimates(features, sampling.confidence)
+    sampler = ConfigurationSampler(sat_model, simplified, sampling.seed, check_timeout, count)
+    try:
+        for batch in sampler.batches(min(sampling.batch_size, sampling.samples)):
+            estimates.add(batch[:sampling.samples - estimates.samples])
+            if estimates.samples >= sampling.samples:
+                break
+    except SamplingTimeout:
+        estimates.add(sampler.pending[:sampling.samples - estimates.samples])  # The partial batch
+        if estimates.samples == 0:
+            raise
+    if variant_features is not None:
+        try:
+            estimates.unique_features = sampler.unique_features(sat_model, variant_features)
+        except SamplingTimeout as e:
+            logging.warning(f'Warning: the unique features cannot be computed within the sampling timeout. ({e})')
+    return estimates
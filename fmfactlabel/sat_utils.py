@@ -0,0 +1,221 @@
+"""
+This module contains all utils related to the SAT analysis of feature models.
+"""
+
+import itertools
+from typing import Optional
+
+from pysat.solvers import Solver
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.core.models.ast import ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Constraint
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat
+
+from .simplification_utils import SimplifiedModel
+
+
+SOLVER_NAME = 'glucose3'  # Same solver as flamapy's operations
+
+
+class FmToCNF(FmToPysat):
+    """Transformation of a feature model into its SAT model, as `FmToPysat`, but with the CNF
+    of the constraints computed from their trees: flamapy turns `A <=> B` into `A => B`
+    and `A xor B` into `B`."""
+
+    def add_constraint(self, ctc: Constraint) -> None:
+        for clause in constraint_clauses(ctc.ast.root, self.destination_model.variables):
+            self.destination_model.add_clause(clause)
+
+
+def build_sat_model(fm: FeatureModel) -> PySATModel:
+    """Return the SAT model of the feature model (see `FmToCNF`)."""
+    return FmToCNF(fm).transform()
+
+
+def constraint_clauses(root: Node, variables: dict[str, int]) -> list[list[int]]:
+    """Return the CNF of a constraint as clauses over the variables of the features.
+
+    The negations are pushed to the features and the disjunctions are distributed over the
+    conjunctions (the CNF may be exponential, as flamapy's), iteratively.
+    Tautological and duplicated clauses are removed.
+    """
+    cnfs: dict[tuple[int, bool], list[frozenset[int]]] = {}
+    stack = [(root, True, False)]
+    while stack:
+        node, positive, operands_done = stack.pop()
+        key = (id(node), positive)
+        if key in cnfs:
+            continue
+        if node.is_term():
+            var = variables.get(node.data)
+            if var is None:
+                raise FlamaException(f'The feature {node.data} of a constraint is not in the feature model.')
+            cnfs[key] = [frozenset([var if positive else -var])]
+            continue
+        groups = _disjunctions(node, positive)
+        if not operands_done:
+            stack.append((node, positive, True))
+            stack.extend((operand, polarity) + (False,) for group in groups for operand, polarity in group)
+            continue
+        clauses: list[frozenset[int]] = []
+        for group in groups:  # the disjunction of the CNFs of the operands
+            for combination in itertools.product(*(cnfs[(id(operand), polarity)] for operand, polarity in group)):
+                clause = frozenset().union(*combination)
+                if not any(-lit in clause for lit in clause):
+                    clauses.append(clause)
+        cnfs[key] = list(dict.fromkeys(clauses))
+    return [sorted(clause, key=abs) for clause in cnfs[(id(root), True)]]
+
+
+def _disjunctions(node: Node, positive: bool) -> list[list[tuple[Node, bool]]]:
+    """Return the node (negated if not `positive`) as a conjunction of disjunctions of its
+    operands, each one with its polarity."""
+    operation = node.data
+    left, right = node.left, node.right
+    if operation == ASTOperation.NOT:
+        return [[(left, not positive)]]
+    if operation == ASTOperation.XOR:  # the negation of the equivalence
+        operation, positive = ASTOperation.EQUIVALENCE, not positive
+    if operation == ASTOperation.AND:
+        return [[(left, True)], [(right, True)]] if positive else [[(left, False), (right, False)]]
+    if operation == ASTOperation.OR:
+        return [[(left, True), (right, True)]] if positive else [[(left, False)], [(right, False)]]
+    if operation in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+        return [[(left, False), (right, True)]] if positive else [[(left, True)], [(right, False)]]
+    if operation == ASTOperation.EXCLUDES:
+        return [[(left, False), (right, False)]] if positive else [[(left, True)], [(right, True)]]
+    if operation == ASTOperation.EQUIVALENCE:
+        if positive:
+            return [[(left, False), (right, True)], [(left, True), (right, False)]]
+        return [[(left, True), (right, True)], [(left, False), (right, False)]]
+    raise FlamaException(f'The operation {operation} of a constraint cannot be encoded in CNF.')
+
+
+class SATBackbone():
+    """Backbone of the SAT model of a feature model: literals fixed in all configurations.
+
+    The backbone is computed in a single incremental solver session:
+    each candidate literal is tested by assuming its negation, and every model found
+    prunes the candidates that it falsifies. Backbone literals are added as unit clauses.
+    Satisfiability, core features (positive backbone), dead features (negative backbone),
+    and, if the feature model is given, false-optional features are all derived
+    from the same session.
+    If the `simplified` formula of the SAT model is given, the solver works on it:
+    the fixed variables need no solver call and each atomic set is tested once.
+    """
+
+    def __init__(self,
+                 sat_model: PySATModel,
+                 fm: Optional[FeatureModel] = None,
+                 simplified: Optional[SimplifiedModel] = None) -> None:
+        self.sat_model = sat_model
+        self.simplified = simplified
+        self.valid: bool = False
+        self.core_features: list[str] = []
+        self.dead_features: list[str] = []
+        self.false_optional_features: Optional[list[str]] = None  # None if they cannot be computed
+        self.solver_calls: int = 0
+        fo_candidates = None
+        if fm is not None:
+            try:
+                fo_candidates = false_optional_candidates(fm, sat_model)
+            except AssertionError:  # e.g., feature cardinalities
+                pass
+        clauses = sat_model.get_all_clauses().clauses if simplified is None else simplified.clauses
+        self._solver = Solver(name=SOLVER_NAME, bootstrap_with=clauses)
+        try:
+            self._compute_backbone()
+            if fo_candidates is not None:
+                self._compute_false_optional_features(fo_candidates)
+        finally:
+            self._solver.delete()
+
+    def _compute_backbone(self) -> None:
+        self.valid = (self.simplified is None or self.simplified.valid) and self._solve()
+        if not self.valid:
+            self.dead_features = list(self.sat_model.variables.keys())
+            return
+
+        if self.simplified is None:
+            features_vars = set(self.sat_model.features.keys())
+        else:
+            features_vars = set(range(1, self.simplified.n_vars + 1))
+        candidates = {lit for lit in self._solver.get_model() if abs(lit) in features_vars}
+        backbone = set()
+        while candidates:
+            lit = candidates.pop()
+            if self._solve([-lit]):
+                candidates.intersection_update(self._solver.get_model())
+            else:
+                backbone.add(lit)
+                self._solver.add_clause([lit])
+        if self.simplified is not None:
+            backbone = self.simplified.original_literals(backbone)
+        self.core_features = [name for name, var in self.sat_model.variables.items() if var in backbone]
+        self.dead_features = [name for name, var in self.sat_model.variables.items() if -var in backbone]
+
+    def _compute_false_optional_features(self, candidates: list[tuple[str, int, int]]) -> None:
+        """Optional features that are selected whenever their parent is selected.
+
+        Core features and the optional children of dead features are decided by the backbone.
+        Each remaining candidate requires a solver call (assuming its parent and not the feature)
+        unless a previous model has already shown it unselected with its parent selected.
+        """
+        if not self.valid:  # Nothing is satisfiable, as the flamapy operation reports
+            self.false_optional_features = [name for name, _, _ in candidates]
+            return
+        core_vars = {self.sat_model.variables[name] for name in self.core_features}
+        dead_vars = {self.sat_model.variables[name] for name in self.dead_features}
+        result = [name for name, variable, parent_variable in candidates
+                  if variable in core_vars or parent_variable in dead_vars]
+        undecided = [(name, variable, parent_variable) for name, variable, parent_variable in candidates
+                     if variable not in core_vars and variable not in dead_vars and parent_variable not in dead_vars]
+        while undecided:
+            name, variable, parent_variable = undecided.pop()
+            assumptions = [-self._literal(variable)]
+            parent_literal = self._literal(parent_variable)
+            if parent_literal is not None:  # otherwise, the parent is fixed (selected)
+                assumptions.append(parent_literal)
+            if not self._solve(assumptions):
+                result.append(name)
+                continue
+            model = self._solver.get_model()
+            undecided = [candidate for candidate in undecided
+                         if not (self._value(candidate[2], model) and not self._value(candidate[1], model))]
+        false_optional = set(result)
+        self.false_optional_features = [name for name, _, _ in candidates if name in false_optional]
+
+    def _literal(self, var: int) -> Optional[int]:
+        """Return the solver variable of the variable, or None if it is fixed."""
+        return var if self.simplified is None else self.simplified.literal(var)
+
+    def _value(self, var: int, model: list[int]) -> bool:
+        """Return the value of the variable in a model of the solver."""
+        if self.simplified is None:
+            # The model of pysat is ordered by variable: model[var - 1] is the literal of var
+            return model[var - 1] > 0
+        return self.simplified.value(var, model)
+
+    def _solve(self, assumptions: Optional[list[int]] = None) -> bool:
+        self.solver_calls += 1
+        return self._solver.solve(assumptions=assumptions or [])
+
+
+def false_optional_candidates(fm: FeatureModel, sat_model: PySATModel) -> list[tuple[str, int, int]]:
+    """Return the optional (non-root and non-mandatory) features with their variable and the
+    variable of their parent.
+
+    Raise AssertionError if a feature has no variable in the SAT model (e.g., multi-features).
+    """
+    candidates = []
+    for feature in fm.get_features():
+        parent = feature.get_parent()
+        if feature.is_root() or feature.is_mandatory() or parent is None:
+            continue
+        variable = sat_model.variables.get(feature.name)
+        parent_variable = sat_model.variables.get(parent.name)
+        assert variable is not None and parent_variable is not None, f'Feature {feature.name} not found'
+        candidates.append((feature.name, variable, parent_variable))
+    return candidates
@@ -0,0 +1,219 @@
+"""
+This module contains all utils related to the simplification of the CNF formula of
+feature models before their analysis.
+
+The simplification fixes the variables decided by unit propagation (e.g., the root and its
+mandatory descendants) and collapses the atomic sets (features that imply each other, e.g.,
+through mandatory relations or bi-implication constraints) into single variables.
+The SAT and d-DNNF analyses run on the reduced formula and map their results back
+to the original variables.
+"""
+
+from typing import Optional
+
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+
+
+class SimplifiedModel():
+    """CNF formula of a SAT model reduced by unit propagation and atomic sets.
+
+    The variables of the reduced formula are 1..n_vars, and each of them represents
+    an atomic set of original variables (`atomic_sets[var]`), which have the same value
+    in all configurations. The original variables fixed by unit propagation (`fixed`)
+    are not represented. If the formula is unsatisfiable by unit propagation,
+    `valid` is false and the reduced formula is empty.
+    """
+
+    def __init__(self, sat_model: PySATModel) -> None:
+        self.n_original = len(sat_model.variables)
+        self.valid: bool = True
+        self.fixed: dict[int, bool] = {}  # original variable -> value
+        self.atomic_sets: list[list[int]] = [[]]  # reduced variable -> original variables (index 0 is unused)
+        self.clauses: list[tuple[int, ...]] = []
+        self.n_vars: int = 0
+        self._reduced: dict[int, int] = {}  # original variable -> reduced variable
+        self._simplify([tuple(sorted(set(clause), key=abs)) for clause in sat_model.get_all_clauses().clauses])
+
+    def literal(self, var: int) -> Optional[int]:
+        """Return the reduced variable of the original variable, or None if it is fixed."""
+        return self._reduced.get(var)
+
+    def value(self, var: int, model: list[int]) -> bool:
+        """Return the value of the original variable in a model of the reduced formula.
+
+        The reduced variables beyond the model (in no clause) are taken as false.
+        """
+        if var in self.fixed:
+            return self.fixed[var]
+        reduced = self._reduced[var]
+        return reduced <= len(model) and model[reduced - 1] > 0
+
+    def original_literals(self, literals: set[int]) -> set[int]:
+        """Return the original literals implied by the literals of the reduced formula
+        (including the fixed ones)."""
+        result = {var if value else -var for var, value in self.fixed.items()}
+        for lit in literals:
+            result.update(var if lit > 0 else -var for var in self.atomic_sets[abs(lit)])
+        return result
+
+    def _simplify(self, clauses: list[tuple[int, ...]]) -> None:
+        representatives = list(range(self.n_original + 1))
+        fixed: dict[int, bool] = {}  # representative -> value
+        while True:  # Collapsing atomic sets may produce new units, and vice versa
+            simplified = propagate(clauses, ())
+            if simplified is None:
+                self.valid = False
+                return
+            units, clauses = simplified
+            fixed.update((abs(lit), lit > 0) for lit in units)
+            equivalences = equivalent_variables(clauses)
+            if not equivalences:
+                break
+            for var, representative in equivalences.items():
+                representatives[var] = representative
+            clauses = _substitute(clauses, equivalences)
+
+        def find(var: int) -> int:
+            while representatives[var] != var:
+                var = representatives[var]
+            return var
+
+        sets: dict[int, list[int]] = {}
+        for var in range(1, self.n_original + 1):
+            representative = find(var)
+            if representative in fixed:
+                self.fixed[var] = fixed[representative]
+            else:
+                sets.setdefault(representative, []).append(var)
+        for representative, members in sorted(sets.items()):
+            self.atomic_sets.append(members)
+            reduced = len(self.atomic_sets) - 1
+            for var in members:
+                self._reduced[var] = reduced
+        self.n_vars = len(self.atomic_sets) - 1
+        reduced_vars = {representative: self._reduced[representative] for representative in sets}
+        self.clauses = [tuple(sorted((reduced_vars[abs(lit)] if lit > 0 else -reduced_vars[abs(lit)] for lit in clause),
+                                     key=abs))
+                        for clause in clauses]
+
+
+def cnf_formula(sat_model: PySATModel,
+                simplified: Optional[SimplifiedModel] = None) -> tuple[int, list[tuple[int, ...]]]:
+    """Return the number of variables and the clauses of the formula of the SAT model,
+    or of its `simplified` formula if it is given."""
+    if simplified is not None:
+        return simplified.n_vars, simplified.clauses
+    return len(sat_model.variables), [tuple(sorted(set(clause), key=abs)) for clause in sat_model.get_all_clauses().clauses]
+
+
+def propagate(clauses: list[tuple[int, ...]],
+              assumptions: tuple[int, ...]) -> Optional[tuple[list[int], list[tuple[int, ...]]]]:
+    """Unit propagation of the assumptions and the unit clauses.
+
+    Return the implied literals (including the assumptions) and the reduced clauses,
+    or None if there is a conflict.
+    """
+    assigned = set(assumptions)
+    units = list(assumptions)
+    pending = bool(assumptions) or any(len(clause) == 1 for clause in clauses)
+    while pending:
+        pending = False
+        reduced_clauses = []
+        for clause in clauses:
+            reduced = []
+            satisfied = False
+            for lit in clause:
+                if lit in assigned:
+                    satisfied = True
+                    break
+                if -lit not in assigned:
+                    reduced.append(lit)
+            if satisfied:
+                continue
+            if not reduced:
+                return None
+            if len(reduced) == 1:
+                unit = reduced[0]
+                assigned.add(unit)
+                units.append(unit)
+                pending = True
+            else:
+                reduced_clauses.append(tuple(reduced) if len(reduced) < len(clause) else clause)
+        clauses = reduced_clauses
+    return units, clauses
+
+
+def equivalent_variables(clauses: list[tuple[int, ...]]) -> dict[int, int]:
+    """Return the variables equivalent to a smaller variable (its representative).
+
+    Two variables are equivalent if they imply each other through binary clauses (a => b is
+    the clause -a or b), i.e., if they are in the same strongly connected component of
+    the implication graph.
+    """
+    graph: dict[int, list[int]] = {}
+    for clause in clauses:
+        if len(clause) == 2 and (clause[0] > 0) != (clause[1] > 0):
+            negative, positive = (clause[0], clause[1]) if clause[0] < 0 else (clause[1], clause[0])
+            graph.setdefault(-negative, []).append(positive)
+    equivalences = {}
+    for component in _strongly_connected_components(graph):
+        if len(component) > 1:
+            representative = min(component)
+            equivalences.update((var, representative) for var in component if var != representative)
+    return equivalences
+
+
+def _substitute(clauses: list[tuple[int, ...]], equivalences: dict[int, int]) -> list[tuple[int, ...]]:
+    """Replace the variables by their representatives, removing tautologies and duplicates."""
+    result: dict[tuple[int, ...], None] = {}
+    for clause in clauses:
+        literals = set()
+        for lit in clause:
+            var = equivalences.get(abs(lit), abs(lit))
+            literals.add(var if lit > 0 else -var)
+        if any(-lit in literals for lit in literals):
+            continue
+        result[tuple(sorted(literals, key=abs))] = None
+    return list(result)
+
+
+def _strongly_connected_components(graph: dict[int, list[int]]) -> list[list[int]]:
+    """Tarjan's algorithm (iterative)."""
+    index: dict[int, int] = {}
+    low: dict[int, int] = {}
+    stack: list[int] = []
+    on_stack: set[int] = set()
+    components = []
+    for start in graph:
+        if start in index:
+            continue
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(graph[start]))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph.get(successor, ()))))
+                    break
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        var = stack.pop()
+                        on_stack.discard(var)
+                        component.append(var)
+                        if var == node:
+                            break
+                    components.append(component)
+    return components
@@ -0,0 +1,245 @@
+"""
+This module contains all utils related to the analysis of feature trees without
+cross-tree constraints.
+
+Without constraints, the configurations of a feature model decompose along the tree:
+the configurations of a subtree (with its root selected) combine the configurations of its
+relations, and each relation combines the subtrees of its children according to its
+cardinality. This gives exact results in polynomial time, bottom-up with generating functions
+(product distribution) and top-down with the counts of the rest of the tree (feature counts).
+"""
+
+from typing import Collection, Optional
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, Relation
+
+from .polynomial_utils import polynomial_product, polynomial_sum, polynomials_product
+
+
+class SubtreeCounts():
+    """Results of the separate analysis of a subtree (as a feature model rooted at its root)."""
+
+    def __init__(self,
+                 configurations: int,
+                 fip: dict[str, float],
+                 product_distribution: list[int],
+                 unique_features: list[str],
+                 engine: str) -> None:
+        self.configurations = configurations  # configurations of the subtree with its root selected
+        self.fip = fip
+        self.product_distribution = product_distribution
+        self.unique_features = unique_features
+        self.engine = engine
+
+
+class FeatureTreeCounter():
+    """Exact counting over the feature tree of a feature model without constraints.
+
+    The constraints are allowed inside `subtrees` analyzed separately (keyed by the name
+    of their root): they are leaves of the tree whose results are recombined exactly.
+    """
+
+    def __init__(self, fm: FeatureModel, subtrees: Optional[dict[str, SubtreeCounts]] = None) -> None:
+        self.fm = fm
+        self.subtrees = subtrees or {}
+        self._features = _postorder(fm.root, self.subtrees)
+        skeleton = {feature.name for feature in self._features}
+        for constraint in fm.get_constraints():
+            if any(name in skeleton and name not in self.subtrees for name in constraint.get_features()):
+                raise FlamaException('The feature tree counter requires the constraints to be inside the subtrees.')
+        # Configurations of each subtree with its root selected
+        self._subtree_counts: dict[str, int] = {}
+        for feature in self._features:
+            if feature.name in self.subtrees:
+                self._subtree_counts[feature.name] = self.subtrees[feature.name].configurations
+                continue
+            count = 1
+            for relation in feature.get_relations():
+                count *= _relation_count(relation, self._subtree_counts)
+            self._subtree_counts[feature.name] = count
+        self._contexts: Optional[dict[str, int]] = None
+
+    @property
+    def engine(self) -> str:
+        """Engines of the analysis: the feature tree and the engines of the subtrees."""
+        engines = sorted({subtree.engine for subtree in self.subtrees.values()})
+        return ' + '.join(['Feature tree'] + engines)
+
+    def configurations_number(self) -> int:
+        """Return the number of configurations (the root is always selected)."""
+        return self._subtree_counts[self.fm.root.name]
+
+    def feature_counts(self) -> dict[str, int]:
+        """Return the number of configurations in which each feature of the tree
+        (excluding the inside of the subtrees) is selected.
+
+        The configurations with a feature selected are the configurations of its subtree
+        times the ways of completing the rest of the tree (its context), which are computed
+        top-down from the context of its parent.
+        """
+        contexts = self._feature_contexts()
+        return {feature.name: contexts[feature.name] * self._subtree_counts[feature.name]
+                for feature in self._features}
+
+    def feature_probabilities(self) -> dict[str, float]:
+        """Return the feature inclusion probability of each feature.
+
+        Inside a subtree, it is the probability of its root times the probability
+        within the subtree.
+        """
+        total = self.configurations_number()
+        counts = self.feature_counts()
+        fip = {name: count / total if total > 0 else 0.0 for name, count in counts.items()}
+        for root, subtree in self.subtrees.items():
+            for name, probability in subtree.fip.items():
+                if name != root:
+                    fip[name] = fip[root] * probability
+        return {feature.name: fip[feature.name] for feature in self.fm.get_features()}
+
+    def unique_features(self) -> list[str]:
+        """Return the features that are selected in exactly one configuration."""
+        contexts = self._feature_contexts()
+        unique = {name for name, count in self.feature_counts().items() if count == 1}
+        for root, subtree in self.subtrees.items():
+            if contexts[root] == 1:
+                unique.update(subtree.unique_features)
+        return [feature.name for feature in self.fm.get_features() if feature.name in unique]
+
+    def product_distribution(self) -> list[int]:
+        """Return the number of configurations with 0, 1, ..., n selected features."""
+        distributions: dict[str, list[int]] = {}
+        for feature in self._features:
+            if feature.name in self.subtrees:
+                distributions[feature.name] = self.subtrees[feature.name].product_distribution
+                continue
+            factors = [[0, 1]]  # the feature itself
+            factors.extend(_relation_distribution(relation, distributions) for relation in feature.get_relations())
+            distributions[feature.name] = polynomials_product(factors)
+            for relation in feature.get_relations():  # the distributions of the children are no longer needed
+                for child in relation.children:
+                    del distributions[child.name]
+        distribution = distributions[self.fm.root.name]
+        return distribution + [0] * (len(self.fm.get_features()) + 1 - len(distribution))
+
+    def _feature_contexts(self) -> dict[str, int]:
+        """Return the ways of completing the rest of the tree for each selected feature."""
+        if self._contexts is not None:
+            return self._contexts
+        contexts = {self.fm.root.name: 1}
+        for feature in reversed(self._features):  # pre-order: parents before children
+            if feature.name in self.subtrees:
+                continue
+            context = contexts[feature.name]
+            relations = feature.get_relations()
+            relation_counts = [_relation_count(relation, self._subtree_counts) for relation in relations]
+            for i, relation in enumerate(relations):
+                others = context
+                for j, relation_count in enumerate(relation_counts):
+                    if j != i:
+                        others *= relation_count
+                for child, child_ways in zip(relation.children, _children_ways(relation, self._subtree_counts)):
+                    contexts[child.name] = others * child_ways
+        self._contexts = contexts
+        return contexts
+
+
+def _postorder(root: Feature, leaves: Collection[str] = ()) -> list[Feature]:
+    """Return the features of the tree in post-order (children before parents),
+    without descending into the given leaves."""
+    preorder = []
+    stack = [root]
+    while stack:
+        feature = stack.pop()
+        preorder.append(feature)
+        if feature.name not in leaves:
+            for relation in feature.get_relations():
+                stack.extend(relation.children)
+    return preorder[::-1]
+
+
+def _cardinality(relation: Relation) -> tuple[int, int]:
+    """Return the bounds of the cardinality of the relation, capped to the number of children.
+
+    As in the SAT and BDD transformations, the bounds are taken literally
+    (e.g., a negative upper bound allows no selection of children).
+    """
+    return relation.card_min, min(relation.card_max, len(relation.children))
+
+
+def _relation_count(relation: Relation, subtree_counts: dict[str, int]) -> int:
+    """Return the number of ways of configuring the children of the relation (parent selected)."""
+    counts = [subtree_counts[child.name] for child in relation.children]
+    card_min, card_max = _cardinality(relation)
+    if relation.is_mandatory():
+        return counts[0]
+    if relation.is_optional():
+        return 1 + counts[0]
+    if relation.is_alternative():
+        return sum(counts)
+    if relation.is_or():
+        product = 1
+        for count in counts:
+            product *= 1 + count
+        return product - 1
+    return sum(_elementary_symmetric(counts, card_max)[card_min:card_max + 1])
+
+
+def _children_ways(relation: Relation, subtree_counts: dict[str, int]) -> list[int]:
+    """Return, for each child, the ways of configuring the other children of the relation
+    when the child is selected."""
+    counts = [subtree_counts[child.name] for child in relation.children]
+    card_min, card_max = _cardinality(relation)
+    if relation.is_mandatory() or relation.is_optional() or relation.is_alternative():
+        return [1] * len(counts)
+    if relation.is_or():  # any subset of the other children
+        prefix = [1]
+        for count in counts:
+            prefix.append(prefix[-1] * (1 + count))
+        suffix = 1
+        ways = [0] * len(counts)
+        for i in range(len(counts) - 1, -1, -1):
+            ways[i] = prefix[i] * suffix
+            suffix *= 1 + counts[i]
+        return ways
+    ways = []
+    for i in range(len(counts)):
+        others = _elementary_symmetric(counts[:i] + counts[i + 1:], card_max - 1)
+        ways.append(sum(others[max(card_min - 1, 0):card_max]))
+    return ways
+
+
+def _relation_distribution(relation: Relation, distributions: dict[str, list[int]]) -> list[int]:
+    """Return the generating function of the children of the relation (parent selected)."""
+    children = [distributions[child.name] for child in relation.children]
+    card_min, card_max = _cardinality(relation)
+    if relation.is_mandatory():
+        return children[0]
+    if relation.is_optional():
+        return polynomial_sum([1], children[0])
+    if relation.is_alternative():
+        result: list[int] = []
+        for child in children:
+            result = polynomial_sum(result, child)
+        return result
+    if relation.is_or():
+        result = polynomials_product([polynomial_sum([1], child) for child in children])
+        result[0] -= 1  # not the empty selection
+        return result
+    symmetric = [[1]] + [[] for _ in range(card_max)]
+    for child in children:
+        for k in range(card_max, 0, -1):
+            symmetric[k] = polynomial_sum(symmetric[k], polynomial_product(symmetric[k - 1], child))
+    result = []
+    for k in range(card_min, card_max + 1):
+        result = polynomial_sum(result, symmetric[k])
+    return result
+
+
+def _elementary_symmetric(values: list[int], max_order: int) -> list[int]:
+    """Return the elementary symmetric sums e_0, ..., e_max_order of the values."""
+    symmetric = [1] + [0] * max(max_order, 0)
+    for value in values:
+        for k in range(max_order, 0, -1):
+            symmetric[k] += symmetric[k - 1] * value
+    return symmetric
@@ -0,0 +1,556 @@
+"""
+This module contains all utils related to the fast reading of UVL files.
+
+The `UVLReader` of flamapy builds an ANTLR parse tree of the whole file before building the
+feature model, which is slow and memory-hungry for generated models with hundreds of thousands
+of features and constraints. `UVLFastReader` tokenizes the file with a single regular expression
+(emulating the indentation of the UVL lexer) and builds the `FeatureModel` directly with iterative
+parsers, so that it runs in linear time with a bounded stack depth. It builds the same feature
+model as `UVLReader` for the constructs it supports, and raises `UnsupportedUVL` otherwise
+(e.g., imports, includes or anything it cannot tokenize), so that `read_uvl_file` falls back to
+`UVLReader`.
+"""
+
+import re
+import logging
+from typing import Any
+
+from flamapy.core.models.ast import AST, ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import (
+    FeatureModel,
+    Feature,
+    FeatureType,
+    Relation,
+    Constraint,
+    Attribute,
+    Cardinality
+)
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+
+READER_VERSION = 1  # Changes of the feature models read invalidate their snapshots (see `fm_binary_utils`)
+MAX_ATTRIBUTES_DEPTH = 32  # Nested attributes and vectors (the rest of the file is parsed iteratively)
+
+_TOKEN = re.compile(r"""
+    (?P<NEWLINE>(?:\r\n|\n|\r)[ \t]*)
+    |(?P<SPACES>[ \t]+)
+    |(?P<COMMENT>//[^\r\n\f]*|/\*.*\*/)  # The block comments of the UVL lexer are greedy
+    |(?P<UNSUPPORTED>/\*|\*/|<INDENT>|<DEDENT>)
+    |(?P<CARDINALITY>\[(?:0|-?[1-9][0-9]*)(?:\.\.(?:0|-?[1-9][0-9]*|\*))?\])
+    |(?P<FLOAT>-?[0-9]*\.[0-9]+)
+    |(?P<INTEGER>0|-?[1-9][0-9]*)
+    |(?P<ID_STRICT>[a-zA-Z][a-zA-Z0-9_#§%?\\';äöüß]*)
+    |(?P<ID_NOT_STRICT>"[^\r\n".]+")
+    |(?P<STRING>'[^\r\n']+')
+    |(?P<SYMBOL><=>|=>|==|<=|>=|!=|[()\[\]{},.!&|<>/*+-])
+    |(?P<UNKNOWN>.)
+    """, re.VERBOSE | re.DOTALL)
+
+# Token kinds: the keywords and symbols are their own kind
+ID = 'ID'
+KEYWORDS = {'include', 'features', 'imports', 'namespace', 'as', 'constraint', 'constraints',
+            'cardinality', 'String', 'Boolean', 'Integer', 'Real', 'len', 'sum', 'avg', 'floor',
+            'ceil', 'Type', 'Arithmetic', 'or', 'alternative', 'optional', 'mandatory'}
+HYPHENATED_KEYWORDS = ('group-cardinality', 'feature-cardinality', 'aggregate-function', 'string-constraints')
+BOOLEANS = {'true', 'false'}
+OPENING = {'(', '[', '{'}
+CLOSING = {')', ']', '}'}
+
+FEATURE_TYPES = {'String': FeatureType.STRING, 'Boolean': FeatureType.BOOLEAN,
+                 'Integer': FeatureType.INTEGER, 'Real': FeatureType.REAL}
+GROUPS = {'or', 'alternative', 'optional', 'mandatory', 'CARDINALITY'}
+LOGICAL_OPERATORS = {'&': (4, ASTOperation.AND), '|': (3, ASTOperation.OR),
+                     '=>': (2, ASTOperation.IMPLIES), '<=>': (1, ASTOperation.EQUIVALENCE)}
+ARITHMETIC_OPERATORS = {'+': (1, ASTOperation.ADD), '-': (1, ASTOperation.SUB),
+                        '*': (2, ASTOperation.MUL), '/': (2, ASTOperation.DIV)}
+COMPARISONS = {'==': ASTOperation.EQUALS, '<': ASTOperation.LOWER, '>': ASTOperation.GREATER,
+               '<=': ASTOperation.LOWER_EQUALS, '>=': ASTOperation.GREATER_EQUALS,
+               '!=': ASTOperation.NOT_EQUALS}
+VALUES = {'BOOLEAN', 'FLOAT', 'INTEGER', 'STRING', '{', '['}
+
+
+class UnsupportedUVL(Exception):
+    """The UVL file has constructs that `UVLFastReader` does not support (or syntax errors)."""
+
+
+def read_uvl_file(filename: str) -> FeatureModel:
+    """Read the UVL file with `UVLFastReader`, or with the `UVLReader` of flamapy if it is not supported."""
+    try:
+        return UVLFastReader(filename).transform()
+    except UnsupportedUVL as e:
+        logging.info(f'The UVL file {filename} is read with the UVLReader of flamapy. ({e})')
+    return UVLReader(filename).transform()
+
+
+class UVLFastReader():
+    """Reader of UVL files that builds the same `FeatureModel` as the `UVLReader` of flamapy
+    (features, relations, attributes and constraints, named in the same order), without
+    building a parse tree.
+
+    The tokens are the same as those of the UVL lexer, including the NEWLINE, INDENT and DEDENT
+    tokens of the indentation. The feature tree is parsed with an explicit stack, and the
+    constraints and expressions by operator precedence.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.kinds: list[str] = []
+        self.texts: list[str] = []
+        self.closing: dict[int, int] = {}  # Position of each '(' -> position of its ')'
+        self.pos = 0
+        self.warnings: list[str] = []  # Logged once the file is read (not if it falls back)
+        self.constraints_attributes: dict[Feature, list[Constraint]] = {}
+        self.constraint_counter = 0
+
+    def transform(self) -> FeatureModel:
+        with open(self.path, encoding='utf-8', newline='') as uvl_file:
+            self.tokenize(uvl_file.read())
+
+        if self.kinds[self.pos] == 'namespace':
+            self.pos += 1
+            namespace = self._reference()
+            self.warnings.append('Namespaces are not meningful for Flama.'
+                                 f'This model has the following namespaces: {namespace} ')
+        for _ in range(3):  # namespace? NEWLINE? includes? NEWLINE? imports? NEWLINE?
+            if self.kinds[self.pos] in ('include', 'imports'):
+                raise UnsupportedUVL(self.kinds[self.pos])
+            self._optional('NEWLINE')
+        self._expect('features')
+        self._expect('NEWLINE')
+        self._expect('INDENT')
+        root = self._feature_tree()
+        self._expect('DEDENT')
+        self._optional('NEWLINE')
+
+        model = FeatureModel(root, [])
+        for constraints in self.constraints_attributes.values():
+            model.ctcs.extend(constraints)
+        if self._optional('constraints'):
+            self._expect('NEWLINE')
+            self._expect('INDENT')
+            constraint_counter = len(model.ctcs)
+            while not self._optional('DEDENT'):
+                node = self._constraint()
+                self._expect('NEWLINE')
+                model.ctcs.append(Constraint(name=f'Constraint {constraint_counter}', ast=AST(node)))
+                constraint_counter += 1
+        self._expect('EOF')
+
+        for warning in self.warnings:
+            logging.warning(warning)
+        return model
+
+    def tokenize(self, text: str) -> None:
+        """Split the text into tokens as the UVL lexer, with the NEWLINE, INDENT and DEDENT tokens
+        of its indentation: the line breaks inside brackets and before blank lines or comments
+        are skipped, and tabs count up to the next multiple of 8."""
+        kinds, texts = self.kinds, self.texts
+        indents: list[int] = []
+        opened = 0
+        parentheses: list[int] = []
+        if text[:1] in (' ', '\t'):
+            raise UnsupportedUVL('indentation at the start of the file')
+        for token in _TOKEN.finditer(text):
+            kind, value = token.lastgroup, token.group()
+            if kind == 'NEWLINE':
+                pos = token.end()
+                next_char = text[pos:pos + 1]
+                if opened > 0 or not next_char or next_char in '\r\n\f/#':
+                    continue
+                kinds.append('NEWLINE')
+                texts.append(value)
+                indent = indentation(value.lstrip('\r\n'))
+                previous = indents[-1] if indents else 0
+                if indent > previous:
+                    indents.append(indent)
+                    kinds.append('INDENT')
+                    texts.append('')
+                else:
+                    while indents and indents[-1] > indent:
+                        indents.pop()
+                        kinds.append('DEDENT')
+                        texts.append('')
+            elif kind in ('SPACES', 'COMMENT'):
+                continue
+            elif kind == 'UNSUPPORTED' or kind == 'UNKNOWN':
+                raise UnsupportedUVL(f'unexpected {value!r}')
+            elif kind == 'ID_STRICT':
+                if value in KEYWORDS:
+                    kind = value
+                elif value in BOOLEANS:
+                    kind = 'BOOLEAN'
+                else:
+                    kind = ID
+                    if text.startswith('-', token.end()) and any(keyword.startswith(value + '-') for keyword in HYPHENATED_KEYWORDS):
+                        raise UnsupportedUVL(f'unexpected {value!r}')
+                kinds.append(kind)
+                texts.append(value)
+            elif kind == 'SYMBOL':
+                if value in OPENING:
+                    opened += 1
+                    if value == '(':
+                        parentheses.append(len(kinds))
+                elif value in CLOSING:
+                    opened -= 1
+                    if value == ')' and parentheses:
+                        self.closing[parentheses.pop()] = len(kinds)
+                kinds.append(value)
+                texts.append(value)
+            else:
+                kinds.append(ID if kind == 'ID_NOT_STRICT' else kind)
+                texts.append(value)
+        if indents:
+            kinds.append('NEWLINE')
+            texts.append('')
+            kinds.extend('DEDENT' for _ in indents)
+            texts.extend('' for _ in indents)
+        kinds.append('EOF')
+        texts.append('')
+
+    def _feature_tree(self) -> Feature:
+        """Parse the root feature and its subtree with an explicit stack.
+
+        The stack holds the features whose groups are being parsed (`[feature, n_groups]`)
+        and the groups whose features are being parsed (`[parent, kind, cardinality, children]`).
+        """
+        kinds = self.kinds
+        root = self._feature()
+        stack: list[list[Any]] = []
+        if self._optional('INDENT'):
+            stack.append([root, 0])
+        while stack:
+            top = stack[-1]
+            if len(top) == 2:  # feature: INDENT group+ DEDENT
+                if top[1] and self._optional('DEDENT'):
+                    stack.pop()
+                    continue
+                kind = kinds[self.pos]
+                if kind not in GROUPS:
+                    raise UnsupportedUVL(f'unexpected {self.texts[self.pos]!r} in the feature {top[0].name}')
+                cardinality = self.texts[self.pos]
+                self.pos += 1
+                self._expect('NEWLINE')
+                self._expect('INDENT')
+                top[1] += 1
+                stack.append([top[0], kind, cardinality, []])
+            else:  # group: NEWLINE INDENT feature+ DEDENT
+                if top[3] and self._optional('DEDENT'):
+                    stack.pop()
+                    self._add_relations(*top)
+                    continue
+                child = self._feature()
+                top[3].append(child)
+                if self._optional('INDENT'):
+                    stack.append([child, 0])
+        return root
+
+    def _feature(self) -> Feature:
+        """Parse the line of a feature: featureType? reference featureCardinality? attributes? NEWLINE."""
+        kinds, texts = self.kinds, self.texts
+        feature_type = None
+        if kinds[self.pos] in FEATURE_TYPES:
+            feature_type = FEATURE_TYPES[kinds[self.pos]]
+            self.pos += 1
+        feature = Feature(self._reference().replace('"', ''), [])
+        if self._optional('cardinality'):
+            self._expect('CARDINALITY')
+            min_value, max_value = parse_cardinality(texts[self.pos - 1])
+            feature.feature_cardinality = Cardinality(card_min=min_value, card_max=max_value)
+        if feature_type is not None:
+            feature.feature_type = feature_type
+        self.constraints_attributes[feature] = []
+        if kinds[self.pos] == '{':
+            attributes = self._attributes(feature, 0)
+            for key, value in attributes.items():
+                if key == 'abstract' and (value is None or value):
+                    feature.is_abstract = True
+                else:
+                    if value is None:  # for boolean values the value may be not provided
+                        default_value = True
+                    elif isinstance(value, dict):  # it represents nested attributes
+                        for attribute in nested_attributes(feature, str(key), value):
+                            feature.add_attribute(attribute)
+                        default_value = None
+                    else:
+                        default_value = value
+                    feature.add_attribute(Attribute(name=str(key), default_value=default_value))
+        feature.constraints_attributes = self.constraints_attributes[feature]
+        self._expect('NEWLINE')
+        return feature
+
+    def _add_relations(self, feature: Feature, kind: str, cardinality: str, children: list[Feature]) -> None:
+        if kind == 'alternative':
+            feature.add_relation(Relation(feature, children, 1, 1))
+        elif kind == 'optional':
+            for child in children:
+                feature.add_relation(Relation(feature, [child], 0, 1))
+        elif kind == 'or':
+            feature.add_relation(Relation(feature, children, 1, len(children)))
+        elif kind == 'mandatory':
+            for child in children:
+                feature.add_relation(Relation(feature, [child], 1, 1))
+        else:
+            min_value, max_value = parse_cardinality(cardinality)
+            feature.add_relation(Relation(feature, children, min_value, max_value))
+            if max_value > len(children):
+                self.warnings.append('Cardinality error: max value is greater than the number of childs')
+
+    def _attributes(self, feature: Feature, depth: int) -> dict[Any, Any]:
+        """Parse the attributes of a feature: '{' (attribute (',' attribute)*)? '}'."""
+        if depth > MAX_ATTRIBUTES_DEPTH:
+            raise UnsupportedUVL(f'attributes of the feature {feature.name} nested too deep')
+        kinds = self.kinds
+        self._expect('{')
+        attributes: dict[Any, Any] = {}
+        if kinds[self.pos] != '}':
+            while True:
+                kind = kinds[self.pos]
+                if kind == ID:
+                    key = self.texts[self.pos].replace('"', '')
+                    self.pos += 1
+                    attributes[key] = self._value(feature, depth) if kinds[self.pos] in VALUES else None
+                elif kind == 'constraint':
+                    self.pos += 1
+                    self._add_constraint_attribute(feature, self._constraint())
+                elif kind == 'constraints':
+                    self.pos += 1
+                    self._expect('[')
+                    if kinds[self.pos] != ']':
+                        self._add_constraint_attribute(feature, self._constraint())
+                        while self._optional(','):
+                            self._add_constraint_attribute(feature, self._constraint())
+                    self._expect(']')
+                else:
+                    raise UnsupportedUVL(f'unexpected {self.texts[self.pos]!r} in the attributes of {feature.name}')
+                if not self._optional(','):
+                    break
+        self._expect('}')
+        return attributes
+
+    def _value(self, feature: Feature, depth: int) -> Any:
+        kind, text = self.kinds[self.pos], self.texts[self.pos]
+        if kind == '{':
+            return self._attributes(feature, depth + 1)
+        self.pos += 1
+        if kind == 'BOOLEAN':
+            return text == 'true'
+        if kind == 'FLOAT':
+            return float(text)
+        if kind == 'INTEGER':
+            return int(text)
+        if kind == 'STRING':
+            return text[1:-1]  # Removing quotes
+        if kind != '[':
+            raise UnsupportedUVL(f'unexpected {text!r} in the attributes of {feature.name}')
+        if depth >= MAX_ATTRIBUTES_DEPTH:  # vector
+            raise UnsupportedUVL(f'attributes of the feature {feature.name} nested too deep')
+        vector = []
+        if self.kinds[self.pos] != ']':
+            vector.append(self._value(feature, depth + 1))
+            while self._optional(','):
+                vector.append(self._value(feature, depth + 1))
+        self._expect(']')
+        return vector
+
+    def _add_constraint_attribute(self, feature: Feature, node: Node) -> None:
+        ctc = Constraint(name=f'Constraint {self.constraint_counter}', ast=AST(node))
+        self.constraints_attributes[feature].append(ctc)
+        self.constraint_counter += 1
+
+    def _constraint(self) -> Node:
+        """Parse a constraint by operator precedence: '!' binds tighter than '&', '|', '=>'
+        and '<=>' (in this order), and the binary operators are left associative."""
+        kinds = self.kinds
+        operands: list[Node] = []
+        operators: list[str] = []
+        opened = 0
+        while True:
+            kind = kinds[self.pos]
+            if kind == '!':
+                operators.append(kind)
+                self.pos += 1
+                continue
+            if kind == '(' and not self._is_expression_parenthesis(self.pos):
+                operators.append(kind)
+                opened += 1
+                self.pos += 1
+                continue
+            operands.append(self._equation_or_literal())
+            _apply_not(operands, operators)
+            while True:
+                kind = kinds[self.pos]
+                if kind in LOGICAL_OPERATORS:
+                    precedence = LOGICAL_OPERATORS[kind][0]
+                    while operators and operators[-1] in LOGICAL_OPERATORS and LOGICAL_OPERATORS[operators[-1]][0] >= precedence:
+                        _apply_binary(operands, operators, LOGICAL_OPERATORS)
+                    operators.append(kind)
+                    self.pos += 1
+                    break
+                if kind == ')' and opened:
+                    while operators[-1] != '(':
+                        _apply_binary(operands, operators, LOGICAL_OPERATORS)
+                    operators.pop()
+                    opened -= 1
+                    self.pos += 1
+                    _apply_not(operands, operators)
+                    continue
+                if opened:
+                    raise UnsupportedUVL(f'unexpected {self.texts[self.pos]!r} in a constraint')
+                while operators:
+                    _apply_binary(operands, operators, LOGICAL_OPERATORS)
+                return operands[0]
+
+    def _is_expression_parenthesis(self, position: int) -> bool:
+        """Return true if the parenthesis opens an arithmetic expression of an equation,
+        i.e., it is followed by an arithmetic or comparison operator once closed."""
+        closing = self.closing.get(position)
+        if closing is None:
+            raise UnsupportedUVL('unbalanced parentheses')
+        kind = self.kinds[closing + 1]
+        return kind in ARITHMETIC_OPERATORS or kind in COMPARISONS
+
+    def _equation_or_literal(self) -> Node:
+        kinds = self.kinds
+        if kinds[self.pos] == ID:
+            start = self.pos
+            reference = self._reference()
+            if kinds[self.pos] not in ARITHMETIC_OPERATORS and kinds[self.pos] not in COMPARISONS:
+                return Node(reference.replace('"', ''))  # literal
+            self.pos = start
+        left = self._expression()
+        operator = COMPARISONS.get(kinds[self.pos])
+        if operator is None:
+            raise UnsupportedUVL(f'unexpected {self.texts[self.pos]!r} in a constraint')
+        self.pos += 1
+        return Node(operator, left, self._expression())
+
+    def _expression(self) -> Node:
+        """Parse an arithmetic expression by operator precedence ('*' and '/' bind tighter
+        than '+' and '-', and all of them are left associative)."""
+        kinds = self.kinds
+        operands: list[Node] = []
+        operators: list[str] = []
+        opened = 0
+        while True:
+            if kinds[self.pos] == '(':
+                operators.append('(')
+                opened += 1
+                self.pos += 1
+                continue
+            operands.append(self._primary_expression())
+            while True:
+                kind = kinds[self.pos]
+                if kind in ARITHMETIC_OPERATORS:
+                    precedence = ARITHMETIC_OPERATORS[kind][0]
+                    while operators and operators[-1] != '(' and ARITHMETIC_OPERATORS[operators[-1]][0] >= precedence:
+                        _apply_binary(operands, operators, ARITHMETIC_OPERATORS)
+                    operators.append(kind)
+                    self.pos += 1
+                    break
+                if kind == ')' and opened:
+                    while operators[-1] != '(':
+                        _apply_binary(operands, operators, ARITHMETIC_OPERATORS)
+                    operators.pop()
+                    opened -= 1
+                    self.pos += 1
+                    continue
+                if opened:
+                    raise UnsupportedUVL(f'unexpected {self.texts[self.pos]!r} in an expression')
+                while operators:
+                    _apply_binary(operands, operators, ARITHMETIC_OPERATORS)
+                return operands[0]
+
+    def _primary_expression(self) -> Node:
+        kind, text = self.kinds[self.pos], self.texts[self.pos]
+        if kind == ID:
+            return Node(self._reference().replace('"', '').replace("'", ''))
+        if kind in ('sum', 'avg', 'len', 'floor', 'ceil'):
+            self.pos += 1
+            self._expect('(')
+            references = [self._reference()]
+            if kind in ('sum', 'avg') and self._optional(','):
+                references.append(self._reference())
+            self._expect(')')
+            if kind == 'sum':
+                return Node(ASTOperation.SUM, *[Node(reference.replace('"', '')) for reference in references])
+            if kind == 'avg':
+                return Node(ASTOperation.AVG, *[Node(reference.replace('"', '')) for reference in references])
+            if kind == 'len':
+                return Node(ASTOperation.LEN, Node(references[0]))
+            return Node(ASTOperation.FLOOR if kind == 'floor' else ASTOperation.CEIL, Node(references[0]))
+        self.pos += 1
+        if kind == 'FLOAT':
+            return Node(float(text))
+        if kind == 'INTEGER':
+            return Node(int(text))
+        if kind == 'STRING':
+            return Node(text.replace('"', '').replace("'", ''))
+        raise UnsupportedUVL(f'unexpected {text!r} in an expression')
+
+    def _reference(self) -> str:
+        """Parse a reference ((id '.')* id) and return its text."""
+        kinds, texts = self.kinds, self.texts
+        if kinds[self.pos] != ID:
+            raise UnsupportedUVL(f'unexpected {texts[self.pos]!r} instead of a name')
+        start = self.pos
+        self.pos += 1
+        while kinds[self.pos] == '.' and kinds[self.pos + 1] == ID:
+            self.pos += 2
+        return texts[start] if self.pos == start + 1 else ''.join(texts[start:self.pos])
+
+    def _optional(self, kind: str) -> bool:
+        if self.kinds[self.pos] == kind:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind: str) -> None:
+        if self.kinds[self.pos] != kind:
+            raise UnsupportedUVL(f'unexpected {self.texts[self.pos]!r} instead of {kind}')
+        self.pos += 1
+
+
+def _apply_not(operands: list[Node], operators: list[str]) -> None:
+    while operators and operators[-1] == '!':
+        operators.pop()
+        operands[-1] = Node(ASTOperation.NOT, operands[-1])
+
+
+def _apply_binary(operands: list[Node], operators: list[str], table: dict[str, tuple[int, ASTOperation]]) -> None:
+    right = operands.pop()
+    operands[-1] = Node(table[operators.pop()][1], operands[-1], right)
+
+
+def indentation(spaces: str) -> int:
+    """Return the width of the indentation, with tabs up to the next multiple of 8 (as the UVL lexer)."""
+    count = 0
+    for char in spaces:
+        count = count + 8 - count % 8 if char == '\t' else count + 1
+    return count
+
+
+def parse_cardinality(cardinality: str) -> tuple[int, int]:
+    """Return the bounds of a cardinality ('[min..max]', '[min..*]' or '[min]'), with -1 for '*'."""
+    bounds = cardinality[1:-1].split('..')
+    max_value = bounds[-1]
+    return int(bounds[0]), -1 if max_value == '*' else int(max_value)
+
+
+def nested_attributes(feature: Feature, parent_name: str, values: dict[Any, Any]) -> list[Attribute]:
+    """Return the attributes of the nested attributes of a feature, named by their path (e.g., `a.b`),
+    as the `UVLReader` of flamapy (their depth is bounded by `MAX_ATTRIBUTES_DEPTH`)."""
+    attributes = []
+    for key, value in values.items():
+        if value is None:  # for boolean values the value may be not provided
+            default_value = True
+        elif isinstance(value, dict):
+            if not value:  # The UVLReader has no value for it
+                raise UnsupportedUVL(f'empty nested attribute {parent_name}.{key}')
+            attributes.extend(nested_attributes(feature, f'{parent_name}.{key}', value))
+            default_value = None
+        else:
+            default_value = value
+        attribute = Attribute(name=f'{parent_name}.{key}', default_value=default_value)
+        attribute.parent = feature
+        attributes.append(attribute)
+    return attributes
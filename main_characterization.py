@@ -1,31 +1,68 @@
-import sys
 import logging
 import argparse
-from typing import Any
+from typing import Any, Optional
 
-from fmfactlabel import FMCharacterization
+from fmfactlabel import FMCharacterization, FMProperties, BDDBudget, BDDCache, ApproxCounting, Sampling
+from fmfactlabel.json_utils import JSON_VERSIONS
+from fmfactlabel.bdd_utils import ORDERINGS, DEFAULT_ORDERING
+from fmfactlabel.cache_utils import DEFAULT_MAX_SIZE
+from fmfactlabel.approxmc_utils import DEFAULT_APPROX_COUNTING, DEFAULT_TOLERANCE, DEFAULT_CONFIDENCE, DEFAULT_TIMEOUT
+from fmfactlabel.sampling_utils import (
+    DEFAULT_SAMPLING, 
+    DEFAULT_SAMPLES, 
+    DEFAULT_BATCH_SIZE, 
+    DEFAULT_CONFIDENCE as DEFAULT_SAMPLING_CONFIDENCE, 
+    DEFAULT_TIMEOUT as DEFAULT_SAMPLING_TIMEOUT
+)
 
 
-def main(fm_filepath: str, metadata: dict[str, Any], light_fm: bool) -> None:
+def main(fm_filepath: str, 
+         metadata: dict[str, Any], 
+         light_fm: bool, 
+         bdd_budget: Optional[BDDBudget] = None,
+         bdd_ordering: str = DEFAULT_ORDERING,
+         bdd_reordering: bool = False,
+         simplify: bool = True,
+         approx_counting: Optional[ApproxCounting] = DEFAULT_APPROX_COUNTING,
+         sampling: Optional[Sampling] = DEFAULT_SAMPLING,
+         bdd_directory: Optional[str] = None,
+         bdd_cache: Optional[BDDCache] = None,
+         summary: bool = False,
+         select: Optional[list[FMProperties]] = None,
+         json_compact: bool = False,
+         json_gzip: bool = False,
+         json_version: int = 1,
+         fm_snapshot: bool = False) -> None:
     if fm_filepath.startswith('http://') or fm_filepath.startswith('https://'):
-        characterization = FMCharacterization.from_url(fm_filepath, light_fm)
+        characterization = FMCharacterization.from_url(fm_filepath, light_fm, bdd_budget=bdd_budget, 
+                                                       bdd_ordering=bdd_ordering, bdd_reordering=bdd_reordering,
+                                                       simplify=simplify, approx_counting=approx_counting,
+                                                       sampling=sampling, bdd_cache=bdd_cache, summary=summary,
+                                                       select=select)
     else:
-        characterization = FMCharacterization.from_path(fm_filepath, light_fm)
+        characterization = FMCharacterization.from_path(fm_filepath, light_fm, bdd_budget=bdd_budget,
+                                                        bdd_ordering=bdd_ordering, bdd_reordering=bdd_reordering,
+                                                        simplify=simplify, approx_counting=approx_counting,
+                                                        sampling=sampling, bdd_cache=bdd_cache, summary=summary,
+                                                        select=select, fm_snapshot=fm_snapshot)
     
-    characterization.metadata.description = metadata.get('description')
-    characterization.metadata.author = metadata.get('authors')
-    characterization.metadata.year = metadata.get('year')
-    characterization.metadata.tags = metadata.get('tags')
-    characterization.metadata.reference = metadata.get('doi')
-    characterization.metadata.domains = metadata.get('domain')
-    
-    print(characterization)
-    output_filepath = str(f'{characterization.metadata.name}.json')
-    characterization.to_json_file(output_filepath)
+    with characterization:
+        characterization.metadata.description = metadata.get('description')
+        characterization.metadata.author = metadata.get('authors')
+        characterization.metadata.year = metadata.get('year')
+        characterization.metadata.tags = metadata.get('tags')
+        characterization.metadata.reference = metadata.get('doi')
+        characterization.metadata.domains = metadata.get('domain')
+        
+        snapshot = characterization.snapshot()
+        print(snapshot)
+        output_filepath = str(f'{characterization.metadata.name}.json{".gz" if json_gzip else ""}')
+        snapshot.to_json_file(output_filepath, json_compact, json_gzip, json_version)
+        if bdd_directory is not None:
+            characterization.save_bdd(bdd_directory)
     
 
 if __name__ == '__main__':
-    sys.set_int_max_str_digits(0)
     logging.basicConfig(level=logging.ERROR)
     
     parser = argparse.ArgumentParser(description='FM Characterization.')
@@ -38,6 +75,30 @@ if __name__ == '__main__':
     parser.add_argument('-domain', dest='domain', type=str, required=False, help="Feature model's domain")
     parser.add_argument('-doi', dest='doi', type=str, required=False, help="Feature model's doi")
     parser.add_argument('-light', dest='light_fm', action='store_true', required=False, default=False, help='Exclude some analytical metrics (i.e., no BDD analysis)')
+    parser.add_argument('-bdd_timeout', dest='bdd_timeout', type=float, required=False, help='Time budget (seconds) to build the BDD before falling back to SAT')
+    parser.add_argument('-bdd_max_nodes', dest='bdd_max_nodes', type=int, required=False, help='Node budget to build the BDD before falling back to SAT')
+    parser.add_argument('-bdd_max_memory', dest='bdd_max_memory', type=int, required=False, help='Memory budget (MB) to build the BDD before falling back to SAT')
+    parser.add_argument('-bdd_ordering', dest='bdd_ordering', choices=ORDERINGS, required=False, default=DEFAULT_ORDERING, help='Heuristic to order the variables of the BDD')
+    parser.add_argument('-bdd_reordering', dest='bdd_reordering', action='store_true', required=False, default=False, help='Enable dynamic reordering of the BDD variables during its construction')
+    parser.add_argument('-no_simplify', dest='no_simplify', action='store_true', required=False, default=False, help='Disable the simplification of the SAT model (unit propagation and atomic sets) before its analysis')
+    parser.add_argument('-approx_tolerance', dest='approx_tolerance', type=float, required=False, default=DEFAULT_TOLERANCE, help='Tolerance (ε) of the approximate counting of configurations when no exact engine is available')
+    parser.add_argument('-approx_confidence', dest='approx_confidence', type=float, required=False, default=DEFAULT_CONFIDENCE, help='Confidence (1 - δ) of the approximate counting of configurations')
+    parser.add_argument('-approx_timeout', dest='approx_timeout', type=float, required=False, default=DEFAULT_TIMEOUT, help='Time budget (seconds) of the approximate counting before falling back to the estimation')
+    parser.add_argument('-no_approx', dest='no_approx', action='store_true', required=False, default=False, help='Disable the approximate counting of configurations (use the estimation instead)')
+    parser.add_argument('-samples', dest='samples', type=int, required=False, default=DEFAULT_SAMPLES, help='Number of sampled configurations to estimate the probabilities and the distribution of the configurations when no exact engine is available')
+    parser.add_argument('-sampling_batch', dest='sampling_batch', type=int, required=False, default=DEFAULT_BATCH_SIZE, help='Number of configurations sampled in each batch')
+    parser.add_argument('-sampling_confidence', dest='sampling_confidence', type=float, required=False, default=DEFAULT_SAMPLING_CONFIDENCE, help='Confidence level of the intervals of the estimates from samples')
+    parser.add_argument('-sampling_timeout', dest='sampling_timeout', type=float, required=False, default=DEFAULT_SAMPLING_TIMEOUT, help='Time budget (seconds) of the sampling (the estimates use the batches sampled so far)')
+    parser.add_argument('-no_sampling', dest='no_sampling', action='store_true', required=False, default=False, help='Disable the estimates from samples (omit them instead)')
+    parser.add_argument('-save_bdd', dest='bdd_directory', type=str, required=False, help='Directory where the BDD is saved in DDDMP format (it is not saved otherwise)')
+    parser.add_argument('-bdd_cache', dest='bdd_cache', type=str, required=False, help='Directory of the persistent cache of compiled BDDs (the BDDs are not cached otherwise)')
+    parser.add_argument('-bdd_cache_size', dest='bdd_cache_size', type=float, required=False, default=DEFAULT_MAX_SIZE, help='Maximum size (MB) of the BDD cache (the least recently used BDDs are evicted)')
+    parser.add_argument('-summary', dest='summary', action='store_true', required=False, default=False, help='Only output the sizes and ratios of the lists of features and constraints (not their members)')
+    parser.add_argument('-only', dest='only', nargs='+', choices=[prop.name for prop in FMProperties], metavar='PROPERTY', required=False, help='Only compute the given metrics and analysis properties (and the properties they depend on), e.g., -only FEATURES LEAF_FEATURES CONFIGURATIONS')
+    parser.add_argument('-json_compact', dest='json_compact', action='store_true', required=False, default=False, help='Write the JSON output without indentation')
+    parser.add_argument('-json_gzip', dest='json_gzip', action='store_true', required=False, default=False, help='Compress the JSON output with gzip (.json.gz)')
+    parser.add_argument('-json_version', dest='json_version', type=int, choices=JSON_VERSIONS, required=False, default=1, help='Schema of the JSON output (2 stores the feature names and constraints once and refers to them in the lists)')
+    parser.add_argument('-fm_snapshot', dest='fm_snapshot', action='store_true', required=False, default=False, help='Store a binary snapshot of the parsed feature model next to its file (.fmb), which is loaded instead of parsing the file again while it is unchanged')
     args = parser.parse_args()
 
     metadata = {
@@ -49,4 +110,21 @@ if __name__ == '__main__':
         'domain': args.domain,
         'doi': args.doi
     }
-    main(args.path, metadata, light_fm=args.light_fm)
+    bdd_budget = None
+    if args.bdd_timeout is not None or args.bdd_max_nodes is not None or args.bdd_max_memory is not None:
+        bdd_budget = BDDBudget(args.bdd_timeout, args.bdd_max_nodes, args.bdd_max_memory)
+    approx_counting = None
+    if not args.no_approx:
+        approx_counting = ApproxCounting(args.approx_tolerance, args.approx_confidence, args.approx_timeout)
+    sampling = None
+    if not args.no_sampling:
+        sampling = Sampling(args.samples, args.sampling_batch, args.sampling_confidence, args.sampling_timeout)
+    bdd_cache = None
+    if args.bdd_cache is not None:
+        bdd_cache = BDDCache(args.bdd_cache, args.bdd_cache_size)
+    main(args.path, metadata, light_fm=args.light_fm, bdd_budget=bdd_budget, 
+         bdd_ordering=args.bdd_ordering, bdd_reordering=args.bdd_reordering, simplify=not args.no_simplify,
+         approx_counting=approx_counting, sampling=sampling, bdd_directory=args.bdd_directory,
+         bdd_cache=bdd_cache, summary=args.summary,
+         select=None if args.only is None else [FMProperties[name] for name in args.only],
+         json_compact=args.json_compact, json_gzip=args.json_gzip, json_version=args.json_version, fm_snapshot=args.fm_snapshot)
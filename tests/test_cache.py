@@ -0,0 +1,112 @@
+"""
+Persistent cache of compiled BDDs: reuse of the entries, canonical keys, integrity checks of
+the entries on load and eviction of the least recently used entries.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+
+import pytest
+
+from flamapy.core.models.ast import AST, ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import Attribute, Constraint, Feature, FeatureModel, Relation
+
+from fmfactlabel import bdd_utils
+from fmfactlabel.bdd_utils import BDDCounter, build_bdd
+from fmfactlabel.cache_utils import ENTRY_SUFFIX, MAGIC, BDDCache, model_hash
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def car_model(abstract: bool = False, constraint: bool = True) -> FeatureModel:
+    root = Feature('Car', [], is_abstract=abstract)
+    engine, gps, radio = Feature('Engine', []), Feature('GPS', []), Feature('Radio', [])
+    diesel, electric = Feature('Diesel', []), Feature('Electric', [])
+    root.add_relation(Relation(root, [engine], 1, 1))
+    root.add_relation(Relation(root, [gps], 0, 1))
+    root.add_relation(Relation(root, [radio], 0, 1))
+    engine.add_relation(Relation(engine, [diesel, electric], 1, 1))
+    ctcs = [Constraint('C0', AST(Node(ASTOperation.IMPLIES, Node('GPS'), Node('Radio'))))] if constraint else []
+    return FeatureModel(root, ctcs)
+
+
+def entries(cache: BDDCache) -> list:
+    return sorted(cache.directory.glob(f'*{ENTRY_SUFFIX}'))
+
+
+def test_cached_bdd_is_reused(tmp_path, monkeypatch):
+    cache = BDDCache(str(tmp_path))
+    expected = BDDCounter(build_bdd(car_model(), cache=cache)).configurations_number()
+    assert expected == 6
+    assert len(entries(cache)) == 1
+    monkeypatch.setattr(bdd_utils, '_compile_bdd', lambda *args, **kwargs: pytest.fail('the BDD was compiled'))
+    assert BDDCounter(build_bdd(car_model(), cache=cache)).configurations_number() == expected
+
+
+def test_model_hash():
+    key = model_hash(car_model(), 'force', False)
+    # Abstract features and attributes do not change the BDD
+    attributed = car_model(abstract=True)
+    attributed.root.add_attribute(Attribute('price', default_value=10))
+    assert model_hash(attributed, 'force', False) == key
+    assert model_hash(car_model(constraint=False), 'force', False) != key
+    assert model_hash(car_model(), 'dfs', False) != key
+    assert model_hash(car_model(), 'force', True) != key
+
+
+def corrupt_payload(data: bytes) -> bytes:
+    return data[:-1] + bytes([data[-1] ^ 0xFF])
+
+
+def truncated(data: bytes) -> bytes:
+    return data[:len(data) // 2]
+
+
+def unknown_format(data: bytes) -> bytes:
+    return b'X' + data[1:]
+
+
+def malformed_table(data: bytes) -> bytes:
+    """Return an entry with a valid checksum whose nodes refer to nodes after them."""
+    vars_order, table, root = json.loads(zlib.decompress(data[len(MAGIC) + 32:]))
+    table[0][1] = 2 * (len(table) + 5)
+    payload = zlib.compress(json.dumps([vars_order, table, root]).encode())
+    return MAGIC + hashlib.sha256(payload).digest() + payload
+
+
+@pytest.mark.parametrize('damage', [corrupt_payload, truncated, unknown_format, malformed_table])
+def test_damaged_entry_is_compiled_again(tmp_path, damage):
+    cache = BDDCache(str(tmp_path))
+    build_bdd(car_model(), cache=cache)
+    [path] = entries(cache)
+    path.write_bytes(damage(path.read_bytes()))
+    assert cache.get(path.name[:-len(ENTRY_SUFFIX)]) is None
+    assert not path.exists()  # The damaged entry is removed
+    assert BDDCounter(build_bdd(car_model(), cache=cache)).configurations_number() == 6
+    assert cache.get(path.name[:-len(ENTRY_SUFFIX)]) is not None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = BDDCache(str(tmp_path), max_size=None)
+    build_bdd(car_model(), cache=cache)
+    [path] = entries(cache)
+    entry = cache.get(path.name[:-len(ENTRY_SUFFIX)])
+    for i, key in enumerate('abc'):
+        cache.put(key, *entry)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    path.unlink()
+    assert cache.get('a') is not None  # Now the most recently used
+    # Room for three entries: the least recently used one ('b') is evicted
+    cache.max_size = 3.5 * cache._path('a').stat().st_size / 2**20
+    cache.put('d', *entry)
+    assert ['a' in cache, 'b' in cache, 'c' in cache, 'd' in cache] == [True, False, True, True]
+    cache.clear()
+    assert entries(cache) == []
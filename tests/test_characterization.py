@@ -0,0 +1,168 @@
+"""
+Characterization of a subset of the properties (`select`): only the selected properties and
+their dependencies are computed, with the same measures as the whole characterization.
+Summary mode: the measures of lists keep their sizes and ratios, without their members.
+"""
+
+import json
+import logging
+
+import pytest
+
+from flamapy.core.exceptions import FlamaException
+
+from fmfactlabel import FMCharacterization, FMProperties, FMPropertyMeasure
+from fmfactlabel.fm_metrics import METRICS
+from fmfactlabel.fm_registry import FMPropertyRegistry
+from fmfactlabel.fm_utils import read_fm_file
+
+
+UVL = """features
+    Car {abstract}
+        mandatory
+            Engine
+                alternative
+                    Diesel
+                    Electric
+                    Hybrid
+        optional
+            GPS
+            Radio
+        or
+            Seats
+            Roof
+            Wheels
+constraints
+    GPS => Radio
+    Electric => Roof
+"""
+
+PROPERTIES = {fm_property.value.name: fm_property for fm_property in FMProperties}
+ANALYSIS_INPUTS = ('sat_model', 'tree_model', 'bdd_model', 'ddnnf_model', 'approx_count', 'sample_estimates')
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope='module')
+def model(tmp_path_factory):
+    path = tmp_path_factory.mktemp('models') / 'car.uvl'
+    path.write_text(UVL)
+    return read_fm_file(str(path))
+
+
+@pytest.fixture(scope='module')
+def full_json(model):
+    with FMCharacterization(model) as characterization:
+        return json.loads(json.dumps(characterization.to_json()))
+
+
+def measures_by_name(measures: list[dict]) -> dict[str, dict]:
+    return {measure['name']: measure for measure in measures}
+
+
+def unordered(measure: dict) -> dict:
+    """Return the measure with its list of features sorted (the engines list them in different orders)."""
+    return measure | {'value': sorted(measure['value'])} if isinstance(measure['value'], list) else measure
+
+
+def test_closure_in_topological_order():
+    assert METRICS.closure([FMProperties.LEAF_FEATURES]) == [FMProperties.FEATURES, FMProperties.LEAF_FEATURES]
+    assert METRICS.closure([FMProperties.ALTERNATIVE_GROUPS]) == [
+        FMProperties.TREE_RELATIONSHIPS, FMProperties.FEATURE_GROUPS, FMProperties.ALTERNATIVE_GROUPS]
+    assert METRICS.closure([FMProperties.CORE_FEATURES]) == []  # Not a metric
+    assert METRICS.closure() == METRICS.properties
+
+
+def test_unregistered_dependency():
+    registry = FMPropertyRegistry()
+    with pytest.raises(FlamaException):
+        registry.register(FMProperties.LEAF_FEATURES, lambda owner: None, [FMProperties.FEATURES])
+
+
+def test_registry_computes_only_the_closure():
+    computed = []
+
+    def compute(fm_property):
+        def measure(owner):
+            computed.append(fm_property)
+            return FMPropertyMeasure(fm_property.value, fm_property.name)
+        return measure
+
+    registry = FMPropertyRegistry()
+    registry.register(FMProperties.FEATURES, compute(FMProperties.FEATURES))
+    registry.register(FMProperties.LEAF_FEATURES, compute(FMProperties.LEAF_FEATURES), [FMProperties.FEATURES])
+    registry.register(FMProperties.COMPOUND_FEATURES, compute(FMProperties.COMPOUND_FEATURES), [FMProperties.FEATURES])
+    registry.register(FMProperties.TREE_RELATIONSHIPS, compute(FMProperties.TREE_RELATIONSHIPS))
+    memo = {}
+    measures = registry.measures(None, [FMProperties.LEAF_FEATURES], memo)
+    assert [measure.property for measure in measures] == [FMProperties.LEAF_FEATURES.value]
+    assert computed == [FMProperties.FEATURES, FMProperties.LEAF_FEATURES]
+    registry.measures(None, [FMProperties.COMPOUND_FEATURES], memo)  # The features are memoized
+    assert computed == [FMProperties.FEATURES, FMProperties.LEAF_FEATURES, FMProperties.COMPOUND_FEATURES]
+
+
+def test_select_metrics_without_analysis(model, full_json):
+    select = [FMProperties.LEAF_FEATURES, FMProperties.OR_GROUPS]
+    characterization = FMCharacterization(model, select=select)
+    data = json.loads(json.dumps(characterization.to_json()))
+    assert [measure['name'] for measure in data['metrics']] == [
+        FMProperties.LEAF_FEATURES.value.name, FMProperties.OR_GROUPS.value.name]
+    assert data['analysis'] == []
+    assert not any(name in characterization.analysis.__dict__ for name in ANALYSIS_INPUTS)
+    full = measures_by_name(full_json['metrics'])
+    assert all(measure == full[measure['name']] for measure in data['metrics'])
+
+
+@pytest.mark.parametrize('fm_property', [FMProperties.CORE_FEATURES, FMProperties.CONFIGURATIONS, FMProperties.HOMOGENEITY])
+def test_select_analysis(model, full_json, fm_property):
+    with FMCharacterization(model, select=[fm_property]) as characterization:
+        data = json.loads(json.dumps(characterization.to_json()))
+    assert data['metrics'] == []
+    assert [measure['name'] for measure in data['analysis']] == [fm_property.value.name]
+    assert unordered(data['analysis'][0]) == unordered(measures_by_name(full_json['analysis'])[fm_property.value.name])
+
+
+def test_select_backbone_without_compilation(model):
+    # The core features are computed with the SAT backbone, without compiling any model
+    with FMCharacterization(model, select=[FMProperties.CORE_FEATURES]) as characterization:
+        characterization.snapshot()
+        assert 'bdd_model' not in characterization.analysis.__dict__
+        assert 'ddnnf_model' not in characterization.analysis.__dict__
+
+
+def test_summary_keeps_sizes_and_ratios(model, full_json):
+    with FMCharacterization(model, summary=True) as characterization:
+        data = json.loads(json.dumps(characterization.to_json()))
+        for section in ('metrics', 'analysis'):
+            full = measures_by_name(full_json[section])
+            assert [measure['name'] for measure in data[section]] == list(full)
+            for measure in data[section]:
+                expected = full[measure['name']]
+                if expected['size'] is None:
+                    assert unordered(measure) == unordered(expected)
+                else:
+                    assert measure['value'] is None
+                    assert (measure['size'], measure['ratio']) == (expected['size'], expected['ratio'])
+                    assert sorted(characterization.get_members(PROPERTIES[measure['name']])) == sorted(expected['value'])
+
+
+def test_summary_without_materializing_the_lists(model):
+    characterization = FMCharacterization(model, summary=True, light_fact_label=True)
+    characterization.snapshot()
+    table = characterization.metrics._metrics
+    assert FMProperties.LEAF_FEATURES.value in table._lazy  # Counted, but not materialized
+    leaf_features = characterization.get_members(FMProperties.LEAF_FEATURES)
+    assert sorted(leaf_features) == ['Diesel', 'Electric', 'GPS', 'Hybrid', 'Radio', 'Roof', 'Seats', 'Wheels']
+    assert FMProperties.LEAF_FEATURES.value not in table._lazy
+
+
+def test_summary_text(model):
+    with FMCharacterization(model, summary=True) as characterization:
+        text = str(characterization)
+    assert 'Leaf features: 8' in text
+    assert 'Diesel' not in text
@@ -0,0 +1,88 @@
+"""
+Tests of the analysis of the independent components of feature models.
+"""
+
+import logging
+
+import pytest
+
+from flamapy.core.models.ast import AST, ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, Relation, Constraint
+
+from fmfactlabel import component_utils
+from fmfactlabel.bdd_utils import BDDCounter, build_bdd
+from fmfactlabel.cache_utils import BDDCache
+from fmfactlabel.component_utils import analyze_subtrees
+from fmfactlabel.tree_utils import FeatureTreeCounter
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _two_components_model() -> FeatureModel:
+    """Return a root with two optional subtrees, each one with a constraint inside it."""
+    root = Feature('R', [])
+    constraints = []
+    for name in ('A', 'B'):
+        subtree = Feature(name, [])
+        root.add_relation(Relation(root, [subtree], 0, 1))
+        for child in ('1', '2', '3'):
+            subtree.add_relation(Relation(subtree, [Feature(name + child, [])], 0, 1))
+        constraints.append(Constraint(f'C{name}', AST(Node(ASTOperation.IMPLIES, Node(name + '1'), Node(name + '2')))))
+    return FeatureModel(root, constraints)
+
+
+class _FailingExecutor():
+
+    started = 0
+
+    def __init__(self, *args, **kwargs) -> None:
+        _FailingExecutor.started += 1
+        raise OSError('no processes')
+
+
+def _assert_exact(fm: FeatureModel, subtrees) -> None:
+    counter = FeatureTreeCounter(fm, subtrees)
+    bdd_counter = BDDCounter(build_bdd(fm))
+    assert counter.configurations_number() == bdd_counter.configurations_number()
+    assert counter.product_distribution() == bdd_counter.product_distribution()
+
+
+def test_small_components_are_analyzed_in_process(monkeypatch):
+    _FailingExecutor.started = 0
+    monkeypatch.setattr(component_utils, 'ProcessPoolExecutor', _FailingExecutor)
+    fm = _two_components_model()
+    subtrees = analyze_subtrees(fm)
+    assert set(subtrees) == {'A', 'B'}
+    assert _FailingExecutor.started == 0
+    _assert_exact(fm, subtrees)
+
+
+def test_components_fall_back_to_sequential_analysis(monkeypatch):
+    _FailingExecutor.started = 0
+    monkeypatch.setattr(component_utils, 'ProcessPoolExecutor', _FailingExecutor)
+    monkeypatch.setattr(component_utils, 'PARALLEL_MIN_FEATURES', 1)
+    fm = _two_components_model()
+    subtrees = analyze_subtrees(fm)
+    assert _FailingExecutor.started == 1
+    _assert_exact(fm, subtrees)
+
+
+def test_parallel_components_are_cached_by_the_parent(monkeypatch, tmp_path):
+    monkeypatch.setattr(component_utils, 'PARALLEL_MIN_FEATURES', 1)
+    cache = BDDCache(str(tmp_path))
+    fm = _two_components_model()
+    subtrees = analyze_subtrees(fm, cache=cache)
+    _assert_exact(fm, subtrees)
+    assert len(list(tmp_path.glob('*.bdd'))) == 2
+    # The cached components are loaded in the current process instead of starting the workers
+    _FailingExecutor.started = 0
+    monkeypatch.setattr(component_utils, 'ProcessPoolExecutor', _FailingExecutor)
+    cached_subtrees = analyze_subtrees(fm, cache=cache)
+    assert _FailingExecutor.started == 0
+    assert ({name: counts.configurations for name, counts in cached_subtrees.items()} ==
+            {name: counts.configurations for name, counts in subtrees.items()})
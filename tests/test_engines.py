@@ -0,0 +1,325 @@
+"""
+Cross-check of the exact analysis engines (feature tree, components, BDD, d-DNNF and SAT)
+against the brute-force enumeration of the configurations of small generated feature models.
+
+The configurations are those of the clauses of the feature tree (`FmToPysat`), whose cardinality
+bounds are taken literally (e.g., a group [2..3] with a single child cannot be selected),
+that satisfy the constraints, evaluated directly over their trees.
+"""
+
+import itertools
+import logging
+import math
+import random
+import sys
+
+import pytest
+
+from flamapy.core.models.ast import AST, ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, Relation, Constraint
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat
+
+from fmfactlabel.bdd_utils import BDDBudget, BDDBudgetExceeded, BDDCounter, build_bdd
+from fmfactlabel.component_utils import analyze_subtrees
+from fmfactlabel.ddnnf_utils import DDNNFBudgetExceeded, compile_ddnnf
+from fmfactlabel.fm_analysis import FMAnalysis
+from fmfactlabel.sat_utils import SATBackbone, build_sat_model
+from fmfactlabel.simplification_utils import SimplifiedModel
+from fmfactlabel.tree_utils import FeatureTreeCounter
+
+
+MAX_FEATURES = 11  # Brute force over 2^11 assignments
+SEEDS = range(40)
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class BruteForce():
+    """Configurations of the feature model enumerated over all the assignments of its features."""
+
+    def __init__(self, fm: FeatureModel) -> None:
+        sat_model = FmToPysat(FeatureModel(fm.root, [])).transform()  # the clauses of the feature tree
+        names = list(sat_model.variables)
+        clauses = sat_model.get_all_clauses().clauses
+        self.names = names
+        self.configurations = []
+        for values in itertools.product((False, True), repeat=len(names)):
+            assignment = {sat_model.variables[name]: value for name, value in zip(names, values)}
+            selected = {name for name, value in zip(names, values) if value}
+            if (all(any(assignment[abs(literal)] == (literal > 0) for literal in clause) for clause in clauses) and
+                    all(_evaluate(constraint.ast.root, selected) for constraint in fm.get_constraints())):
+                self.configurations.append(selected)
+
+    def configurations_number(self) -> int:
+        return len(self.configurations)
+
+    def feature_probabilities(self) -> dict[str, float]:
+        total = len(self.configurations)
+        return {name: sum(name in configuration for configuration in self.configurations) / total if total else 0.0
+                for name in self.names}
+
+    def product_distribution(self) -> list[int]:
+        distribution = [0] * (len(self.names) + 1)
+        for configuration in self.configurations:
+            distribution[len(configuration)] += 1
+        return distribution
+
+
+def generate_model(seed: int, constraints: str = 'any') -> FeatureModel:
+    """Return a random feature model with all kinds of relations, including group cardinalities
+    whose bounds exceed their number of children. The constraints are either between any
+    features (`any`), inside a subtree (`subtree`, so that it is an independent component),
+    or none (`none`)."""
+    rng = random.Random(seed)
+    root = Feature('F0', [])
+    features = [root]
+    pending = [root]
+    while pending and len(features) < MAX_FEATURES:
+        parent = pending.pop(rng.randrange(len(pending)))
+        for _ in range(rng.randint(1, 2)):
+            size = min(rng.randint(1, 3), MAX_FEATURES - len(features))
+            if size == 0:
+                break
+            children = [Feature(f'F{len(features) + i}', []) for i in range(size)]
+            features.extend(children)
+            pending.extend(children)
+            kind = rng.choice(['mandatory', 'optional', 'or', 'alternative', 'cardinality'])
+            if kind == 'mandatory':
+                relations = [Relation(parent, [child], 1, 1) for child in children]
+            elif kind == 'optional':
+                relations = [Relation(parent, [child], 0, 1) for child in children]
+            elif kind == 'or':
+                relations = [Relation(parent, children, 1, len(children))]
+            elif kind == 'alternative':
+                relations = [Relation(parent, children, 1, 1)]
+            else:
+                card_min = rng.randint(0, 3)
+                relations = [Relation(parent, children, card_min, rng.randint(card_min, 4))]
+            for relation in relations:
+                parent.add_relation(relation)
+    ctcs = []
+    if constraints != 'none':
+        for i in range(rng.randint(1, 3)):
+            if constraints == 'subtree' and len(features) > 1:
+                # An implication usually holds when none of its features is selected
+                names = [feature.name for feature in _subtree(rng.choice(features[1:]))]
+                ast = Node(ASTOperation.IMPLIES, _random_constraint(rng, names, 1), _random_constraint(rng, names, 1))
+            else:
+                ast = _random_constraint(rng, [feature.name for feature in features], 2)
+            ctcs.append(Constraint(f'C{i}', AST(ast)))
+    return FeatureModel(root, ctcs)
+
+
+def _subtree(root: Feature) -> list[Feature]:
+    features = []
+    stack = [root]
+    while stack:
+        feature = stack.pop()
+        features.append(feature)
+        stack.extend(feature.get_children())
+    return features
+
+
+def _evaluate(node: Node, selected: set[str]) -> bool:
+    if node.is_term():
+        return node.data in selected
+    left = _evaluate(node.left, selected)
+    if node.data == ASTOperation.NOT:
+        return not left
+    right = _evaluate(node.right, selected)
+    return {ASTOperation.AND: left and right,
+            ASTOperation.OR: left or right,
+            ASTOperation.IMPLIES: not left or right,
+            ASTOperation.EQUIVALENCE: left == right,
+            ASTOperation.XOR: left != right}[node.data]
+
+
+def _random_constraint(rng: random.Random, names: list[str], depth: int) -> Node:
+    if depth == 0 or rng.random() < 0.3:
+        return Node(rng.choice(names))
+    if rng.random() < 0.2:
+        return Node(ASTOperation.NOT, _random_constraint(rng, names, depth - 1))
+    operation = rng.choice([ASTOperation.AND, ASTOperation.OR, ASTOperation.IMPLIES,
+                           ASTOperation.EQUIVALENCE, ASTOperation.XOR])
+    return Node(operation, _random_constraint(rng, names, depth - 1), _random_constraint(rng, names, depth - 1))
+
+
+def void_models() -> list[FeatureModel]:
+    """Return void feature models: by a constraint, and by a group cardinality."""
+    root = Feature('R', [])
+    child = Feature('A', [])
+    root.add_relation(Relation(root, [child], 1, 1))
+    contradiction = FeatureModel(root, [Constraint('C0', AST(Node(ASTOperation.IMPLIES, Node('A'), Node(ASTOperation.NOT, Node('A')))))])
+    root = Feature('R', [])
+    child = Feature('A', [])
+    root.add_relation(Relation(root, [child], 2, 3))
+    cardinality = FeatureModel(root, [])
+    return [contradiction, cardinality]
+
+
+def assert_same_results(expected: BruteForce, configurations: int, fip: dict[str, float], distribution: list[int]) -> None:
+    assert configurations == expected.configurations_number()
+    expected_fip = expected.feature_probabilities()
+    assert set(fip) == set(expected_fip)
+    for name, probability in expected_fip.items():
+        assert fip[name] == pytest.approx(probability)
+    assert _trimmed(distribution) == _trimmed(expected.product_distribution())
+
+
+def _trimmed(distribution: list[int]) -> list[int]:
+    distribution = list(distribution)
+    while distribution and distribution[-1] == 0:
+        distribution.pop()
+    return distribution
+
+
+def assert_bdd(fm: FeatureModel, expected: BruteForce) -> None:
+    counter = BDDCounter(build_bdd(fm))
+    assert_same_results(expected, counter.configurations_number(), counter.feature_probabilities(),
+                        counter.product_distribution())
+
+
+def assert_ddnnf(fm: FeatureModel, expected: BruteForce) -> None:
+    sat_model = build_sat_model(fm)
+    for simplified in (None, SimplifiedModel(sat_model)):
+        ddnnf = compile_ddnnf(sat_model, simplified=simplified)
+        configurations = ddnnf.configurations_number()
+        counts = ddnnf.variable_counts()
+        fip = {name: counts[var] / configurations if configurations else 0.0 for name, var in sat_model.variables.items()}
+        assert_same_results(expected, configurations, fip, ddnnf.product_distribution())
+
+
+def assert_sat(fm: FeatureModel, expected: BruteForce) -> None:
+    sat_model = build_sat_model(fm)
+    fip = expected.feature_probabilities()
+    for simplified in (None, SimplifiedModel(sat_model)):
+        backbone = SATBackbone(sat_model, fm, simplified)
+        assert backbone.valid == (expected.configurations_number() > 0)
+        assert set(backbone.core_features) == {name for name, probability in fip.items() if probability >= 1.0}
+        assert set(backbone.dead_features) == {name for name, probability in fip.items() if probability <= 0.0}
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_feature_tree(seed):
+    fm = generate_model(seed, constraints='none')
+    expected = BruteForce(fm)
+    counter = FeatureTreeCounter(fm)
+    assert_same_results(expected, counter.configurations_number(), counter.feature_probabilities(),
+                        counter.product_distribution())
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_components(seed):
+    fm = generate_model(seed, constraints='subtree')
+    subtrees = analyze_subtrees(fm)
+    if subtrees is None:
+        pytest.skip('no independent components')
+    expected = BruteForce(fm)
+    counter = FeatureTreeCounter(fm, subtrees)
+    assert_same_results(expected, counter.configurations_number(), counter.feature_probabilities(),
+                        counter.product_distribution())
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_bdd(seed):
+    fm = generate_model(seed)
+    assert_bdd(fm, BruteForce(fm))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_ddnnf(seed):
+    fm = generate_model(seed)
+    assert_ddnnf(fm, BruteForce(fm))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_sat(seed):
+    fm = generate_model(seed)
+    assert_sat(fm, BruteForce(fm))
+
+
+@pytest.mark.parametrize('fm', void_models(), ids=['constraint', 'cardinality'])
+def test_void_models(fm):
+    expected = BruteForce(fm)
+    assert expected.configurations_number() == 0
+    assert_bdd(fm, expected)
+    assert_ddnnf(fm, expected)
+    assert_sat(fm, expected)
+    if not fm.get_constraints():
+        counter = FeatureTreeCounter(fm)
+        assert_same_results(expected, counter.configurations_number(), counter.feature_probabilities(),
+                            counter.product_distribution())
+
+
+@pytest.mark.parametrize('fm', void_models(), ids=['constraint', 'cardinality'])
+def test_void_models_label(fm):
+    analysis = FMAnalysis(fm)
+    measures = {measure.property.name: measure.value for measure in analysis.get_analysis()}
+    assert measures['Satisfiable (valid)'] == 'No'
+    assert measures['Configurations'] == '0'
+
+
+@pytest.mark.parametrize('operation', [ASTOperation.EQUIVALENCE, ASTOperation.XOR])
+def test_equivalence_and_xor(operation):
+    root = Feature('R', [])
+    for name in ('A', 'B'):
+        root.add_relation(Relation(root, [Feature(name, [])], 0, 1))
+    fm = FeatureModel(root, [Constraint('C0', AST(Node(operation, Node('A'), Node('B'))))])
+    expected = BruteForce(fm)
+    assert expected.configurations_number() == 2
+    assert_bdd(fm, expected)
+    assert_ddnnf(fm, expected)
+    assert_sat(fm, expected)
+
+
+def _chain_model(n: int) -> PySATModel:
+    """Return the formula F1 => F2 => ... => Fn, with n + 1 models."""
+    sat_model = PySATModel()
+    for var in range(1, n + 1):
+        sat_model.variables[f'F{var}'] = var
+        sat_model.features[var] = f'F{var}'
+    for var in range(1, n):
+        sat_model.add_clause([-var, var + 1])
+    return sat_model
+
+
+def test_ddnnf_without_recursion(monkeypatch):
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(200)
+    try:
+        with monkeypatch.context() as patch:  # the process-wide limit must not be changed
+            patch.setattr(sys, 'setrecursionlimit', lambda limit: pytest.fail('the recursion limit was changed'))
+            ddnnf = compile_ddnnf(_chain_model(500))
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert ddnnf.configurations_number() == 501
+
+
+def test_ddnnf_node_budget():
+    with pytest.raises(DDNNFBudgetExceeded):
+        compile_ddnnf(_chain_model(500), max_nodes=100)
+
+
+def _group_model(n: int, card_min: int, card_max: int) -> FeatureModel:
+    """Return a root with a group cardinality [card_min..card_max] of n children."""
+    root = Feature('R', [])
+    root.add_relation(Relation(root, [Feature(f'F{i}', []) for i in range(n)], card_min, card_max))
+    return FeatureModel(root, [])
+
+
+def test_bdd_large_group_cardinality():
+    # The combinations of 60 children are far too many to be enumerated
+    counter = BDDCounter(build_bdd(_group_model(60, 5, 30)))
+    assert counter.configurations_number() == sum(math.comb(60, k) for k in range(5, 31))
+    assert _trimmed(counter.product_distribution()) == [0] * 6 + [math.comb(60, k) for k in range(5, 31)]
+
+
+def test_bdd_node_budget_inside_group_cardinality():
+    with pytest.raises(BDDBudgetExceeded):
+        build_bdd(_group_model(60, 5, 30), BDDBudget(max_nodes=200))
@@ -0,0 +1,111 @@
+"""
+Binary snapshots of parsed feature models: round-trip of the feature model and invalidation
+of the snapshot when the source file or the readers that produced it change.
+"""
+
+import logging
+from importlib import metadata
+
+import pytest
+
+from flamapy.metamodels.fm_metamodel.models import FeatureModel
+
+from fmfactlabel import fm_binary_utils, fm_utils
+from fmfactlabel.fm_binary_utils import read_fm_snapshot, snapshot_path, source_key, write_fm_snapshot
+from fmfactlabel.fm_utils import read_fm_file
+
+
+UVL = """features
+    Car {abstract}
+        mandatory
+            Engine {power 150, fuel 'diesel'}
+        optional
+            GPS
+            Radio
+        alternative
+            Manual
+            Automatic
+        [1..2]
+            Seats
+            Roof
+            Wheels
+constraints
+    GPS => Radio
+    Manual <=> !Automatic | Roof
+"""
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def uvl_file(tmp_path):
+    path = tmp_path / 'car.uvl'
+    path.write_text(UVL)
+    return str(path)
+
+
+def describe(fm: FeatureModel) -> tuple[list, list]:
+    """Return the features (in pre-order, with their attributes and relations) and constraints."""
+    features = []
+    stack = [fm.root]
+    while stack:
+        feature = stack.pop()
+        features.append((feature.name, feature.is_abstract, feature.feature_type,
+                         feature.feature_cardinality.min, feature.feature_cardinality.max,
+                         [(attribute.name, attribute.default_value) for attribute in feature.get_attributes()],
+                         [(relation.card_min, relation.card_max, [child.name for child in relation.children])
+                          for relation in feature.get_relations()]))
+        stack.extend(reversed([child for relation in feature.get_relations() for child in relation.children]))
+    constraints = [(constraint.name, constraint.ast.pretty_str()) for constraint in fm.get_constraints()]
+    return features, constraints
+
+
+def test_snapshot_round_trip(uvl_file, monkeypatch):
+    parsed = read_fm_file(uvl_file, snapshot=True)
+    assert snapshot_path(uvl_file).exists()
+    snapshot = read_fm_snapshot(uvl_file)
+    assert snapshot is not None
+    assert describe(snapshot) == describe(parsed)
+    # The snapshot is loaded instead of parsing the file
+    monkeypatch.setattr(fm_utils, 'read_uvl_file', lambda filename: pytest.fail('the file was parsed'))
+    assert describe(read_fm_file(uvl_file)) == describe(parsed)
+
+
+def test_snapshot_invalidated_by_the_source(uvl_file):
+    write_fm_snapshot(read_fm_file(uvl_file), uvl_file)
+    with open(uvl_file, 'a') as source:
+        source.write('    Roof => Seats\n')
+    assert read_fm_snapshot(uvl_file) is None
+    assert len(read_fm_file(uvl_file).get_constraints()) == 3
+
+
+@pytest.mark.parametrize('distribution', fm_binary_utils.READER_DISTRIBUTIONS)
+def test_snapshot_invalidated_by_flamapy(uvl_file, monkeypatch, distribution):
+    installed = metadata.version
+    write_fm_snapshot(read_fm_file(uvl_file), uvl_file)
+    assert read_fm_snapshot(uvl_file) is not None
+    monkeypatch.setattr(metadata, 'version', lambda name: '0.0.0' if name == distribution else installed(name))
+    assert read_fm_snapshot(uvl_file) is None
+
+
+def test_snapshot_invalidated_by_the_reader(uvl_file, monkeypatch):
+    write_fm_snapshot(read_fm_file(uvl_file), uvl_file)
+    key = source_key(uvl_file)
+    monkeypatch.setattr(fm_binary_utils, 'READER_VERSION', fm_binary_utils.READER_VERSION + 1)
+    assert source_key(uvl_file) != key
+    assert read_fm_snapshot(uvl_file) is None
+
+
+def test_corrupt_snapshot(uvl_file):
+    write_fm_snapshot(read_fm_file(uvl_file), uvl_file)
+    path = snapshot_path(uvl_file)
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert read_fm_snapshot(uvl_file) is None
+    assert read_fm_file(uvl_file) is not None
@@ -0,0 +1,118 @@
+"""
+JSON of the characterizations: streamed output (indented, compact and gzip) and round-trip of
+the schema v2 (dictionary-encoded lists of feature names and constraints) to the schema v1.
+"""
+
+import gzip
+import json
+import logging
+
+import pytest
+
+from flamapy.core.exceptions import FlamaException
+
+from fmfactlabel import FMCharacterization, FMProperties, FMSnapshot
+from fmfactlabel.fm_utils import read_fm_file
+from fmfactlabel.json_utils import decode_bitset, decode_json, encode_bitset, encode_json
+
+
+UVL = """features
+    Car {abstract}
+        mandatory
+            Engine
+                alternative
+                    Diesel
+                    Electric
+                    Hybrid
+        optional
+            GPS
+            Radio
+            Bluetooth
+        or
+            Seats
+            Roof
+            Wheels
+constraints
+    GPS => Radio
+    Electric => !Diesel | Roof
+    Bluetooth <=> Radio
+"""
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope='module')
+def characterization(tmp_path_factory):
+    path = tmp_path_factory.mktemp('models') / 'car.uvl'
+    path.write_text(UVL)
+    with FMCharacterization(read_fm_file(str(path))) as characterization:
+        characterization.snapshot()
+        yield characterization
+
+
+def normalized(data: dict) -> dict:
+    """Return the JSON as it is written and read (e.g., tuples as lists)."""
+    return json.loads(json.dumps(data))
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_streamed_json(characterization, version):
+    data = characterization.to_json(version)
+    assert characterization.to_json_str(version=version) == json.dumps(data, indent=4)
+    assert characterization.to_json_str(compact=True, version=version) == json.dumps(data, separators=(',', ':'))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_gzip_json_file(characterization, tmp_path, compact):
+    expected = characterization.to_json_str(compact=compact, version=2)
+    characterization.to_json_file(str(tmp_path / 'label.json.gz'), compact=compact, version=2)
+    with gzip.open(tmp_path / 'label.json.gz', 'rt', encoding='utf-8') as compressed:
+        assert compressed.read() == expected
+    characterization.to_json_file(str(tmp_path / 'label.json'), compact=compact, version=2)
+    assert (tmp_path / 'label.json').read_text(encoding='utf-8') == expected
+    characterization.to_json_file(str(tmp_path / 'label.bin'), compact=compact, compress=True, version=2)
+    assert gzip.decompress((tmp_path / 'label.bin').read_bytes()).decode('utf-8') == expected
+
+
+def test_empty_sections_json():
+    snapshot = FMSnapshot((), (), ())
+    for compact in (False, True):
+        assert json.loads(snapshot.to_json_str(compact)) == {'metadata': [], 'metrics': [], 'analysis': []}
+    assert snapshot.to_json_str() == json.dumps(snapshot.to_json(), indent=4)
+
+
+def test_v2_round_trip(characterization):
+    v1 = normalized(characterization.to_json())
+    v2 = normalized(characterization.to_json(2))
+    assert v2['version'] == 2
+    assert decode_json(v2) == v1
+    assert encode_json(v1) == v2
+    assert decode_json(v1) == v1
+
+
+def test_v2_stores_the_names_once(characterization):
+    v2 = normalized(characterization.to_json(2))
+    features = next(measure for measure in v2['metrics'] if measure['name'] == FMProperties.FEATURES.value.name)
+    assert features['value'] == {'table': 'features', 'bitset': encode_bitset(list(range(len(v2['features']))))}
+    assert len(characterization.to_json_str(version=2)) < len(characterization.to_json_str())
+
+
+def test_v2_text(characterization):
+    v1 = normalized(characterization.to_json())
+    v2 = normalized(characterization.to_json(2))
+    assert FMCharacterization.json_to_text(v2) == FMCharacterization.json_to_text(v1)
+
+
+@pytest.mark.parametrize('indexes', [[], [0], [7], [8], [0, 1, 2, 3, 4, 5, 6, 7, 8], [3, 64, 1000]])
+def test_bitset_round_trip(indexes):
+    assert decode_bitset(encode_bitset(indexes)) == indexes
+
+
+def test_unsupported_version():
+    with pytest.raises(FlamaException):
+        decode_json({'version': 3, 'metadata': [], 'metrics': [], 'analysis': []})
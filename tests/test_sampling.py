@@ -0,0 +1,118 @@
+"""
+Tests of the approximate counting and the sampling of configurations (light fact label).
+"""
+
+import itertools
+import logging
+
+import pytest
+
+from flamapy.core.models.ast import AST, ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, Relation, Constraint
+from flamapy.metamodels.pysat_metamodel.models import PySATModel
+
+from fmfactlabel import FMProperties
+from fmfactlabel.approxmc_utils import ApproxCounting
+from fmfactlabel.fm_analysis import FMAnalysis
+from fmfactlabel.sampling_utils import ConfigurationSampler, Sampling, SamplingTimeout
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _sat_model(n_vars: int, clauses: list[list[int]]) -> PySATModel:
+    sat_model = PySATModel()
+    for var in range(1, n_vars + 1):
+        sat_model.variables[f'F{var}'] = var
+        sat_model.features[var] = f'F{var}'
+    for clause in clauses:
+        sat_model.add_clause(clause)
+    return sat_model
+
+
+def _optional_features_model(n: int) -> FeatureModel:
+    """Return a root with n optional features, at least one of them selected (a constraint):
+    2^n - 1 configurations in a single component, too many to be enumerated."""
+    root = Feature('R', [])
+    for i in range(1, n + 1):
+        root.add_relation(Relation(root, [Feature(f'F{i}', [])], 0, 1))
+    ast = Node('F1')
+    for i in range(2, n + 1):
+        ast = Node(ASTOperation.OR, ast, Node(f'F{i}'))
+    return FeatureModel(root, [Constraint('C0', AST(ast))])
+
+
+def _light_analysis(fm: FeatureModel) -> dict[str, object]:
+    analysis = FMAnalysis(fm, light_fact_label=True,
+                          approx_counting=ApproxCounting(timeout=30), sampling=Sampling(samples=200, timeout=30))
+    return {measure.property.name: measure.value for measure in analysis.get_analysis()}
+
+
+def test_sampled_pure_optional_features_are_omitted():
+    measures = _light_analysis(_optional_features_model(12))
+    assert 'sampling' in measures[FMProperties.ANALYSIS_ENGINE.value.name]
+    assert FMProperties.HOMOGENEITY.value.name in measures
+    assert FMProperties.PURE_OPTIONAL_FEATURES.value.name not in measures
+
+
+@pytest.mark.parametrize('operation', [ASTOperation.EQUIVALENCE, ASTOperation.IMPLIES])
+def test_enumerated_configurations_are_exact(operation):
+    root = Feature('R', [])
+    for name in ('A', 'B', 'C'):
+        root.add_relation(Relation(root, [Feature(name, [])], 0, 1))
+    fm = FeatureModel(root, [Constraint('C0', AST(Node(operation, Node('A'), Node('B'))))])
+    measures = _light_analysis(fm)
+    assert 'sampling' not in measures[FMProperties.ANALYSIS_ENGINE.value.name]
+    exact = {measure.property.name: measure.value for measure in FMAnalysis(fm).get_analysis()}
+    for name, value in measures.items():
+        if name != FMProperties.ANALYSIS_ENGINE.value.name:
+            assert exact[name] == value, name
+
+
+def test_sampler_with_huge_count():
+    # A single component with 2^12 - 1 configurations, which is too large to be enumerated
+    sat_model = _sat_model(12, [list(range(1, 13))])
+    sampler = ConfigurationSampler(sat_model, count=10 ** 400)
+    assert sampler.large_vars
+    assert sampler.hashes == len(sampler.large_vars)
+    configurations = next(sampler.batches(10))
+    assert len(configurations) >= 10
+    assert all(any(configuration) for configuration in configurations)
+
+
+def _unique_features(n_vars: int, clauses: list[list[int]]) -> list[str]:
+    """Features selected in exactly one configuration, by brute force."""
+    counts = [0] * (n_vars + 1)
+    for values in itertools.product((False, True), repeat=n_vars):
+        if all(any(values[abs(lit) - 1] == (lit > 0) for lit in clause) for clause in clauses):
+            for var, value in enumerate(values, 1):
+                counts[var] += value
+    return [f'F{var}' for var in range(1, n_vars + 1) if counts[var] == 1]
+
+
+@pytest.mark.parametrize('n_vars, clauses', [
+    (3, [[1], [-2], [3]]),  # a single configuration: its selected features are unique
+    (10, [[-1, 2], [-1, 3], [-1, -4], [4, 5, 6], [-2, 1, 4]]),
+    (10, [[-1, -2], [-3, 1], [-3, 2], [4, 5, 6, 7, 8, 9, 10]]),
+])
+def test_unique_features(n_vars, clauses):
+    sat_model = _sat_model(n_vars, clauses)
+    sampler = ConfigurationSampler(sat_model)
+    next(sampler.batches(10))
+    assert sorted(sampler.unique_features(sat_model, list(sat_model.variables))) == sorted(_unique_features(n_vars, clauses))
+
+
+def test_unique_features_timeout():
+    sat_model = _sat_model(12, [list(range(1, 13))])
+    sampler = ConfigurationSampler(sat_model)
+
+    def timeout() -> None:
+        raise SamplingTimeout('timeout')
+
+    sampler.check_timeout = timeout
+    with pytest.raises(SamplingTimeout):
+        sampler.unique_features(sat_model, list(sat_model.variables))
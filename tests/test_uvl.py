@@ -0,0 +1,162 @@
+"""
+Fast UVL reader (`UVLFastReader`): it must build the same feature model as the `UVLReader` of
+flamapy, and `read_uvl_file` must fall back to `UVLReader` for what it does not support.
+"""
+
+import logging
+
+import pytest
+
+from flamapy.metamodels.fm_metamodel.models import FeatureModel
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+from fmfactlabel import uvl_utils
+from fmfactlabel.uvl_utils import UnsupportedUVL, UVLFastReader, read_uvl_file
+
+
+MODELS = {
+    'groups': """features
+    Car {abstract}
+        mandatory
+            Engine
+                alternative
+                    Diesel
+                    Electric
+        optional
+            GPS
+            "Rear camera"
+        or
+            Seats
+            Roof
+        [1..*]
+            Wheels
+            Spare
+        [2]
+            Red
+            Blue
+            Green
+constraints
+    GPS => "Rear camera"
+    Electric => !Diesel | Roof & Seats
+    (Red <=> Blue) => !(Green | Red)
+""",
+    'attributes': """features
+    Server {abstract true, cost 1.5, tags ['a', 'b'], limits {cpu 4, ram 16}}
+        optional
+            Cache {size 128}
+            Log {level 'debug', enabled false}
+        alternative
+            Linux {price 0}
+            Windows {price 100}
+
+constraints
+    Cache.size > 64 => Log
+    Linux.price + Windows.price < 200
+    sum(price) <= 100
+""",
+    'types': """features
+    Shop
+        mandatory
+            Integer Items
+            String Name
+            Real Discount
+        optional
+            Boolean Express
+            Premium cardinality [0..3]
+constraints
+    Items * 2 >= 10
+    Discount / 2 == 0.5
+    len(Name) > 3
+""",
+    'comments': """// A model with comments
+features
+    Root // the root
+        optional /* greedy
+        block comment */
+            A
+            B
+
+constraints
+    A => B // implication
+""",
+}
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def describe(fm: FeatureModel) -> tuple[list, list]:
+    """Return the features (in pre-order, with their attributes and relations) and constraints."""
+    features = []
+    stack = [fm.root]
+    while stack:
+        feature = stack.pop()
+        features.append((feature.name, feature.is_abstract, feature.feature_type,
+                         feature.feature_cardinality.min, feature.feature_cardinality.max,
+                         [(attribute.name, attribute.default_value) for attribute in feature.get_attributes()],
+                         [(relation.card_min, relation.card_max, [child.name for child in relation.children])
+                          for relation in feature.get_relations()],
+                         [constraint.ast.pretty_str() for constraint in feature.constraints_attributes]))
+        stack.extend(reversed([child for relation in feature.get_relations() for child in relation.children]))
+    constraints = [(constraint.name, constraint.ast.pretty_str()) for constraint in fm.get_constraints()]
+    return features, constraints
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_same_model_as_uvl_reader(tmp_path, name):
+    path = tmp_path / f'{name}.uvl'
+    path.write_text(MODELS[name])
+    assert describe(UVLFastReader(str(path)).transform()) == describe(UVLReader(str(path)).transform())
+
+
+def test_deep_model_without_recursion(tmp_path):
+    depth = 1500  # Beyond the recursion limit
+    lines = ['features']
+    for i in range(depth):
+        lines.append('\t' * (2 * i + 1) + f'F{i}')
+        lines.append('\t' * (2 * i + 2) + 'optional')
+    lines.append('\t' * (2 * depth + 1) + 'Leaf')
+    path = tmp_path / 'deep.uvl'
+    path.write_text('\n'.join(lines) + '\n')
+    feature = UVLFastReader(str(path)).transform().root
+    names = [feature.name]
+    while feature.get_relations():  # `get_features` of flamapy is recursive
+        feature = feature.get_relations()[0].children[0]
+        names.append(feature.name)
+    assert names == [f'F{i}' for i in range(depth)] + ['Leaf']
+
+
+@pytest.mark.parametrize('uvl', [
+    'imports\n    sub.Model as sub\nfeatures\n    Root\n',
+    'features\n    Root\n        optional\n            A $\n',
+])
+def test_unsupported_constructs(tmp_path, uvl):
+    path = tmp_path / 'unsupported.uvl'
+    path.write_text(uvl)
+    with pytest.raises(UnsupportedUVL):
+        UVLFastReader(str(path)).transform()
+
+
+def test_fallback_to_uvl_reader(tmp_path, monkeypatch):
+    path = tmp_path / 'model.uvl'
+    path.write_text(MODELS['groups'])
+    calls = []
+
+    class Reader(UVLReader):
+        def transform(self):
+            calls.append(self)
+            return super().transform()
+
+    def unsupported(self):
+        raise UnsupportedUVL('test')
+
+    monkeypatch.setattr(uvl_utils, 'UVLReader', Reader)
+    assert describe(read_uvl_file(str(path))) == describe(UVLFastReader(str(path)).transform())
+    assert not calls
+    monkeypatch.setattr(UVLFastReader, 'transform', unsupported)
+    assert describe(read_uvl_file(str(path))) == describe(UVLReader(str(path)).transform())
+    assert len(calls) == 1
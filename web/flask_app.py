@@ -1,5 +1,4 @@
 import os
-import sys
 import json
 import logging
 import pathlib
@@ -10,12 +9,15 @@ import time
 import flask
 
 
-from fmfactlabel import FMCharacterization
+from fmfactlabel import FMCharacterization, BDDBudget, BDDCache
 from fmfactlabel.fm_utils import read_fm_file
+from fmfactlabel.json_utils import decode_json
 
 
 STATIC_DIR = '../web'
 TIMEOUT_TEMPFILES = 3600  # 1 hour
+BDD_BUDGET = BDDBudget(timeout=120, max_memory=4096)  # 2 minutes and 4 GB to build the BDD
+BDD_CACHE = BDDCache(os.path.join(tempfile.gettempdir(), 'fmfactlabel_bdd_cache'))  # BDDs of the models already uploaded
 
 
 app = flask.Flask(__name__,
@@ -62,7 +64,7 @@ def index():
             year = flask.request.form['inputYear']
 
         try:
-            characterization = FMCharacterization.from_path(filename, light_fact_label)
+            characterization = FMCharacterization.from_path(filename, light_fact_label, bdd_budget=BDD_BUDGET, bdd_cache=BDD_CACHE)
         except Exception as e:
             data['file_error'] = 'Feature model format not supported or invalid syntax.'
             return flask.render_template('index_flask.html', data=data)
@@ -80,22 +82,22 @@ def index():
         characterization.metadata.tags = keywords
         characterization.metadata.reference = reference
         characterization.metadata.domains = domain
+        snapshot = characterization.snapshot()  # Computed once for all the formats
         data['FM_NAME'] = name
-        data['JSON_CHARACTERIZATION'] = characterization.to_json()
-        data['TXT_CHARACTERIZATION'] = str(characterization)
+        data['JSON_CHARACTERIZATION'] = snapshot.to_json()
+        data['TXT_CHARACTERIZATION'] = snapshot.to_text()
 
         # Write the characterization to a JSON file
         json_filename = f'{name}.json'
         temp_dir = pathlib.Path(tempfile.gettempdir())
         temp_path = temp_dir / json_filename
-        characterization.to_json_file(temp_path)
+        snapshot.to_json_file(temp_path)
         delete_file_later(temp_path)
         # Write the characterization to a text file
         txt_filename = f'{name}.txt'
         temp_dir = pathlib.Path(tempfile.gettempdir())
         temp_path = temp_dir / txt_filename
-        with open(temp_path, 'w', encoding='utf-8') as file_txt:
-            file_txt.write(str(characterization))
+        snapshot.to_text_file(temp_path)
         delete_file_later(temp_path)
 
         return flask.jsonify(data=data)
@@ -113,10 +115,11 @@ def uploadJSON():
         json_file.save(filename)
         try:
             # Read the json
-            json_characterization = json.load(open(filename))
-            if json_characterization is None:
+            json_file_characterization = json.load(open(filename))
+            if json_file_characterization is None:
                 data['file_error'] = 'JSON format not supported.'
                 return flask.render_template('index_flask.html', data=data)
+            json_characterization = decode_json(json_file_characterization)  # Any version of the schema
             
             name = next((item['value'] for item in json_characterization["metadata"] if item["name"] == "Name"), None)
             data['FM_NAME'] = name
@@ -129,7 +132,7 @@ def uploadJSON():
             temp_dir = pathlib.Path(tempfile.gettempdir())
             temp_path = temp_dir / json_filename
             with open(temp_path, 'w', encoding='utf-8') as file_json:
-                json.dump(json_characterization, file_json, indent=4)
+                json.dump(json_file_characterization, file_json, indent=4)
             delete_file_later(temp_path)
             # Write the characterization to a text file
             txt_filename = f'{name}.txt'
@@ -156,23 +159,23 @@ def fromURL():
     if url is None:
         return flask.jsonify({'error': 'URL not provided.'}), 400
     try:
-        characterization = FMCharacterization.from_url(url)
+        characterization = FMCharacterization.from_url(url, bdd_budget=BDD_BUDGET, bdd_cache=BDD_CACHE)
+        snapshot = characterization.snapshot()  # Computed once for all the formats
         data['FM_NAME'] = characterization.metadata.name
-        data['JSON_CHARACTERIZATION'] = characterization.to_json()
-        data['TXT_CHARACTERIZATION'] = str(characterization)
+        data['JSON_CHARACTERIZATION'] = snapshot.to_json()
+        data['TXT_CHARACTERIZATION'] = snapshot.to_text()
 
         # Write the characterization to a JSON file
         json_filename = f'{characterization.metadata.name}.json'
         temp_dir = pathlib.Path(tempfile.gettempdir())
         temp_path = temp_dir / json_filename
-        characterization.to_json_file(temp_path)
+        snapshot.to_json_file(temp_path)
         delete_file_later(temp_path)
 
         # Write the characterization to a text file
         txt_filename = f'{characterization.metadata.name}.txt'
         temp_path = temp_dir / txt_filename
-        with open(temp_path, 'w', encoding='utf-8') as file_txt:
-            file_txt.write(str(characterization))
+        snapshot.to_text_file(temp_path)
         delete_file_later(temp_path)
         return flask.jsonify(data=data)
     except Exception as e:
@@ -196,7 +199,6 @@ def delete_file_later(path: str, delay: int = TIMEOUT_TEMPFILES):
 
 
 if __name__ == '__main__':
-    sys.set_int_max_str_digits(0)
     #logging.basicConfig(filename='app.log', level=logging.INFO)
 
     app.run(host='0.0.0.0', debug=True)